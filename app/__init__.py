@@ -2,12 +2,15 @@ import os
 from flask import Flask, redirect, url_for, request, session, flash, has_request_context, send_from_directory
 from .extensions import db, login_manager, migrate, mail
 from flask_login import current_user, logout_user
-from app.models.subscription import Subscription
-from app.models.quiz import Question
+from app.services.entitlements import has_active_subscription
+from app.services.question_stats import total_questions as get_total_questions
+from app.request_capture import init_request_capture
+from app.request_profile import init_request_profiling
+from app.sampling_profiler import init_sampling_profiler
 
 flask_app = None  # ✅ add this
 
-def create_app():
+def create_app(config_overrides=None):
     app = Flask(__name__, instance_relative_config=True)
     flask_app = app  # ✅ add this
 
@@ -18,6 +21,9 @@ def create_app():
     env = os.getenv("FLASK_ENV", "development").lower()
     cfg = "config.ProductionConfig" if env == "production" else "config.DevelopmentConfig"
     app.config.from_object(cfg)
+    # e.g. a scratch database for `flask check-queries`
+    if config_overrides:
+        app.config.update(config_overrides)
     is_prod = (env == "production")
     if is_prod:
         missing = []
@@ -49,6 +55,13 @@ def create_app():
     migrate.init_app(app, db)
     mail.init_app(app)
 
+    # Opt-in timing and SQL accounting per endpoint; first, so it covers the hooks below.
+    init_request_profiling(app)
+    # Stack sampling, switched on at runtime from /admin/performance.
+    init_sampling_profiler(app)
+    # Sanitized request records for load replays.
+    init_request_capture(app)
+
     # 🔐 Email verification guard (safe + predictable)
     @app.before_request
     def require_email_verification():
@@ -65,6 +78,7 @@ def create_app():
 
         allowed_routes = {
             "auth.confirm_email",
+            "auth.confirmation_email_status",
             "auth.resend_confirmation",
             "auth.logout",
             "auth.login",
@@ -103,7 +117,8 @@ def create_app():
     @app.context_processor
     def inject_subscription_cta():
         show_subscribe_cta = False
-        total_questions = Question.query.count()
+        # Cached; see app/services/question_stats.py.
+        total_questions = get_total_questions()
 
         # Background jobs, including campaign email rendering,
         # may have an app context but no browser request/login session.
@@ -119,20 +134,8 @@ def create_app():
             and getattr(current_user, "is_authenticated", False)
             and not getattr(current_user, "is_admin", False)
         ):
-            active_sub = (
-                Subscription.query
-                .filter_by(
-                    user_id=current_user.id,
-                    is_confirmed=True,
-                )
-                .order_by(Subscription.expires_at.desc())
-                .first()
-            )
-
-            show_subscribe_cta = not (
-                active_sub
-                and active_sub.is_active
-            )
+            # Cached; see app/services/entitlements.py.
+            show_subscribe_cta = not has_active_subscription(current_user.id)
 
         return {
             "show_subscribe_cta": show_subscribe_cta,
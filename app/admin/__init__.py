@@ -4,4 +4,7 @@ admin_bp = Blueprint("admin", __name__, url_prefix="/admin")
 
 # Import routes AFTER blueprint is created
 from . import routes  # noqa
-from . import withdrawals  # noqa
\ No newline at end of file
+from . import withdrawals  # noqa
+from . import metrics  # noqa
+from . import suppressions  # noqa
+from . import performance  # noqa
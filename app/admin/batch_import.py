@@ -0,0 +1,300 @@
+import multiprocessing
+import os
+import secrets
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from flask import current_app
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.extensions import db
+from .importer import (
+    IMPORT_MODES,
+    load_question_rows,
+    new_import_summary,
+    write_prepared_rows,
+    make_duplicate_key,
+)
+from .readers import QuestionFileError, file_extension, supported_extensions
+
+
+# Guard against zip bombs: largest single file, largest total and most
+# files we will read. All are checked before anything is decompressed.
+MAX_MEMBER_BYTES = 50 * 1024 * 1024
+MAX_TOTAL_BYTES = 200 * 1024 * 1024
+MAX_MEMBERS = 100
+
+# Saved dry-run uploads older than this are removed.
+STAGED_UPLOAD_MAX_AGE_SECONDS = 24 * 60 * 60
+
+COUNTERS = (
+    "rows_total",
+    "inserted_questions",
+    "updated_questions",
+    "skipped_duplicates",
+    "cross_file_duplicates",
+    "inserted_choices",
+)
+
+
+def _validate_member(member: Tuple[str, bytes]) -> Dict[str, Any]:
+    """
+    Read and validate one file from the zip.
+
+    Runs in a worker process, so it must not touch the database
+    or the Flask app; it only parses and validates.
+    """
+    filename, raw = member
+    summary = new_import_summary("validate")
+
+    try:
+        prepared_rows = load_question_rows(raw, filename, summary)
+    except (QuestionFileError, UnicodeError) as error:
+        summary["errors"].append(
+            {
+                "row": None,
+                "message": f"File reading error: {error}",
+            }
+        )
+        prepared_rows = None
+
+    return {
+        "filename": filename,
+        "summary": summary,
+        "prepared_rows": prepared_rows or [],
+    }
+
+
+def _validate_members(
+    members: List[Tuple[str, bytes]],
+    max_workers: int,
+) -> List[Dict[str, Any]]:
+    """
+    Validate files in parallel, keeping the zip's file order.
+
+    Uses spawned processes rather than forked ones so children never
+    inherit the parent's open database connections.
+    """
+    workers = min(len(members), max_workers, os.cpu_count() or 1)
+
+    if workers <= 1:
+        return [_validate_member(member) for member in members]
+
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+    ) as pool:
+        return list(pool.map(_validate_member, members))
+
+
+def _read_zip_members(zip_path_or_file) -> List[Tuple[str, bytes]]:
+    """
+    Return (filename, bytes) for every supported file in the zip.
+
+    Sizes come from the zip's directory, which zipfile also enforces
+    while decompressing, so an oversized zip is rejected unread.
+    """
+    extensions = supported_extensions()
+    mb = 1024 * 1024
+
+    with zipfile.ZipFile(zip_path_or_file) as archive:
+        infos = []
+        for info in archive.infolist():
+            name = info.filename
+
+            if info.is_dir() or name.startswith("__MACOSX/"):
+                continue
+
+            if os.path.basename(name).startswith("."):
+                continue
+
+            if file_extension(name) not in extensions:
+                continue
+
+            if info.file_size > MAX_MEMBER_BYTES:
+                raise QuestionFileError(f"{name} is larger than {MAX_MEMBER_BYTES // mb} MB.")
+
+            infos.append(info)
+
+        if len(infos) > MAX_MEMBERS:
+            raise QuestionFileError(f"The zip has more than {MAX_MEMBERS} question files.")
+
+        if sum(info.file_size for info in infos) > MAX_TOTAL_BYTES:
+            raise QuestionFileError(
+                f"The zip's question files add up to more than {MAX_TOTAL_BYTES // mb} MB."
+            )
+
+        return [(info.filename, archive.read(info)) for info in infos]
+
+
+def _drop_cross_file_duplicates(results: List[Dict[str, Any]]) -> None:
+    """
+    Remove rows already present in an earlier file of the batch.
+
+    Matches on the importer's duplicate key and on question_id.
+    Removed rows are reported as warnings on the later file.
+    """
+    seen_keys: Dict[Tuple[str, str, str], Tuple[str, int]] = {}
+    seen_ids: Dict[str, Tuple[str, int]] = {}
+
+    for result in results:
+        filename = result["filename"]
+        summary = result["summary"]
+        summary["cross_file_duplicates"] = 0
+        kept: List[Dict[str, Any]] = []
+
+        for prepared in result["prepared_rows"]:
+            key = make_duplicate_key(
+                band=prepared["band"],
+                question_type=prepared["question_type"],
+                question_text=prepared["question_text"],
+            )
+            external_id = prepared["external_id"]
+
+            earlier = seen_keys.get(key) or (
+                seen_ids.get(external_id) if external_id else None
+            )
+
+            if earlier and earlier[0] != filename:
+                summary["cross_file_duplicates"] += 1
+                summary["warnings"].append(
+                    {
+                        "row": prepared["row_number"],
+                        "message": (
+                            f"Duplicate of {earlier[0]} row {earlier[1]}; skipped."
+                        ),
+                    }
+                )
+                continue
+
+            seen_keys.setdefault(key, (filename, prepared["row_number"]))
+            if external_id:
+                seen_ids.setdefault(external_id, (filename, prepared["row_number"]))
+
+            kept.append(prepared)
+
+        result["prepared_rows"] = kept
+
+
+def import_questions_from_zip(
+    zip_file,
+    mode: str = "insert",
+    dry_run: bool = True,
+) -> Dict[str, Any]:
+    """
+    Validate, and unless dry_run import, every question file in a zip.
+
+    Files are parsed and validated in parallel worker processes.
+    Duplicates are checked across files and against the database.
+    A confirmed run writes all files in one transaction, so the
+    batch either lands completely or not at all.
+
+    Returns a consolidated report with one summary per file and
+    batch totals.
+    """
+    if mode not in IMPORT_MODES:
+        raise ValueError(f"Unsupported import mode: {mode}")
+
+    report: Dict[str, Any] = {
+        "mode": mode,
+        "dry_run": dry_run,
+        "files": [],
+        "totals": {counter: 0 for counter in (*COUNTERS, "invalid_rows")},
+        "errors": [],
+        "has_row_errors": False,
+    }
+
+    try:
+        members = _read_zip_members(zip_file)
+    except (zipfile.BadZipFile, QuestionFileError) as error:
+        report["errors"].append(f"Could not read zip: {error}")
+        return report
+
+    if not members:
+        allowed = ", ".join(sorted(supported_extensions()))
+        report["errors"].append(f"The zip contains no {allowed} files.")
+        return report
+
+    results = _validate_members(
+        members,
+        max_workers=current_app.config.get("IMPORT_MAX_WORKERS", 4),
+    )
+    _drop_cross_file_duplicates(results)
+
+    try:
+        for result in results:
+            summary = result["summary"]
+            summary["mode"] = mode
+
+            write_prepared_rows(
+                result["prepared_rows"],
+                mode,
+                summary,
+                dry_run=dry_run,
+            )
+
+        if dry_run:
+            db.session.rollback()
+        else:
+            db.session.commit()
+
+    except SQLAlchemyError as error:
+        db.session.rollback()
+        report["errors"].append(f"Database error: {error}")
+
+        for result in results:
+            for counter in ("inserted_questions", "updated_questions", "inserted_choices"):
+                result["summary"][counter] = 0
+
+    for result in results:
+        summary = result["summary"]
+        report["files"].append({"filename": result["filename"], **summary})
+
+        for counter in COUNTERS:
+            report["totals"][counter] += summary.get(counter, 0)
+        report["totals"]["invalid_rows"] += len(summary["errors"])
+
+    report["has_row_errors"] = report["totals"]["invalid_rows"] > 0
+
+    return report
+
+
+# -----------------------------
+# Staging between dry run and confirm
+# -----------------------------
+
+def _staging_dir() -> str:
+    path = os.path.join(current_app.instance_path, "question_uploads")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def stage_upload(file_storage) -> str:
+    """
+    Save an uploaded zip for a later confirmed run; return its token.
+    """
+    directory = _staging_dir()
+    cutoff = time.time() - STAGED_UPLOAD_MAX_AGE_SECONDS
+
+    for name in os.listdir(directory):
+        path = os.path.join(directory, name)
+        if os.path.isfile(path) and os.path.getmtime(path) < cutoff:
+            os.remove(path)
+
+    token = secrets.token_hex(16)
+    file_storage.stream.seek(0)
+    file_storage.save(os.path.join(directory, f"{token}.zip"))
+    return token
+
+
+def staged_upload_path(token: str) -> Optional[str]:
+    """
+    Return the saved zip for a token, or None if it is gone/invalid.
+    """
+    if not token or len(token) != 32 or not all(c in "0123456789abcdef" for c in token):
+        return None
+
+    path = os.path.join(_staging_dir(), f"{token}.zip")
+    return path if os.path.exists(path) else None
@@ -0,0 +1,122 @@
+import re
+import secrets
+from typing import Any, Dict, Iterable, List
+
+from app.auth.email import render_template_email
+from app.email_service import MessageTemplate, PreparedMessage
+
+
+# Dashboard placeholders look like [[first_name]].
+PLACEHOLDER = re.compile(r"\[\[(\w+)\]\]")
+
+# Placeholders that differ per recipient; everything else is filled in
+# once when the campaign is compiled.
+RECIPIENT_PLACEHOLDERS = ("first_name",)
+
+
+class CompiledContent:
+    """
+    Campaign text split once into literal segments and recipient slots.
+
+    [[key]] placeholders found in `values` are substituted at compile
+    time, keys listed in `variables` become slots filled by render(),
+    and any other [[...]] text is left untouched. Rendering is a single
+    join, however many placeholders the content has.
+    """
+
+    def __init__(
+        self,
+        content: str,
+        values: Dict[str, Any],
+        variables: Iterable[str] = RECIPIENT_PLACEHOLDERS,
+    ) -> None:
+        variables = set(variables)
+        content = content or ""
+
+        self.literals: List[str] = []
+        self.slots: List[str] = []
+
+        literal: List[str] = []
+        position = 0
+
+        for match in PLACEHOLDER.finditer(content):
+            key = match.group(1)
+            literal.append(content[position:match.start()])
+
+            if key in variables:
+                self.literals.append("".join(literal))
+                self.slots.append(key)
+                literal = []
+            elif key in values:
+                literal.append(str(values[key] or ""))
+            else:
+                literal.append(match.group(0))
+
+            position = match.end()
+
+        literal.append(content[position:])
+        self.literals.append("".join(literal))
+
+    def render(self, **values: Any) -> str:
+        if not self.slots:
+            return self.literals[0]
+
+        parts = [self.literals[0]]
+        for slot, literal in zip(self.slots, self.literals[1:]):
+            parts.append(str(values.get(slot) or ""))
+            parts.append(literal)
+
+        return "".join(parts)
+
+
+class CompiledCampaign:
+    """
+    One campaign email, compiled once and rendered per recipient.
+
+    The Jinja wrapper (email/custom_campaign.html) is rendered a single
+    time around a marker and kept as static prefix/suffix segments; the
+    subject and sender headers are encoded once by MessageTemplate.
+    Needs an app context to compile, not to render.
+    """
+
+    def __init__(
+        self,
+        subject: str,
+        content: str,
+        text_content: str,
+        values: Dict[str, Any],
+        template_id: str = "custom_campaign",
+    ) -> None:
+        self.content = CompiledContent(content, values)
+        self.text = CompiledContent(text_content, values)
+
+        marker = f"[[campaign_content_{secrets.token_hex(8)}]]"
+        _, wrapper, _ = render_template_email(
+            template_id,
+            {"subject": subject, "email_content": marker},
+        )
+
+        if marker not in wrapper:
+            raise RuntimeError(
+                f"Template '{template_id}' does not render email_content unescaped."
+            )
+
+        self.prefix, self.suffix = wrapper.split(marker, 1)
+        self.message = MessageTemplate(subject)
+
+    @property
+    def subject(self) -> str:
+        return self.message.subject
+
+    def render_html(self, **values: Any) -> str:
+        return self.prefix + self.content.render(**values) + self.suffix
+
+    def render_text(self, **values: Any) -> str:
+        return self.text.render(**values)
+
+    def build(self, to_email: str, **values: Any) -> PreparedMessage:
+        return self.message.render(
+            to_email,
+            self.render_html(**values),
+            self.render_text(**values),
+        )
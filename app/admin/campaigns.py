@@ -0,0 +1,573 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional
+
+from flask import current_app
+from sqlalchemy import case, func, insert, or_, select, update
+from sqlalchemy.exc import IntegrityError
+
+from app.email_outbox import queued_for_campaign
+from app.email_service import (
+    EmailSendError,
+    EmailSuppressedError,
+    available_providers,
+    bulk_mail,
+)
+from app.extensions import db
+from app.models import User
+from app.models.campaign_delivery import CampaignDelivery
+from app.services.entitlements import premium_until_condition
+from app.suppression import not_suppressed
+
+
+# Sustained sends per second each provider accepts; 0 means unlimited.
+# Conservative defaults, override with CAMPAIGN_PROVIDER_RATES.
+DEFAULT_PROVIDER_RATES = {
+    "zoho": 1.0,
+    "brevo": 5.0,
+    "mailersend": 2.0,
+    "local": 0.0,
+}
+
+DEFAULT_WORKERS = 4
+DEFAULT_PROGRESS_SECONDS = 0.5
+
+# Users fetched per keyset page when streaming campaign recipients.
+RECIPIENT_PAGE_SIZE = 1000
+
+# Recipients claimed in the delivery ledger per round trip.
+LEDGER_CHUNK_SIZE = 200
+
+SEGMENTS = ("subscribers", "non_subscribers")
+
+
+class Recipient(NamedTuple):
+    segment: str
+    user_id: int
+    email: str
+    username: Optional[str]
+
+
+def _segment_query(target: str, now: datetime):
+    """
+    (segment, id, email, username) rows for a campaign target.
+
+    Segments are disjoint: active subscribers, and verified users
+    without an active subscription, both by the indexed
+    User.premium_until. Suppressed addresses are left out.
+    """
+    has_active_subscription = premium_until_condition(now)
+    # Not ~has_active_subscription: NOT (NULL > now) is not true in SQL.
+    non_subscriber = User.is_email_verified.is_(True) & or_(
+        User.premium_until.is_(None),
+        User.premium_until <= now,
+    )
+
+    if target == "subscribers":
+        condition = has_active_subscription
+    elif target == "non_subscribers":
+        condition = non_subscriber
+    else:
+        condition = or_(has_active_subscription, User.is_email_verified.is_(True))
+
+    segment = case(
+        (has_active_subscription, "subscribers"),
+        else_="non_subscribers",
+    ).label("segment")
+
+    return (
+        db.session.query(segment, User.id, User.email, User.username)
+        .filter(condition, not_suppressed(User.email))
+    )
+
+
+def count_recipients(
+    target: str,
+    now: datetime,
+    min_user_id: Optional[int] = None,
+    queued_campaign_id: Optional[int] = None,
+) -> Dict[str, int]:
+    """
+    Recipients per segment, optionally only the ones a previous run
+    handled: users with id >= min_user_id, or already in the outbox
+    for queued_campaign_id.
+    """
+    query = _segment_query(target, now)
+    handled = []
+    if min_user_id is not None:
+        handled.append(User.id >= min_user_id)
+    if queued_campaign_id is not None:
+        handled.append(queued_for_campaign(queued_campaign_id, User.email))
+    if handled:
+        query = query.filter(or_(*handled))
+
+    counts = dict.fromkeys(SEGMENTS, 0)
+    subquery = query.subquery()
+    for segment, count in (
+        db.session.query(subquery.c.segment, func.count())
+        .group_by(subquery.c.segment)
+    ):
+        counts[segment] = count
+    return counts
+
+
+def iter_recipients(
+    target: str,
+    now: datetime,
+    before_user_id: Optional[int] = None,
+    limit_each: int = 0,
+    already_sent: Optional[Dict[str, int]] = None,
+    queued_campaign_id: Optional[int] = None,
+    page_size: int = RECIPIENT_PAGE_SIZE,
+) -> Iterator[Recipient]:
+    """
+    Stream campaign recipients, newest users first.
+
+    Pages through users by keyset on User.id (id < last seen id), so
+    each page is an index range scan and memory does not grow with
+    the size of the segment. Only (segment, id, email, username) is
+    loaded. limit_each caps each segment (0 = no cap); already_sent
+    counts recipients handled before a resume against that cap.
+    queued_campaign_id leaves out addresses already in the outbox for
+    that campaign.
+    """
+    sent = dict.fromkeys(SEGMENTS, 0)
+    sent.update(already_sent or {})
+    wanted = set(SEGMENTS) if target == "both" else {target}
+    last_id = before_user_id
+
+    while True:
+        query = _segment_query(target, now)
+        if last_id is not None:
+            query = query.filter(User.id < last_id)
+        if queued_campaign_id is not None:
+            query = query.filter(~queued_for_campaign(queued_campaign_id, User.email))
+
+        page = query.order_by(User.id.desc()).limit(page_size).all()
+        if not page:
+            return
+
+        for row in page:
+            last_id = row.id
+
+            if limit_each and sent[row.segment] >= limit_each:
+                continue
+
+            sent[row.segment] += 1
+            yield Recipient(row.segment, row.id, row.email, row.username)
+
+        if limit_each and all(sent[segment] >= limit_each for segment in wanted):
+            return
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket: `rate` tokens per second, up to `burst`.
+
+    acquire() blocks until a token is available.
+    """
+
+    def __init__(self, rate: float, burst: Optional[float] = None) -> None:
+        self.rate = max(0.0, rate)
+        self.burst = max(1.0, burst if burst is not None else self.rate)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(
+            self.burst,
+            self._tokens + (now - self._updated) * self.rate,
+        )
+        self._updated = now
+
+    def wait_time(self) -> float:
+        """Seconds until a token is available (0 if one is available now)."""
+        if not self.rate:
+            return 0.0
+
+        with self._lock:
+            self._refill(time.monotonic())
+            return max(0.0, (1 - self._tokens) / self.rate)
+
+    def acquire(self) -> None:
+        if not self.rate:
+            return
+
+        while True:
+            with self._lock:
+                self._refill(time.monotonic())
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait_for = (1 - self._tokens) / self.rate
+
+            time.sleep(wait_for)
+
+
+def parse_provider_rates(value: str) -> Dict[str, float]:
+    """
+    Parse "zoho:1,brevo:5" into {"zoho": 1.0, "brevo": 5.0}.
+
+    Malformed entries are ignored.
+    """
+    rates: Dict[str, float] = {}
+
+    for item in (value or "").split(","):
+        name, _, rate = item.partition(":")
+        name = name.strip().lower()
+        if not name:
+            continue
+        try:
+            rates[name] = float(rate)
+        except ValueError:
+            continue
+
+    return rates
+
+
+class ProviderRouter:
+    """
+    Picks a provider for each message and enforces its send rate.
+
+    Providers on cooldown are skipped. Of the rest, the one whose
+    bucket frees up soonest goes first, so load spreads across the
+    chain in proportion to each provider's rate; ties go to the
+    healthier provider (see app/provider_health.py).
+    """
+
+    def __init__(self, rates: Dict[str, float]) -> None:
+        self.rates = rates
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def bucket(self, provider: str) -> TokenBucket:
+        with self._lock:
+            bucket = self._buckets.get(provider)
+            if bucket is None:
+                bucket = TokenBucket(self.rates.get(provider, 0.0))
+                self._buckets[provider] = bucket
+            return bucket
+
+    def candidates(self) -> List[str]:
+        """Available providers, the least busy first (health order on ties)."""
+        providers = available_providers()
+        return sorted(
+            providers,
+            key=lambda provider: self.bucket(provider).wait_time(),
+        )
+
+
+@dataclass
+class CampaignProgress:
+    sent: int = 0
+    failed: int = 0
+    last_error: Optional[str] = None
+    by_provider: Dict[str, int] = field(default_factory=dict)
+    started: float = field(default_factory=time.monotonic)
+
+    # Key of the last recipient such that it and every recipient before
+    # it have been processed (see CampaignSender.run checkpoint_key).
+    checkpoint: Any = None
+
+    @property
+    def processed(self) -> int:
+        return self.sent + self.failed
+
+    @property
+    def per_second(self) -> float:
+        elapsed = time.monotonic() - self.started
+        return self.processed / elapsed if elapsed > 0 else 0.0
+
+
+class CampaignSender:
+    """
+    Sends one message per recipient on a bounded pool of worker threads.
+
+    deliver(recipient, provider) must send a single message through
+    the named provider and raise on failure; on EmailSendError the
+    next available provider is tried (not on EmailSuppressedError:
+    the address is bad, not the provider). Recipients should be plain
+    values (not ORM objects), since workers run outside the caller's
+    database session.
+
+    on_progress(progress) is called from the calling thread at most
+    every progress_seconds, and once more when the run ends.
+    on_success(recipient, provider, seconds) and on_failure(recipient,
+    error) are also called from the calling thread, so they may use
+    the database session.
+    """
+
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        rates: Optional[Dict[str, float]] = None,
+        progress_seconds: Optional[float] = None,
+    ) -> None:
+        config = current_app.config
+
+        self.app = current_app._get_current_object()
+        self.workers = max(1, workers or config.get("CAMPAIGN_WORKERS", DEFAULT_WORKERS))
+        self.progress_seconds = (
+            progress_seconds
+            if progress_seconds is not None
+            else config.get("CAMPAIGN_PROGRESS_SECONDS", DEFAULT_PROGRESS_SECONDS)
+        )
+
+        if rates is None:
+            rates = {
+                **DEFAULT_PROVIDER_RATES,
+                **parse_provider_rates(config.get("CAMPAIGN_PROVIDER_RATES", "")),
+            }
+        self.router = ProviderRouter(rates)
+
+    def _deliver(
+        self,
+        recipient: Any,
+        deliver: Callable[[Any, str], None],
+    ) -> Dict[str, Any]:
+        with self.app.app_context():
+            last_error: Optional[Exception] = None
+
+            for provider in self.router.candidates():
+                self.router.bucket(provider).acquire()
+                started = time.monotonic()
+                try:
+                    with bulk_mail():
+                        deliver(recipient, provider)
+                    return {
+                        "provider": provider,
+                        "seconds": time.monotonic() - started,
+                        "error": None,
+                    }
+                except EmailSuppressedError as error:
+                    return {"provider": provider, "seconds": None, "error": error}
+                except EmailSendError as error:
+                    last_error = error
+                except Exception as error:
+                    return {"provider": provider, "seconds": None, "error": error}
+
+            return {
+                "provider": None,
+                "seconds": None,
+                "error": last_error or EmailSendError(
+                    "All configured email providers are currently on cooldown."
+                ),
+            }
+
+    def run(
+        self,
+        recipients: Iterable[Any],
+        deliver: Callable[[Any, str], None],
+        on_progress: Optional[Callable[[CampaignProgress], None]] = None,
+        on_failure: Optional[Callable[[Any, Exception], None]] = None,
+        on_success: Optional[Callable[[Any, str, float], None]] = None,
+        checkpoint_key: Optional[Callable[[Any], Any]] = None,
+    ) -> CampaignProgress:
+        progress = CampaignProgress()
+        last_report = time.monotonic()
+
+        # Futures in submission order, to advance the checkpoint past
+        # the longest fully-processed prefix of the recipient stream.
+        submitted: deque = deque()
+
+        def advance_checkpoint() -> None:
+            while submitted and submitted[0][0] not in pending:
+                _, recipient = submitted.popleft()
+                progress.checkpoint = checkpoint_key(recipient)
+
+        def collect(done) -> None:
+            for future in done:
+                recipient, result = pending.pop(future), future.result()
+                error = result["error"]
+
+                if error is None:
+                    progress.sent += 1
+                    provider = result["provider"]
+                    progress.by_provider[provider] = progress.by_provider.get(provider, 0) + 1
+                    if on_success:
+                        on_success(recipient, provider, result["seconds"])
+                else:
+                    progress.failed += 1
+                    progress.last_error = str(error)
+                    if on_failure:
+                        on_failure(recipient, error)
+
+            if checkpoint_key:
+                advance_checkpoint()
+
+        def report(force: bool = False) -> None:
+            nonlocal last_report
+            now = time.monotonic()
+            if on_progress and (force or now - last_report >= self.progress_seconds):
+                on_progress(progress)
+                last_report = now
+
+        # Keep at most two messages per worker queued, so a long
+        # recipient list is consumed lazily.
+        max_pending = self.workers * 2
+        pending: Dict[Any, Any] = {}
+
+        with ThreadPoolExecutor(
+            max_workers=self.workers,
+            thread_name_prefix="campaign",
+        ) as pool:
+            for recipient in recipients:
+                future = pool.submit(self._deliver, recipient, deliver)
+                pending[future] = recipient
+                if checkpoint_key:
+                    submitted.append((future, recipient))
+
+                if len(pending) >= max_pending:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    collect(done)
+                    report()
+
+            while pending:
+                done, _ = wait(
+                    pending,
+                    timeout=self.progress_seconds,
+                    return_when=FIRST_COMPLETED,
+                )
+                collect(done)
+                report()
+
+        report(force=True)
+        return progress
+
+
+class DeliveryLedger:
+    """
+    Per-recipient send ledger for one campaign (campaign_delivery).
+
+    claim() filters a recipient stream down to users not yet sent to,
+    recording a "sending" row for each before it is handed out; the
+    unique (campaign_key, user_id) index means two runs can never claim
+    the same user. Users whose earlier attempt failed are claimed
+    again. A "sending" row left by a crashed run is not retried: that
+    message may have gone out, and a missed email beats a duplicate.
+
+    record_success/record_failure fit CampaignSender's on_success and
+    on_failure; flush() writes the outcomes and commits. All methods
+    use the caller's session, so call them from the calling thread.
+    """
+
+    def __init__(self, campaign_key: str, chunk_size: int = LEDGER_CHUNK_SIZE) -> None:
+        self.campaign_key = campaign_key
+        self.chunk_size = chunk_size
+        self.skipped = 0
+        self._sent: Dict[str, List[int]] = {}
+        self._failed: Dict[str, List[int]] = {}
+
+    def claim(self, recipients: Iterable[Recipient]) -> Iterator[Recipient]:
+        chunk: List[Recipient] = []
+        for recipient in recipients:
+            chunk.append(recipient)
+            if len(chunk) >= self.chunk_size:
+                yield from self._claim_chunk(chunk)
+                chunk = []
+
+        if chunk:
+            yield from self._claim_chunk(chunk)
+
+    def _existing(self, user_ids: List[int]) -> Dict[int, str]:
+        table = CampaignDelivery.__table__
+        rows = db.session.execute(
+            select(table.c.user_id, table.c.status).where(
+                table.c.campaign_key == self.campaign_key,
+                table.c.user_id.in_(user_ids),
+            )
+        )
+        return {user_id: status for user_id, status in rows}
+
+    def _claim_chunk(self, chunk: List[Recipient]) -> List[Recipient]:
+        table = CampaignDelivery.__table__
+        existing = self._existing([recipient.user_id for recipient in chunk])
+        now = datetime.utcnow()
+
+        new = [recipient for recipient in chunk if recipient.user_id not in existing]
+        retry = [recipient.user_id for recipient in chunk if existing.get(recipient.user_id) == "failed"]
+
+        def row(recipient: Recipient) -> Dict[str, Any]:
+            return {
+                "campaign_key": self.campaign_key,
+                "user_id": recipient.user_id,
+                "segment": recipient.segment,
+                "status": "sending",
+                "attempts": 1,
+                "created_at": now,
+            }
+
+        claimed = set(retry)
+
+        if new:
+            try:
+                db.session.execute(insert(table), [row(recipient) for recipient in new])
+                db.session.commit()
+                claimed.update(recipient.user_id for recipient in new)
+            except IntegrityError:
+                # Another run claimed some of them; take the rest one by one.
+                db.session.rollback()
+                for recipient in new:
+                    try:
+                        db.session.execute(insert(table), [row(recipient)])
+                        db.session.commit()
+                        claimed.add(recipient.user_id)
+                    except IntegrityError:
+                        db.session.rollback()
+
+        if retry:
+            result = db.session.execute(
+                update(table)
+                .where(
+                    table.c.campaign_key == self.campaign_key,
+                    table.c.user_id.in_(retry),
+                    table.c.status == "failed",
+                )
+                .values(status="sending", attempts=table.c.attempts + 1, last_error=None)
+            )
+            db.session.commit()
+            if result.rowcount != len(retry):
+                # Raced with another run; only keep rows still ours.
+                claimed.difference_update(
+                    user_id for user_id, status in self._existing(retry).items()
+                    if status != "sending"
+                )
+
+        self.skipped += len(chunk) - len(claimed)
+        return [recipient for recipient in chunk if recipient.user_id in claimed]
+
+    def record_success(self, recipient: Recipient, provider: str, seconds: float) -> None:
+        self._sent.setdefault(provider, []).append(recipient.user_id)
+
+    def record_failure(self, recipient: Recipient, error: Exception) -> None:
+        self._failed.setdefault(str(error)[:1000], []).append(recipient.user_id)
+
+    def flush(self) -> None:
+        table = CampaignDelivery.__table__
+        now = datetime.utcnow()
+        sent, self._sent = self._sent, {}
+        failed, self._failed = self._failed, {}
+
+        def mark(user_ids: List[int], **values: Any) -> None:
+            for start in range(0, len(user_ids), self.chunk_size):
+                db.session.execute(
+                    update(table)
+                    .where(
+                        table.c.campaign_key == self.campaign_key,
+                        table.c.user_id.in_(user_ids[start:start + self.chunk_size]),
+                    )
+                    .values(**values)
+                )
+
+        for provider, user_ids in sent.items():
+            mark(user_ids, status="sent", provider=provider, sent_at=now)
+        for error, user_ids in failed.items():
+            mark(user_ids, status="failed", last_error=error)
+
+        if sent or failed:
+            db.session.commit()
@@ -0,0 +1,188 @@
+import csv
+import io
+import json
+import zlib
+from itertools import groupby
+from typing import Any, Dict, Iterable, Iterator, Optional
+
+from app.extensions import db
+from app.models.quiz import Question, Choice
+from .importer import CHOICE_LABELS
+
+
+# Same schema the importer reads, plus the stable ID in front.
+EXPORT_COLUMNS = [
+    "question_id",
+    "source",
+    "level",
+    "mode",
+    "question_text",
+    "option_a",
+    "option_b",
+    "option_c",
+    "option_d",
+    "correct_option",
+    "explanation",
+    "question_type",
+]
+
+EXPORT_FORMATS = {"csv", "jsonl"}
+
+# Rows fetched per round trip; server-side cursor on Postgres.
+YIELD_PER = 1000
+
+# Rows buffered before a chunk is handed to the response/file.
+CHUNK_ROWS = 500
+
+
+def iter_question_records(
+    band: Optional[str] = None,
+    question_type: Optional[str] = None,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Yield questions in the importer's schema, one dict per question.
+
+    Reads plain column tuples (no ORM objects) through a streaming
+    cursor, so memory use does not grow with the size of the bank.
+    Choices are pivoted to option_a..option_d in choice.id order,
+    which is the order the importer writes them in.
+    """
+    query = (
+        db.session.query(
+            Question.id,
+            Question.external_id,
+            Question.band,
+            Question.question_type,
+            Question.text,
+            Question.explanation,
+            Choice.text.label("choice_text"),
+            Choice.is_correct,
+        )
+        .outerjoin(Choice, Choice.question_id == Question.id)
+        .order_by(Question.id, Choice.id)
+        .execution_options(yield_per=YIELD_PER)
+    )
+
+    if band:
+        query = query.filter(Question.band == band)
+    if question_type:
+        query = query.filter(Question.question_type == question_type)
+
+    for _, rows in groupby(query, key=lambda row: row.id):
+        rows = list(rows)
+        first = rows[0]
+
+        record = {
+            "question_id": first.external_id or "",
+            # Neither source nor mode is stored per question.
+            "source": "",
+            "level": first.band,
+            "mode": "exam",
+            "question_text": first.text,
+            "option_a": "",
+            "option_b": "",
+            "option_c": "",
+            "option_d": "",
+            "correct_option": "",
+            "explanation": first.explanation or "",
+            "question_type": first.question_type,
+        }
+
+        choices = [row for row in rows if row.choice_text is not None]
+        for label, choice in zip(CHOICE_LABELS, choices):
+            record[f"option_{label.lower()}"] = choice.choice_text
+            if choice.is_correct:
+                record["correct_option"] = label
+
+        yield record
+
+
+def iter_export_chunks(
+    records: Iterable[Dict[str, Any]],
+    fmt: str = "csv",
+) -> Iterator[str]:
+    """
+    Serialize records to CSV or JSONL text in chunks of CHUNK_ROWS.
+
+    The CSV header is emitted first, so a response starts sending
+    bytes before the first database batch has been read.
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format: {fmt}")
+
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_COLUMNS)
+
+    if fmt == "csv":
+        writer.writeheader()
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+    pending = 0
+    for record in records:
+        if fmt == "csv":
+            writer.writerow(record)
+        else:
+            buffer.write(json.dumps(record, ensure_ascii=False))
+            buffer.write("\n")
+
+        pending += 1
+        if pending >= CHUNK_ROWS:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+
+    if pending:
+        yield buffer.getvalue()
+
+
+def gzip_chunks(chunks: Iterable[str]) -> Iterator[bytes]:
+    """
+    Compress text chunks into a single gzip stream as they arrive.
+    """
+    compressor = zlib.compressobj(wbits=31)  # 31 = gzip container
+
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode("utf-8"))
+        if data:
+            yield data
+
+    yield compressor.flush()
+
+
+def export_questions(
+    fmt: str = "csv",
+    band: Optional[str] = None,
+    question_type: Optional[str] = None,
+    compress: bool = False,
+) -> Iterator[bytes]:
+    """
+    Stream the question bank as encoded bytes, optionally gzipped.
+    """
+    chunks = iter_export_chunks(
+        iter_question_records(band=band, question_type=question_type),
+        fmt=fmt,
+    )
+
+    if compress:
+        return gzip_chunks(chunks)
+
+    return (chunk.encode("utf-8") for chunk in chunks)
+
+
+def export_filename(
+    fmt: str,
+    band: Optional[str] = None,
+    question_type: Optional[str] = None,
+    compress: bool = False,
+) -> str:
+    parts = ["questions"]
+    if band:
+        parts.append(band)
+    if question_type:
+        parts.append(question_type)
+
+    name = "_".join(parts) + f".{fmt}"
+    return name + ".gz" if compress else name
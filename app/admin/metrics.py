@@ -0,0 +1,38 @@
+# app/admin/metrics.py
+
+import hmac
+
+from flask import Response, abort, current_app, request
+from flask_login import current_user
+
+from app.email_metrics import email_metrics, prometheus_text
+from app.request_profile import DEFAULT_WINDOW_MINUTES, request_metrics
+from app.request_profile import prometheus_text as request_prometheus_text
+from . import admin_bp
+
+
+def _metrics_authorized() -> bool:
+    """Admins, or a scraper sending `Authorization: Bearer <METRICS_TOKEN>`."""
+    if current_user.is_authenticated and getattr(current_user, "is_admin", False):
+        return True
+
+    token = current_app.config.get("METRICS_TOKEN") or ""
+    header = request.headers.get("Authorization", "")
+    if token and header.startswith("Bearer "):
+        return hmac.compare_digest(header[len("Bearer "):].strip(), token)
+
+    return False
+
+
+@admin_bp.route("/metrics", methods=["GET"])
+def metrics():
+    """Prometheus text format; see app/email_metrics.py and app/request_profile.py."""
+    if not _metrics_authorized():
+        abort(401)
+
+    text = prometheus_text(email_metrics().snapshot())
+    if current_app.config.get("REQUEST_PROFILING_ENABLED"):
+        window = current_app.config.get("REQUEST_PROFILE_WINDOW_MINUTES", DEFAULT_WINDOW_MINUTES)
+        text += request_prometheus_text(request_metrics().snapshot(window), window)
+
+    return Response(text, mimetype="text/plain; version=0.0.4")
@@ -0,0 +1,87 @@
+# app/admin/performance.py
+
+from flask import abort, current_app, flash, redirect, render_template, request, send_from_directory, url_for
+from flask_login import current_user, login_required
+
+from app.request_profile import DEFAULT_WINDOW_MINUTES, request_metrics, summarize
+from app.sampling_profiler import MAX_MINUTES, sampling_profiler
+from app.utils import admin_required
+
+from . import admin_bp
+
+
+def _profilable_endpoints():
+    return sorted(name for name in current_app.view_functions if name != "static")
+
+
+@admin_bp.route("/performance", methods=["GET"])
+@login_required
+@admin_required
+def performance():
+    """Per-endpoint request timings and the sampling profiler."""
+    config = current_app.config
+    profiler = sampling_profiler()
+
+    return render_template(
+        "admin/performance.html",
+        endpoints=summarize(request_metrics().snapshot()),
+        enabled=bool(config.get("REQUEST_PROFILING_ENABLED")),
+        window_minutes=config.get("REQUEST_PROFILE_WINDOW_MINUTES", DEFAULT_WINDOW_MINUTES),
+        query_budget=config.get("REQUEST_QUERY_BUDGET") or 0,
+        time_budget_ms=config.get("REQUEST_TIME_BUDGET_MS") or 0,
+        profiler_settings=profiler.settings(),
+        profile_files=profiler.files(),
+        profilable_endpoints=_profilable_endpoints(),
+        max_minutes=MAX_MINUTES,
+    )
+
+
+@admin_bp.route("/performance/profiler", methods=["POST"])
+@login_required
+@admin_required
+def start_profiler():
+    known = set(_profilable_endpoints())
+    endpoints = [name for name in request.form.getlist("endpoints") if name in known]
+    if not endpoints:
+        flash("Choose at least one endpoint to profile.", "danger")
+        return redirect(url_for("admin.performance"))
+
+    try:
+        every = max(1, int(request.form.get("every") or 1))
+        minutes = max(1, min(int(request.form.get("minutes") or 15), MAX_MINUTES))
+    except ValueError:
+        flash("Invalid sample rate or duration.", "danger")
+        return redirect(url_for("admin.performance"))
+
+    sampling_profiler().enable(endpoints, every=every, minutes=minutes)
+
+    current_app.logger.info(
+        f"Admin {current_user.id} started the profiler: endpoints={','.join(endpoints)} "
+        f"every={every} minutes={minutes}"
+    )
+    flash(f"Profiling 1 in {every} request(s) to {', '.join(endpoints)} for {minutes} minute(s).", "success")
+    return redirect(url_for("admin.performance"))
+
+
+@admin_bp.route("/performance/profiler/stop", methods=["POST"])
+@login_required
+@admin_required
+def stop_profiler():
+    sampling_profiler().disable()
+
+    current_app.logger.info(f"Admin {current_user.id} stopped the profiler")
+    flash("Profiler stopped.", "success")
+    return redirect(url_for("admin.performance"))
+
+
+@admin_bp.route("/performance/profiles/<path:name>", methods=["GET"])
+@login_required
+@admin_required
+def download_profile(name: str):
+    profiler = sampling_profiler()
+    if name not in {f.name for f in profiler.files()}:
+        abort(404)
+
+    return send_from_directory(
+        profiler.directory, name, as_attachment=True, mimetype="text/plain"
+    )
@@ -0,0 +1,169 @@
+import io
+import json
+from dataclasses import dataclass
+from typing import Callable, Dict
+
+import pandas as pd
+
+
+class QuestionFileError(ValueError):
+    """Raised when an uploaded question file cannot be read."""
+
+
+@dataclass(frozen=True)
+class QuestionReader:
+    extension: str
+    read: Callable[[bytes], pd.DataFrame]
+
+    # Spreadsheet-like files have a header line, so the first
+    # record is row 2. JSONL records start on line 1.
+    first_row: int = 2
+
+
+# extension -> reader, e.g. "csv" -> QuestionReader(...)
+READERS: Dict[str, QuestionReader] = {}
+
+
+def register_reader(extension: str, first_row: int = 2):
+    """
+    Register a function that turns raw upload bytes into a DataFrame.
+    """
+    def decorator(func: Callable[[bytes], pd.DataFrame]):
+        READERS[extension] = QuestionReader(
+            extension=extension,
+            read=func,
+            first_row=first_row,
+        )
+        return func
+
+    return decorator
+
+
+def supported_extensions() -> set[str]:
+    return set(READERS)
+
+
+def file_extension(filename: str) -> str:
+    return filename.rsplit(".", 1)[1].lower() if "." in (filename or "") else ""
+
+
+def _as_text_frame(frame: pd.DataFrame) -> pd.DataFrame:
+    """
+    Normalize a frame to string cells and clean headers.
+
+    Missing values become "" so validation only has to look for
+    empty strings.
+    """
+    frame = frame.astype(object).where(frame.notna(), "")
+    frame = frame.astype(str)
+    frame.columns = [
+        str(column).strip().lstrip("\ufeff")
+        for column in frame.columns
+    ]
+    return frame
+
+
+@register_reader("csv")
+def read_csv(raw: bytes) -> pd.DataFrame:
+    try:
+        # Handles standard UTF-8 and UTF-8 files with BOM.
+        text = raw.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        # Fallback for CSV files exported with older encodings.
+        text = raw.decode("latin-1")
+
+    try:
+        frame = pd.read_csv(
+            io.StringIO(text),
+            dtype=str,
+            keep_default_na=False,
+            skipinitialspace=False,
+        )
+    except pd.errors.EmptyDataError:
+        raise QuestionFileError("CSV has no header row.")
+    except pd.errors.ParserError as error:
+        raise QuestionFileError(f"CSV reading error: {error}")
+
+    return _as_text_frame(frame)
+
+
+@register_reader("jsonl", first_row=1)
+def read_jsonl(raw: bytes) -> pd.DataFrame:
+    """
+    Blank lines are skipped, so each record is indexed by its line
+    offset (line number - 1); validation errors then name the line
+    the uploader sees.
+    """
+    records = []
+    offsets = []
+
+    for line_number, line in enumerate(
+        raw.decode("utf-8-sig").splitlines(),
+        start=1,
+    ):
+        if not line.strip():
+            continue
+
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as error:
+            raise QuestionFileError(
+                f"Invalid JSON on line {line_number}: {error.msg}"
+            )
+
+        if not isinstance(record, dict):
+            raise QuestionFileError(
+                f"Line {line_number} is not a JSON object."
+            )
+
+        records.append(record)
+        offsets.append(line_number - 1)
+
+    if not records:
+        raise QuestionFileError("JSONL file has no records.")
+
+    return _as_text_frame(pd.DataFrame.from_records(records, index=offsets))
+
+
+@register_reader("xlsx")
+def read_xlsx(raw: bytes) -> pd.DataFrame:
+    try:
+        frame = pd.read_excel(
+            io.BytesIO(raw),
+            sheet_name=0,
+            dtype=str,
+        )
+    except ImportError:
+        raise QuestionFileError("XLSX import needs the openpyxl package installed.")
+    except ValueError as error:
+        raise QuestionFileError(f"XLSX reading error: {error}")
+
+    return _as_text_frame(frame)
+
+
+@register_reader("parquet")
+def read_parquet(raw: bytes) -> pd.DataFrame:
+    try:
+        frame = pd.read_parquet(io.BytesIO(raw))
+    except ImportError:
+        raise QuestionFileError("Parquet import needs the pyarrow package installed.")
+
+    return _as_text_frame(frame)
+
+
+def read_question_file(raw: bytes, filename: str) -> tuple[pd.DataFrame, int]:
+    """
+    Read an uploaded question file with the reader for its extension.
+
+    Returns the frame and the row number of its first record.
+    """
+    extension = file_extension(filename)
+    reader = READERS.get(extension)
+
+    if not reader:
+        allowed = ", ".join(sorted(READERS))
+        raise QuestionFileError(
+            f"Unsupported file type '.{extension}'. Allowed: {allowed}"
+        )
+
+    return reader.read(raw), reader.first_row
@@ -1,11 +1,13 @@
 # app/admin/routes.py
 
+import json
+import os
 import time
 import uuid
 from decimal import Decimal, ROUND_HALF_UP
 from datetime import datetime, timedelta
 
-from flask import render_template, request, flash, redirect, url_for, current_app, session
+from flask import render_template, request, flash, redirect, url_for, current_app, session, Response, stream_with_context
 from flask_login import login_required, current_user
 from werkzeug.utils import secure_filename
 from sqlalchemy import exists
@@ -16,11 +18,27 @@ from app.models.subscription import Subscription  # adjust if needed
 from app.models.campaign_log import CampaignLog
 from app.utils import admin_required, run_in_background
 from app.auth.email import send_dynamic_template_email
+from app.email_service import send_prepared
+from app.email_outbox import (
+    campaign_unsent,
+    default_worker_id,
+    enqueue_many,
+    outbox_enabled,
+)
+from app.job_lock import acquire_job_lock, refresh_job_lock, release_job_lock
+from app.progress_channel import progress_channel
+from app.services.entitlements import active_until
 from . import admin_bp
-from .importer import import_questions_from_csv_file
+from .importer import import_questions_from_file, IMPORT_MODES
+from .exporter import EXPORT_FORMATS, export_questions, export_filename
+from .readers import supported_extensions, file_extension
+from .batch_import import import_questions_from_zip, stage_upload, staged_upload_path
+from .campaigns import CampaignSender, DeliveryLedger, count_recipients, iter_recipients
+from .campaign_templates import CompiledCampaign, CompiledContent
 
 
-ALLOWED_EXTENSIONS = {"csv"}
+# csv, jsonl, xlsx, parquet (see app/admin/readers.py), plus zip batches
+ALLOWED_EXTENSIONS = supported_extensions() | {"zip"}
 
 
 def allowed_file(filename: str) -> bool:
@@ -121,20 +139,10 @@ def manually_activate_subscription(user_id: int):
     payment_reference = (request.form.get("payment_reference") or "").strip()
     now = datetime.utcnow()
 
-    existing_active = (
-        Subscription.query
-        .filter(
-            Subscription.user_id == user.id,
-            Subscription.is_confirmed.is_(True),
-            Subscription.expires_at.isnot(None),
-            Subscription.expires_at > now,
-        )
-        .order_by(Subscription.expires_at.desc())
-        .first()
-    )
-    if existing_active:
+    until = active_until(user.id, refresh=True)
+    if until and until > now:
         flash(
-            f"{user.email} already has active access until {existing_active.expires_at.strftime('%Y-%m-%d')}.",
+            f"{user.email} already has active access until {until.strftime('%Y-%m-%d')}.",
             "warning",
         )
         return redirect(url_for("admin.manage_subscriptions", q=user.email))
@@ -172,6 +180,7 @@ def manually_activate_subscription(user_id: int):
     subscription.set_expiration(days=days)
 
     try:
+        # Committing invalidates the user's cached entitlement everywhere.
         db.session.commit()
 
         # Give referral bonus once. The service already prevents duplicate earning per subscription.
@@ -221,6 +230,7 @@ def manually_deactivate_subscription(user_id: int):
     active_sub.expires_at = now
 
     try:
+        # Committing invalidates the user's cached entitlement everywhere.
         db.session.commit()
         flash(f"Premium access deactivated for {user.email}.", "success")
     except Exception as e:
@@ -240,17 +250,25 @@ def upload_questions():
 
     file = request.files.get("file")
     if not file or not file.filename:
-        flash("Please select a CSV file.", "warning")
+        flash("Please select a question file.", "warning")
         return redirect(url_for("admin.upload_questions"))
 
     if not allowed_file(file.filename):
-        flash("Only .csv files are allowed.", "danger")
+        allowed = ", ".join(f".{ext}" for ext in sorted(ALLOWED_EXTENSIONS))
+        flash(f"Only {allowed} files are allowed.", "danger")
         return redirect(url_for("admin.upload_questions"))
 
     filename = secure_filename(file.filename)
 
+    import_mode = (request.form.get("import_mode") or "insert").strip().lower()
+    if import_mode not in IMPORT_MODES:
+        import_mode = "insert"
+
+    if file_extension(filename) == "zip":
+        return _upload_question_zip(file, filename, import_mode)
+
     try:
-        summary = import_questions_from_csv_file(file)
+        summary = import_questions_from_file(file, mode=import_mode, filename=filename)
     except Exception as e:
         flash(f"Import failed: {e}", "danger")
         return redirect(url_for("admin.upload_questions"))
@@ -263,194 +281,373 @@ def upload_questions():
     return render_template("admin/upload_questions.html", summary=summary, filename=filename)
 
 
+def _upload_question_zip(file, filename: str, import_mode: str):
+    """Validate (dry run) or import a zip of question files."""
+    dry_run = request.form.get("dry_run") == "1"
+    token = None
+
+    try:
+        if dry_run:
+            token = stage_upload(file)
+            report = import_questions_from_zip(staged_upload_path(token), mode=import_mode, dry_run=True)
+        else:
+            report = import_questions_from_zip(file.stream, mode=import_mode, dry_run=False)
+    except Exception as e:
+        current_app.logger.exception("Zip question import failed")
+        flash(f"Import failed: {e}", "danger")
+        return redirect(url_for("admin.upload_questions"))
+
+    if report["errors"]:
+        flash(f"Could not process {filename}. See details below.", "danger")
+    elif dry_run:
+        flash(f"Dry run complete for {filename}. Nothing was written yet.", "info")
+    elif report["has_row_errors"]:
+        flash(f"Imported {filename} with row errors. See details below.", "warning")
+    else:
+        flash(f"✅ Import successful: {filename}", "success")
+
+    return render_template(
+        "admin/upload_questions.html",
+        batch_report=report,
+        filename=filename,
+        batch_token=token if dry_run and not report["errors"] else None,
+    )
+
+
+@admin_bp.route("/upload-questions/confirm", methods=["POST"])
+@login_required
+@admin_required
+def confirm_question_upload():
+    """Commit a zip that was checked with a dry run, in one transaction."""
+    token = (request.form.get("token") or "").strip()
+    filename = secure_filename(request.form.get("filename") or "") or "upload.zip"
+    path = staged_upload_path(token)
+
+    if not path:
+        flash("That upload has expired. Please upload the zip again.", "warning")
+        return redirect(url_for("admin.upload_questions"))
+
+    import_mode = (request.form.get("import_mode") or "insert").strip().lower()
+    if import_mode not in IMPORT_MODES:
+        import_mode = "insert"
+
+    try:
+        report = import_questions_from_zip(path, mode=import_mode, dry_run=False)
+    except Exception as e:
+        current_app.logger.exception("Confirmed zip question import failed")
+        flash(f"Import failed: {e}", "danger")
+        return redirect(url_for("admin.upload_questions"))
+
+    if not report["errors"]:
+        os.remove(path)
+
+    if report["errors"]:
+        flash(f"Import of {filename} failed. Nothing was written.", "danger")
+    elif report["has_row_errors"]:
+        flash(f"Imported {filename} with row errors. See details below.", "warning")
+    else:
+        flash(f"✅ Import successful: {filename}", "success")
+
+    return render_template("admin/upload_questions.html", batch_report=report, filename=filename)
+
+
+@admin_bp.route("/questions/export", methods=["GET"])
+@login_required
+@admin_required
+def export_questions_file():
+    """Stream the question bank in the importer's schema (CSV or JSONL)."""
+    fmt = (request.args.get("format") or "csv").strip().lower()
+    if fmt not in EXPORT_FORMATS:
+        fmt = "csv"
+
+    band = (request.args.get("band") or "").strip() or None
+    question_type = (request.args.get("qt") or "").strip() or None
+    compress = (request.args.get("gzip") or "").strip().lower() in {"1", "true", "on", "yes"}
+
+    filename = secure_filename(export_filename(fmt, band, question_type, compress))
+
+    if compress:
+        mimetype = "application/gzip"
+    elif fmt == "jsonl":
+        mimetype = "application/x-ndjson"
+    else:
+        mimetype = "text/csv"
+
+    return Response(
+        stream_with_context(
+            export_questions(
+                fmt=fmt,
+                band=band,
+                question_type=question_type,
+                compress=compress,
+            )
+        ),
+        mimetype=mimetype,
+        headers={"Content-Disposition": f"attachment; filename={filename}"},
+    )
+
+
 
 def _render_campaign_content(content: str, **values) -> str:
     """Replace only approved dashboard placeholders in campaign HTML."""
-    rendered = content or ""
-    for key, value in values.items():
-        rendered = rendered.replace(f"[[{key}]]", str(value or ""))
-    return rendered
-
-
-
-def _send_campaign_job(
-    campaign_id: int,
-    target: str,
-    limit: int,
-    app_name: str,
-    sender_name: str,
-    dashboard_link: str,
-    subscribe_link: str,
-    subscriber_subject: str,
-    subscriber_content: str,
-    non_subscriber_subject: str,
-    non_subscriber_content: str,
-) -> None:
+    return CompiledContent(content, values, variables=()).render()
+
+
+
+# Seconds between database checkpoints of a running campaign.
+DEFAULT_CHECKPOINT_SECONDS = 15
+
+# An SSE progress stream ends after this long; the browser reconnects.
+DEFAULT_STREAM_SECONDS = 300
+
+
+class _CampaignLockLost(RuntimeError):
+    pass
+
+
+def _campaign_key(campaign_id: int) -> str:
+    """DeliveryLedger key of a dashboard campaign; also names its job lock."""
+    return f"campaign-{campaign_id}"
+
+
+def _send_campaign_job(campaign_id: int, resume: bool = False) -> None:
     """
     Background worker for campaigns.
-    Uses local template IDs:
-      - active_subscribers
-      - active_non_subscribers
+
+    Settings come from CampaignLog.payload. Recipients are streamed
+    newest-first and the log is checkpointed as they are processed,
+    so resume=True continues after the last checkpoint.
     """
-    log = CampaignLog.query.get(campaign_id)
+    log = db.session.get(CampaignLog, campaign_id)
     if not log:
         current_app.logger.error("CampaignLog not found: id=%s", campaign_id)
         return
 
+    # Taken before the log or the progress channel is touched, so a run
+    # refused here cannot reset, fail or blank out a campaign that is
+    # still being sent. The owner is per run: two runs in one process
+    # must not share the lock.
+    lock_name = f"campaign:{_campaign_key(campaign_id)}"
+    owner = f"{default_worker_id()}:{uuid.uuid4().hex}"
+    if not acquire_job_lock(lock_name, owner):
+        current_app.logger.warning(
+            "Campaign %s not started: another run is sending it.", campaign_id
+        )
+        db.session.remove()
+        return
+
+    channel = progress_channel()
+    channel_key = f"campaign-{campaign_id}"
+    # Drop anything left by a run that died before clearing it.
+    channel.clear(channel_key)
+
     try:
+        settings = json.loads(log.payload or "{}")
+        target = settings.get("target", log.target)
+        limit = settings.get("limit", log.limit_each) or 0
+        app_name = settings.get("app_name", "")
+        sender_name = settings.get("sender_name", "")
+        dashboard_link = settings.get("dashboard_link", "")
+        subscribe_link = settings.get("subscribe_link", "")
+
         current_app.logger.info(
-            "Campaign %s thread started. target=%s limit=%s",
-            campaign_id, target, limit
+            "Campaign %s thread started. target=%s limit=%s resume_after=%s",
+            campaign_id, target, limit, log.last_user_id if resume else None
         )
 
+        now = datetime.utcnow()
+
+        if not resume:
+            log.total_sent = 0
+            log.total_failed = 0
+            log.last_user_id = None
+
         log.status = "running"
-        log.started_at = datetime.utcnow()
+        log.started_at = log.started_at if resume and log.started_at else now
+        log.finished_at = None
         log.last_error = None
+        log.updated_at = now
+
+        checkpoint = log.last_user_id
+        wanted = ("subscribers", "non_subscribers") if target == "both" else (target,)
+
+        totals = count_recipients(target, now)
+        log.total_targeted = sum(
+            min(totals[segment], limit) if limit else totals[segment]
+            for segment in wanted
+        )
+        # A resumed outbox campaign skips addresses it already queued.
+        queued_campaign_id = campaign_id if resume and outbox_enabled() else None
+        already_sent = (
+            count_recipients(
+                target, now, min_user_id=checkpoint, queued_campaign_id=queued_campaign_id
+            )
+            if checkpoint is not None or queued_campaign_id is not None
+            else None
+        )
         db.session.commit()
 
-        now = datetime.utcnow()
-        total_sent = 0
-        total_failed = 0
-        total_targeted = 0
-
-        def flush(force: bool = False) -> None:
-            if force or (total_sent + total_failed) % 10 == 0:
-                log.total_sent = total_sent
-                log.total_failed = total_failed
-                log.total_targeted = total_targeted
-                db.session.commit()
-
-        # Segment A: Active subscribers
-        if target in ("subscribers", "both"):
-            subs_users = (
-                db.session.query(User)
-                .join(Subscription, Subscription.user_id == User.id)
-                .filter(
-                    Subscription.is_confirmed.is_(True),
-                    Subscription.expires_at.isnot(None),
-                    Subscription.expires_at > now,
-                )
-                .distinct(User.id)
-                .order_by(User.id.desc())
-                .limit(limit)
-                .all()
+        recipients = iter_recipients(
+            target,
+            now,
+            before_user_id=checkpoint,
+            limit_each=limit,
+            already_sent=already_sent,
+            queued_campaign_id=queued_campaign_id,
+        )
+
+        # Compile each segment's email once; per recipient only the
+        # name changes.
+        values = {
+            "app_name": app_name,
+            "dashboard_link": dashboard_link,
+            "subscribe_link": subscribe_link,
+            "sender_name": sender_name,
+        }
+        segments = {
+            "subscribers": (
+                settings.get("subscriber_subject"),
+                settings.get("subscriber_content"),
+                dashboard_link,
+            ),
+            "non_subscribers": (
+                settings.get("non_subscriber_subject"),
+                settings.get("non_subscriber_content"),
+                subscribe_link,
+            ),
+        }
+        campaigns = {
+            segment: CompiledCampaign(
+                subject=subject,
+                content=content,
+                text_content=f"Hello [[first_name]] - {fallback_link}",
+                values=values,
+            )
+            for segment, (subject, content, fallback_link) in segments.items()
+            if segment in wanted
+        }
+
+        if outbox_enabled():
+            # Queue everything in one transaction; `flask email-worker`
+            # sends it and completes the CampaignLog.
+            def queued_messages():
+                for segment, _, email, username in recipients:
+                    campaign = campaigns[segment]
+                    first_name = username or "User"
+                    yield {
+                        "to_email": email,
+                        "subject": campaign.subject,
+                        "html_content": campaign.render_html(first_name=first_name),
+                        "text_content": campaign.render_text(first_name=first_name),
+                    }
+
+            queued = enqueue_many(queued_messages(), campaign_id=campaign_id)
+            if not queued:
+                log.mark_done()
+            db.session.commit()
+
+            current_app.logger.info("Campaign %s queued in outbox: messages=%s", campaign_id, queued)
+            return
+
+        def deliver(recipient, provider: str) -> None:
+            segment, _, email, username = recipient
+            send_prepared(
+                campaigns[segment].build(email, first_name=username or "User"),
+                providers=[provider],
             )
 
-            current_app.logger.info("Campaign %s: subs_users=%s", campaign_id, len(subs_users))
-
-            total_targeted += len(subs_users)
-            flush(force=True)
-
-            for u in subs_users:
-                try:
-                    personalised_content = _render_campaign_content(
-                        subscriber_content,
-                        first_name=u.username or "User",
-                        app_name=app_name,
-                        dashboard_link=dashboard_link,
-                        subscribe_link=subscribe_link,
-                        sender_name=sender_name,
-                    )
-                    send_dynamic_template_email(
-                        to_email=u.email,
-                        template_id="custom_campaign",
-                        dynamic_data={
-                            "subject": subscriber_subject,
-                            "email_content": personalised_content,
-                            "text_fallback": f"Hello {u.username or 'User'} - {dashboard_link}",
-                        },
-                    )
-                    total_sent += 1
-                except Exception as e:
-                    current_app.logger.exception(
-                        "Subscriber campaign failed: user_id=%s email=%s",
-                        u.id, u.email
-                    )
-                    total_failed += 1
-                    log.last_error = str(e)
-
-                flush()
-                time.sleep(0.15)
-
-        # Segment B: Verified users who are NOT active subscribers
-        if target in ("non_subscribers", "both"):
-            active_sub_exists = (
-                db.session.query(Subscription.id)
-                .filter(
-                    Subscription.user_id == User.id,
-                    Subscription.is_confirmed.is_(True),
-                    Subscription.expires_at.isnot(None),
-                    Subscription.expires_at > now,
-                )
-                .exists()
+        def on_failure(recipient, error: Exception) -> None:
+            ledger.record_failure(recipient, error)
+            segment, user_id, email, _ = recipient
+            current_app.logger.error(
+                "Campaign %s send failed: segment=%s user_id=%s email=%s err=%s",
+                campaign_id, segment, user_id, email, error
             )
 
-            non_sub_users = (
-                db.session.query(User)
-                .filter(
-                    User.is_email_verified.is_(True),
-                    ~active_sub_exists,
-                )
-                .order_by(User.id.desc())
-                .limit(limit)
-                .all()
+        base_sent, base_failed = log.total_sent or 0, log.total_failed or 0
+        targeted = log.total_targeted
+
+        # Live progress goes to the progress channel on every update
+        # (see campaign_progress_stream); the database is only written
+        # every CAMPAIGN_CHECKPOINT_SECONDS and at the end.
+        checkpoint_seconds = current_app.config.get(
+            "CAMPAIGN_CHECKPOINT_SECONDS", DEFAULT_CHECKPOINT_SECONDS
+        )
+        last_checkpoint = time.monotonic()
+
+        def save_checkpoint(progress) -> None:
+            ledger.flush()
+            if not refresh_job_lock(lock_name, owner):
+                raise _CampaignLockLost("Another process took over this campaign.")
+            log.total_sent = base_sent + progress.sent
+            log.total_failed = base_failed + progress.failed
+            log.last_error = progress.last_error
+            if progress.checkpoint is not None:
+                log.last_user_id = progress.checkpoint
+            log.updated_at = datetime.utcnow()
+            db.session.commit()
+
+        def on_progress(progress) -> None:
+            nonlocal last_checkpoint
+
+            channel.publish(channel_key, {
+                "id": campaign_id,
+                "status": "running",
+                "sent": base_sent + progress.sent,
+                "failed": base_failed + progress.failed,
+                "targeted": targeted,
+                "rate": round(progress.per_second, 1),
+                "by_provider": progress.by_provider,
+                "last_error": progress.last_error,
+            })
+
+            if time.monotonic() - last_checkpoint >= checkpoint_seconds:
+                save_checkpoint(progress)
+                last_checkpoint = time.monotonic()
+
+        # The ledger skips users a crashed run already sent to, and the
+        # lock stops a resume from overlapping a run that is still alive.
+        ledger = DeliveryLedger(_campaign_key(campaign_id))
+
+        try:
+            progress = CampaignSender().run(
+                ledger.claim(recipients),
+                deliver,
+                on_progress=on_progress,
+                on_failure=on_failure,
+                on_success=ledger.record_success,
+                checkpoint_key=lambda recipient: recipient.user_id,
             )
+            save_checkpoint(progress)
+        finally:
+            ledger.flush()
 
-            current_app.logger.info("Campaign %s: non_sub_users=%s", campaign_id, len(non_sub_users))
-
-            total_targeted += len(non_sub_users)
-            flush(force=True)
-
-            for u in non_sub_users:
-                try:
-                    personalised_content = _render_campaign_content(
-                        non_subscriber_content,
-                        first_name=u.username or "User",
-                        app_name=app_name,
-                        dashboard_link=dashboard_link,
-                        subscribe_link=subscribe_link,
-                        sender_name=sender_name,
-                    )
-                    send_dynamic_template_email(
-                        to_email=u.email,
-                        template_id="custom_campaign",
-                        dynamic_data={
-                            "subject": non_subscriber_subject,
-                            "email_content": personalised_content,
-                            "text_fallback": f"Hello {u.username or 'User'} - {subscribe_link}",
-                        },
-                    )
-                    total_sent += 1
-                except Exception as e:
-                    current_app.logger.exception(
-                        "Non-subscriber campaign failed: user_id=%s email=%s",
-                        u.id, u.email
-                    )
-                    total_failed += 1
-                    log.last_error = str(e)
-
-                flush()
-                time.sleep(0.15)
-
-        log.total_sent = total_sent
-        log.total_failed = total_failed
-        log.total_targeted = total_targeted
         log.status = "completed"
         log.finished_at = datetime.utcnow()
         db.session.commit()
 
         current_app.logger.info(
-            "Campaign %s finished: status=%s sent=%s failed=%s targeted=%s last_error=%s",
-            campaign_id, log.status, log.total_sent, log.total_failed, log.total_targeted, log.last_error
+            "Campaign %s finished: status=%s sent=%s failed=%s targeted=%s "
+            "rate=%.1f/s providers=%s last_error=%s",
+            campaign_id, log.status, log.total_sent, log.total_failed, log.total_targeted,
+            progress.per_second, progress.by_provider, log.last_error
         )
 
+    except _CampaignLockLost as e:
+        # The run that took the lock owns the log now.
+        current_app.logger.warning("Campaign %s stopped: %s", campaign_id, e)
+        db.session.rollback()
     except Exception as e:
         current_app.logger.exception("Campaign job crashed: %s", e)
+        db.session.rollback()
         log.status = "failed"
         log.last_error = str(e)
         log.finished_at = datetime.utcnow()
         db.session.commit()
     finally:
+        release_job_lock(lock_name, owner)
+        # Readers now get the final state from the database.
+        channel.clear(channel_key)
         db.session.remove()
 
 
@@ -475,12 +672,13 @@ def send_campaigns():
     if target not in ("subscribers", "non_subscribers", "both"):
         target = "both"
 
+    # Per-segment cap; 0 sends to the whole segment.
     cfg_limit = current_app.config.get("WEEKLY_EMAIL_LIMIT", 200)
     try:
         cfg_limit = int(cfg_limit)
     except Exception:
         cfg_limit = 200
-    limit = min(max(cfg_limit, 1), 500)
+    limit = max(cfg_limit, 0)
 
     app_name = current_app.config.get("APP_NAME", "FOSTech CBT App")
     sender_name = current_app.config.get("SENDER_NAME", "Felix")
@@ -511,29 +709,149 @@ def send_campaigns():
         status="queued",
         limit_each=limit,
         created_at=datetime.utcnow(),
+        # Everything the job needs, so a crashed campaign can be resumed.
+        payload=json.dumps(
+            {
+                "target": target,
+                "limit": limit,
+                "app_name": app_name,
+                "sender_name": sender_name,
+                "dashboard_link": dashboard_link,
+                "subscribe_link": subscribe_link,
+                "subscriber_subject": subscriber_subject,
+                "subscriber_content": subscriber_content,
+                "non_subscriber_subject": non_subscriber_subject,
+                "non_subscriber_content": non_subscriber_content,
+            }
+        ),
     )
     db.session.add(log)
     db.session.commit()
 
-    run_in_background(
-        _send_campaign_job,
-        log.id,
-        target,
-        limit,
-        app_name,
-        sender_name,
-        dashboard_link,
-        subscribe_link,
-        subscriber_subject,
-        subscriber_content,
-        non_subscriber_subject,
-        non_subscriber_content,
-    )
+    run_in_background(_send_campaign_job, log.id)
 
     flash(f"Campaign queued (ID #{log.id}). Sending in background…", "success")
     return redirect(url_for("dashboard.index"))
 
 
+@admin_bp.route("/campaigns/<int:campaign_id>/resume", methods=["POST"])
+@login_required
+@admin_required
+def resume_campaign(campaign_id: int):
+    log = db.session.get(CampaignLog, campaign_id)
+
+    if not log or not log.payload:
+        flash("Campaign not found or cannot be resumed.", "danger")
+        return redirect(url_for("dashboard.index"))
+
+    if not log.can_resume():
+        flash("Only failed or stalled campaigns can be resumed.", "warning")
+        return redirect(url_for("dashboard.index"))
+
+    unsent = campaign_unsent(log.id)
+    if unsent:
+        flash(
+            f"Campaign #{log.id} still has {unsent} queued message(s); "
+            "the email worker sends them, so it cannot be resumed.",
+            "warning",
+        )
+        return redirect(url_for("dashboard.index"))
+
+    log.status = "queued"
+    log.updated_at = datetime.utcnow()
+    db.session.commit()
+
+    run_in_background(_send_campaign_job, log.id, resume=True)
+
+    flash(f"Campaign #{log.id} resuming after user #{log.last_user_id or '—'}.", "success")
+    return redirect(url_for("dashboard.index"))
+
+
+def _campaign_state(campaign_id: int):
+    """Campaign progress as stored in the database (the channel fallback)."""
+    row = (
+        db.session.query(
+            CampaignLog.status,
+            CampaignLog.total_sent,
+            CampaignLog.total_failed,
+            CampaignLog.total_targeted,
+            CampaignLog.last_error,
+        )
+        .filter(CampaignLog.id == campaign_id)
+        .first()
+    )
+    # Don't hold a transaction open between polls.
+    db.session.rollback()
+
+    if row is None:
+        return None
+
+    return {
+        "id": campaign_id,
+        "status": row.status,
+        "sent": row.total_sent or 0,
+        "failed": row.total_failed or 0,
+        "targeted": row.total_targeted or 0,
+        "last_error": row.last_error,
+    }
+
+
+@admin_bp.route("/campaigns/<int:campaign_id>/progress/stream", methods=["GET"])
+@login_required
+@admin_required
+def campaign_progress_stream(campaign_id: int):
+    """
+    Server-Sent Events: a "progress" event whenever the campaign's
+    counters change, until it completes or fails.
+
+    Reads the progress channel the sending job publishes to, and falls
+    back to the CampaignLog row (e.g. for outbox campaigns, which
+    `flask email-worker` updates). Each stream holds a server thread, so it
+    closes after CAMPAIGN_STREAM_SECONDS and the browser reconnects.
+    """
+    state = _campaign_state(campaign_id)
+    if state is None:
+        return Response("Campaign not found.", status=404, mimetype="text/plain")
+
+    channel = progress_channel()
+    key = f"campaign-{campaign_id}"
+    stream_seconds = current_app.config.get("CAMPAIGN_STREAM_SECONDS", DEFAULT_STREAM_SECONDS)
+    poll_seconds = 2.0
+
+    def events():
+        deadline = time.monotonic() + stream_seconds
+        last_state = None
+        last_published = 0.0
+        last_event = time.monotonic()
+
+        yield "retry: 3000\n\n"
+
+        current = state
+        while True:
+            if current != last_state:
+                last_state = current
+                last_event = time.monotonic()
+                yield f"event: progress\ndata: {json.dumps(current)}\n\n"
+            elif time.monotonic() - last_event >= 15:
+                last_event = time.monotonic()
+                yield ": keepalive\n\n"
+
+            if current["status"] in ("completed", "failed") or time.monotonic() >= deadline:
+                return
+
+            published = channel.wait(key, after=last_published, timeout=poll_seconds)
+            if published:
+                last_published = published.pop("published_at")
+                current = published
+            else:
+                current = _campaign_state(campaign_id) or current
+
+    response = Response(stream_with_context(events()), mimetype="text/event-stream")
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["X-Accel-Buffering"] = "no"
+    return response
+
+
 @admin_bp.route("/campaigns/test", methods=["POST"])
 @login_required
 @admin_required
@@ -0,0 +1,93 @@
+# app/admin/suppressions.py
+import csv
+import io
+
+from flask import render_template, request, redirect, url_for, flash, current_app
+from flask_login import login_required, current_user
+from sqlalchemy import func
+
+from app.extensions import db
+from app.models.suppressed_email import SuppressedEmail
+from app.suppression import REASONS, import_suppressions
+from app.utils import admin_required
+
+from . import admin_bp
+
+
+def _first_column(text: str):
+    """The first column of each CSV/text line (header rows are skipped as invalid)."""
+    for row in csv.reader(io.StringIO(text)):
+        if row:
+            yield row[0]
+
+
+@admin_bp.route("/suppressions", methods=["GET"])
+@login_required
+@admin_required
+def suppressions():
+    q = (request.args.get("q") or "").strip().lower()
+
+    query = SuppressedEmail.query
+    if q:
+        query = query.filter(SuppressedEmail.email.contains(q))
+
+    rows = query.order_by(SuppressedEmail.id.desc()).limit(200).all()
+    counts = dict(
+        db.session.query(SuppressedEmail.reason, func.count())
+        .group_by(SuppressedEmail.reason)
+        .all()
+    )
+
+    return render_template(
+        "admin/suppressions.html",
+        suppressions=rows,
+        counts=counts,
+        total=sum(counts.values()),
+        reasons=REASONS,
+        q=q,
+    )
+
+
+@admin_bp.route("/suppressions/import", methods=["POST"])
+@login_required
+@admin_required
+def import_suppression_list():
+    reason = (request.form.get("reason") or "").strip().lower()
+    if reason not in REASONS:
+        flash("Invalid reason.", "danger")
+        return redirect(url_for("admin.suppressions"))
+
+    text = request.form.get("emails") or ""
+    file = request.files.get("file")
+    if file and file.filename:
+        text += "\n" + file.read().decode("utf-8-sig", "replace")
+
+    added, skipped = import_suppressions(
+        _first_column(text),
+        reason=reason,
+        source="import",
+    )
+
+    current_app.logger.info(
+        f"Admin {current_user.id} imported suppressions: added={added} skipped={skipped} reason={reason}"
+    )
+    flash(f"Suppressed {added} address(es); {skipped} skipped (invalid or already listed).", "success")
+    return redirect(url_for("admin.suppressions"))
+
+
+@admin_bp.route("/suppressions/<int:suppression_id>/delete", methods=["POST"])
+@login_required
+@admin_required
+def delete_suppression(suppression_id: int):
+    row = db.session.get(SuppressedEmail, suppression_id)
+    if row is None:
+        flash("Suppression not found.", "warning")
+        return redirect(url_for("admin.suppressions"))
+
+    email = row.email
+    db.session.delete(row)
+    db.session.commit()
+
+    current_app.logger.info(f"Admin {current_user.id} removed suppression for {email}")
+    flash(f"{email} can receive email again.", "success")
+    return redirect(url_for("admin.suppressions"))
@@ -4,6 +4,7 @@ from decimal import Decimal, ROUND_HALF_UP
 
 from flask import render_template, request, redirect, url_for, flash, current_app
 from flask_login import login_required, current_user
+from sqlalchemy.orm import joinedload
 
 from app.extensions import db
 from app.models.user import User
@@ -25,6 +26,7 @@ def _money(v) -> Decimal:
 def withdrawals():
     withdrawals = (
         WithdrawalRequest.query
+        .options(joinedload(WithdrawalRequest.user))
         .order_by(WithdrawalRequest.created_at.desc())
         .limit(200)
         .all()
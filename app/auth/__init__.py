@@ -1,6 +1,6 @@
-from flask import Blueprint
-from app.models.user import User
+from flask import Blueprint, session
 from app.extensions import login_manager
+from .session_cache import load_session_user
 
 auth_bp = Blueprint('auth', __name__, url_prefix='/auth')
 
@@ -9,4 +9,6 @@ from . import routes  # noqa: E402,F401  (ensures routes are imported)
 
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.get(int(user_id))
+    # Only the columns the per-request hooks need, cached per worker;
+    # see app/auth/session_cache.py.
+    return load_session_user(int(user_id), session.get("session_token"))
@@ -2,8 +2,16 @@ import logging
 from datetime import datetime
 
 from flask import current_app, render_template, url_for
+from sqlalchemy import or_
 
 from app.email_service import send_email  # SMTP sender
+from app.email_outbox import (
+    PRIORITY_CAMPAIGN,
+    PRIORITY_TRANSACTIONAL,
+    enqueue_email,
+    outbox_enabled,
+    send_in_background,
+)
 
 
 logger = logging.getLogger(__name__)
@@ -25,11 +33,48 @@ def _get_sender() -> str:
     return sender
 
 
-def _send_message(to_email: str, subject: str, html_content: str, text_content: str | None = None) -> None:
+def _send_message(
+    to_email: str,
+    subject: str,
+    html_content: str,
+    text_content: str | None = None,
+    providers: list[str] | None = None,
+    priority: int = PRIORITY_CAMPAIGN,
+) -> int | None:
     """
     Sends an email through the SMTP-based send_email helper.
     Raises on failure.
+
+    With EMAIL_OUTBOX_ENABLED the message is queued for
+    `flask email-worker` instead of being sent inline.
+    Transactional mail (priority=PRIORITY_TRANSACTIONAL) never blocks
+    the request: it is queued, and sent on a background thread when no
+    worker runs. Queued messages return their email_outbox id.
+
+    providers limits delivery to those providers (default: EMAIL_PROVIDER_CHAIN).
     """
+    queued = outbox_enabled()
+    transactional = priority >= PRIORITY_TRANSACTIONAL
+
+    if providers is None and (queued or transactional):
+        row = enqueue_email(
+            to_email=to_email,
+            subject=subject,
+            html_content=html_content,
+            text_content=text_content,
+            priority=priority,
+        )
+        if not queued:
+            send_in_background(row)
+
+        current_app.logger.info(
+            "Email queued. outbox_id=%s to=%s subject=%s",
+            row.id,
+            to_email,
+            subject,
+        )
+        return row.id
+
     try:
         sender = _get_sender()
 
@@ -41,6 +86,7 @@ def _send_message(to_email: str, subject: str, html_content: str, text_content:
                 subject=subject,
                 html_content=html_content,
                 text_content=text_content,
+                providers=providers,
                 #from_email=sender,
             )
         except TypeError:
@@ -52,6 +98,7 @@ def _send_message(to_email: str, subject: str, html_content: str, text_content:
             to_email,
             subject,
         )
+        return None
 
     except Exception as e:
         logger.exception(
@@ -67,9 +114,9 @@ def _send_message(to_email: str, subject: str, html_content: str, text_content:
 # 1) Existing emails
 # ---------------------------
 
-def send_confirmation_email(user) -> None:
+def send_confirmation_email(user) -> int | None:
     """
-    Sends email confirmation code + link.
+    Queues email confirmation code + link; returns the email_outbox id.
     """
     confirm_url = url_for("auth.confirm_email", code=user.email_confirm_code, _external=True)
 
@@ -89,17 +136,18 @@ def send_confirmation_email(user) -> None:
         f"This code expires in 10 minutes."
     )
 
-    _send_message(
+    return _send_message(
         to_email=user.email,
         subject="Confirm your email",
         html_content=html_content,
         text_content=text_content,
+        priority=PRIORITY_TRANSACTIONAL,
     )
 
 
-def send_password_reset_email(user) -> None:
+def send_password_reset_email(user) -> int | None:
     """
-    Sends password reset link.
+    Queues password reset link; returns the email_outbox id.
     """
     reset_url = url_for("auth.reset_password", token=user.reset_token, _external=True)
 
@@ -117,11 +165,12 @@ def send_password_reset_email(user) -> None:
         f"This link expires in 30 minutes."
     )
 
-    _send_message(
+    return _send_message(
         to_email=user.email,
         subject="Reset your password",
         html_content=html_content,
         text_content=text_content,
+        priority=PRIORITY_TRANSACTIONAL,
     )
 
 
@@ -153,10 +202,9 @@ SUBJECT_MAP = {
 }
 
 
-def send_dynamic_template_email(to_email: str, template_id: str, dynamic_data: dict) -> None:
+def render_template_email(template_id: str, dynamic_data: dict) -> tuple[str, str, str | None]:
     """
-    Local-template email sender.
-    'template_id' is a local key, not a SendGrid template id.
+    Render a local template; returns (subject, html, text).
     """
     template_path = TEMPLATE_MAP.get(template_id)
     if not template_path:
@@ -168,11 +216,27 @@ def send_dynamic_template_email(to_email: str, template_id: str, dynamic_data: d
     html = render_template(template_path, **dynamic_data)
     text = dynamic_data.get("text_fallback")
 
+    return subject, html, text
+
+
+def send_dynamic_template_email(
+    to_email: str,
+    template_id: str,
+    dynamic_data: dict,
+    providers: list[str] | None = None,
+) -> None:
+    """
+    Local-template email sender.
+    'template_id' is a local key, not a SendGrid template id.
+    """
+    subject, html, text = render_template_email(template_id, dynamic_data)
+
     _send_message(
         to_email=to_email,
         subject=subject,
         html_content=html,
         text_content=text,
+        providers=providers,
     )
 
 
@@ -182,20 +246,14 @@ def send_dynamic_template_email(to_email: str, template_id: str, dynamic_data: d
 
 def get_active_subscribers(db, User, Subscription, now=None, limit=500):
     """
-    Active subscribers = confirmed + expires_at in future.
-    Returns a list of User objects.
+    Active subscribers = premium_until in the future (kept in step with
+    confirmed subscriptions). Returns a list of User objects.
     """
     now = now or datetime.utcnow()
 
     return (
         db.session.query(User)
-        .join(Subscription, Subscription.user_id == User.id)
-        .filter(
-            Subscription.is_confirmed.is_(True),
-            Subscription.expires_at.isnot(None),
-            Subscription.expires_at > now,
-        )
-        .distinct()
+        .filter(User.premium_until > now)
         .order_by(User.id.desc())
         .limit(limit)
         .all()
@@ -209,22 +267,11 @@ def get_active_users_not_subscribers(db, User, Subscription, now=None, limit=500
     """
     now = now or datetime.utcnow()
 
-    active_sub_exists = (
-        db.session.query(Subscription.id)
-        .filter(
-            Subscription.user_id == User.id,
-            Subscription.is_confirmed.is_(True),
-            Subscription.expires_at.isnot(None),
-            Subscription.expires_at > now,
-        )
-        .exists()
-    )
-
     return (
         db.session.query(User)
         .filter(
             User.is_email_verified.is_(True),
-            ~active_sub_exists,
+            or_(User.premium_until.is_(None), User.premium_until <= now),
         )
         .order_by(User.id.desc())
         .limit(limit)
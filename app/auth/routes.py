@@ -1,4 +1,4 @@
-from flask import render_template, redirect, url_for, request, flash, current_app, session
+from flask import render_template, redirect, url_for, request, flash, current_app, session, jsonify
 from werkzeug.security import generate_password_hash, check_password_hash
 from flask_login import login_user, logout_user, current_user, login_required
 from ..extensions import db
@@ -7,6 +7,7 @@ from . import auth_bp
 from .forms import RegisterForm, LoginForm, ConfirmEmailForm
 from .. utils import generate_code, code_is_expired, generate_referral_code, delete_if_expired_unverified, generate_unique_referral_code
 from .email import send_confirmation_email, send_password_reset_email
+from app.email_outbox import delivery_status
 from app.auth.decorators import email_verified_required
 from datetime import timedelta, datetime
 import random
@@ -63,11 +64,11 @@ def register():
 
         session.pop("ref", None)  # ✅ prevent referral carrying over to future signups
 
-        # Send verification email
+        # Queue verification email (sent in the background)
         try:
-            send_confirmation_email(user)
+            session["confirmation_email_id"] = send_confirmation_email(user)
         except Exception:
-            current_app.logger.exception("Failed to send confirmation email")
+            current_app.logger.exception("Failed to queue confirmation email")
             flash("Account created, but we couldn't send the confirmation email now. Please try 'Resend confirmation'.", "warning")
 
         # Store email for verification step
@@ -168,7 +169,20 @@ def confirm_email():
         flash("Email verified successfully! You can now log in.", "success")
         return redirect(url_for("auth.login"))
 
-    return render_template("auth/confirm_email.html", form=form)
+    return render_template(
+        "auth/confirm_email.html",
+        form=form,
+        email_status=delivery_status(session.get("confirmation_email_id")),
+    )
+
+
+@auth_bp.route("/confirm-email/status")
+def confirmation_email_status():
+    """Delivery status of the last confirmation email, polled by the confirm page."""
+    if not session.get("verify_email"):
+        return jsonify({"status": None}), 404
+
+    return jsonify({"status": delivery_status(session.get("confirmation_email_id"))})
 
 
 # Resend Code
@@ -198,9 +212,9 @@ def resend_confirmation():
 
     db.session.commit()
 
-    # 🔥 SAFE email send
+    # 🔥 SAFE email send (queued; the confirm page shows delivery status)
     try:
-        send_confirmation_email(user)
+        session["confirmation_email_id"] = send_confirmation_email(user)
 
     except RuntimeError as e:
         flash(str(e), "danger")
@@ -228,8 +242,14 @@ def forgot_password():
         user.reset_token_expires = datetime.utcnow() + timedelta(minutes=30)
         db.session.commit()
 
-        send_password_reset_email(user)
-        flash("Password reset link sent. Check your email.", "success")
+        try:
+            send_password_reset_email(user)
+        except Exception:
+            current_app.logger.exception("Failed to queue password reset email")
+            flash("Unable to send email right now. Please try again later.", "danger")
+            return redirect(url_for("auth.forgot_password"))
+
+        flash("Password reset link is on its way. Check your email.", "success")
         return redirect(url_for("auth.login"))
 
     return render_template("auth/forgot_password.html")
@@ -0,0 +1,178 @@
+# app/auth/session_cache.py
+
+"""
+Cached user loading for authenticated requests.
+
+Every authenticated request runs the flask-login user loader, then
+enforce_single_session and require_email_verification, which only need
+a handful of columns. load_session_user() fetches just those columns
+(AUTH_COLUMNS) in one query and keeps them per worker for
+AUTH_CACHE_SECONDS, keyed by (user id, session token). current_user is
+then a SessionUser. Any other attribute (wallet_balance,
+subscriptions, ...) loads the full User row on first use, fresh for
+that request, so money and relationships are never served from cache.
+
+Cached entries are only valid for the current session epoch, a small
+file in the instance folder. It is replaced whenever one of the cached
+columns changes or a user is deleted. Logging in on another device
+changes current_session_token, so every worker on the host drops its
+entries and enforce_single_session sees the new token on the very next
+request. Workers on other hosts see it within AUTH_CACHE_SECONDS.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+from flask import current_app
+from flask_login import UserMixin
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import object_session
+
+from app.cache import MISSING, TTLCache, on_commit
+from app.extensions import db
+from app.models.user import User
+
+
+AUTH_COLUMNS = (
+    "id",
+    "username",
+    "email",
+    "is_admin",
+    "is_email_verified",
+    "current_session_token",
+)
+
+DEFAULT_CACHE_SECONDS = 5.0
+
+Epoch = Optional[Tuple[int, int]]
+
+# (user_id, session token) -> (epoch, column values, or None for no such user)
+_SESSIONS = TTLCache(DEFAULT_CACHE_SECONDS)
+
+
+class SessionUser(UserMixin):
+    """
+    current_user backed by the cached AUTH_COLUMNS.
+
+    Other attributes, and all assignments, go to the full User row,
+    loaded on first use.
+    """
+
+    def __init__(self, columns: Dict[str, Any]) -> None:
+        object.__setattr__(self, "_columns", dict(columns))
+        object.__setattr__(self, "_user", None)
+
+    @property
+    def user(self) -> User:
+        if self._user is None:
+            user = db.session.get(User, self._columns["id"])
+            if user is None:
+                raise LookupError(f"User {self._columns['id']} no longer exists.")
+            object.__setattr__(self, "_user", user)
+        return self._user
+
+    def __getattr__(self, name: str) -> Any:
+        columns = self.__dict__["_columns"]
+        if name in columns:
+            return columns[name]
+        if name.startswith("__"):
+            raise AttributeError(name)
+        return getattr(self.user, name)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        setattr(self.user, name, value)
+        if name in self._columns:
+            self._columns[name] = value
+
+    def get_id(self) -> str:
+        return str(self._columns["id"])
+
+    def __repr__(self) -> str:
+        return f"<SessionUser {self._columns['id']}>"
+
+
+# -----------------------------
+# Session epoch
+# -----------------------------
+
+def _epoch_path() -> str:
+    return os.path.join(current_app.instance_path, "session_epoch")
+
+
+def session_epoch() -> Epoch:
+    """Identifies the epoch file's current version; a stat, not a read."""
+    try:
+        stat = os.stat(_epoch_path())
+    except OSError:
+        return None
+    return (stat.st_ino, stat.st_mtime_ns)
+
+
+def bump_session_epoch() -> None:
+    """Invalidate every cached session on this host."""
+    _SESSIONS.clear()
+
+    path = _epoch_path()
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(str(os.getpid()))
+        # A new inode on every bump, so even a coarse mtime changes the epoch.
+        os.replace(tmp, path)
+    except OSError as exc:
+        current_app.logger.warning("Session epoch not bumped: %s", exc)
+
+
+# -----------------------------
+# Loading
+# -----------------------------
+
+def load_session_user(user_id: int, session_token: Optional[str]) -> Optional[SessionUser]:
+    key = (user_id, session_token)
+    epoch = session_epoch()
+    if epoch is None:
+        bump_session_epoch()
+        epoch = session_epoch()
+
+    entry = _SESSIONS.get(key)
+    if entry is not MISSING and entry[0] == epoch and epoch is not None:
+        columns = entry[1]
+    else:
+        row = (
+            db.session.query(*(getattr(User, name) for name in AUTH_COLUMNS))
+            .filter(User.id == user_id)
+            .first()
+        )
+        columns = dict(row._mapping) if row is not None else None
+        _SESSIONS.set(
+            key,
+            (epoch, columns),
+            float(current_app.config.get("AUTH_CACHE_SECONDS", DEFAULT_CACHE_SECONDS)),
+        )
+
+    return SessionUser(columns) if columns is not None else None
+
+
+# -----------------------------
+# Invalidation
+# -----------------------------
+
+def _bump_on_commit(target: User) -> None:
+    session = object_session(target)
+    if session is not None:
+        on_commit(session, "session-epoch", bump_session_epoch)
+
+
+@event.listens_for(User, "after_update")
+def _user_updated(mapper, connection, target) -> None:
+    state = inspect(target)
+    if any(state.attrs[name].history.has_changes() for name in AUTH_COLUMNS):
+        _bump_on_commit(target)
+
+
+@event.listens_for(User, "after_delete")
+def _user_deleted(mapper, connection, target) -> None:
+    _bump_on_commit(target)
@@ -0,0 +1,360 @@
+# app/bench.py
+
+"""
+Benchmarks of the hot paths, for `flask bench run`.
+
+Run them against a scratch database filled by `flask bench seed`
+(app/sample_data.py), e.g.
+
+    export DATABASE_URL=sqlite:////tmp/bench.db      # or a local Postgres
+    flask bench seed --users 2000 --questions-per-band 8000
+    flask bench run --iterations 50 --output bench-$(git rev-parse --short HEAD).json
+    flask bench compare bench-old.json bench-new.json
+
+Pages go through the Flask test client as the sample member or admin,
+so each timing includes the request hooks, the user loader and
+template rendering. Functions without a page (pick_questions_fast,
+campaign rendering) are called directly. Each benchmark's timings are
+reduced to percentiles in milliseconds; the report also records the
+commit, the database and the dataset size so runs can be compared.
+
+Benchmarks that write (quiz.start opens sessions, csv_import adds
+questions) have their new rows deleted once they finish, so every run
+measures the same data.
+"""
+
+from __future__ import annotations
+
+import io
+import itertools
+import json
+import os
+import platform
+import random
+import subprocess
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from flask import Flask, current_app
+from sqlalchemy import delete, func
+
+from app.extensions import db
+from app.models import ReferralEarning, Subscription, User, WithdrawalRequest
+from app.models.quiz import Choice, Question, QuizSession, UserAnswer
+from app.sample_data import ADMIN_EMAIL, MEMBER_EMAIL, session_token_for
+from app.services.question_stats import invalidate_question_count
+
+
+PERCENTILES = (50, 90, 95, 99)
+
+# Rows per CSV upload in the import benchmark.
+IMPORT_ROWS = 500
+
+
+def percentile(sorted_samples: Sequence[float], p: float) -> float:
+    """Linear interpolation between the closest ranks."""
+    if len(sorted_samples) == 1:
+        return sorted_samples[0]
+    rank = (len(sorted_samples) - 1) * p / 100
+    lower = int(rank)
+    upper = min(lower + 1, len(sorted_samples) - 1)
+    return sorted_samples[lower] + (sorted_samples[upper] - sorted_samples[lower]) * (rank - lower)
+
+
+def summarize(samples: List[float], errors: int = 0) -> Dict[str, Any]:
+    """Percentiles of timings given in seconds, reported in milliseconds."""
+    ordered = sorted(samples)
+    summary: Dict[str, Any] = {"n": len(ordered), "errors": errors}
+    if not ordered:
+        return summary
+
+    summary["mean_ms"] = round(sum(ordered) / len(ordered) * 1000, 3)
+    summary["min_ms"] = round(ordered[0] * 1000, 3)
+    for p in PERCENTILES:
+        summary[f"p{p}_ms"] = round(percentile(ordered, p) * 1000, 3)
+    summary["max_ms"] = round(ordered[-1] * 1000, 3)
+    return summary
+
+
+# -----------------------------
+# Fixtures
+# -----------------------------
+
+@dataclass
+class BenchContext:
+    app: Flask
+    member_id: int
+    admin_id: int
+    open_session_id: int
+    submitted_session_id: int
+    band: str
+    question_type: str
+    rng: random.Random
+
+    def client(self, user_id: int):
+        client = self.app.test_client()
+        with client.session_transaction() as session:
+            session["_user_id"] = str(user_id)
+            session["_fresh"] = True
+            session["session_token"] = session_token_for(user_id)
+        return client
+
+
+def load_context(app: Flask, seed: int = 1) -> BenchContext:
+    """Find the sample users and sessions; needs `flask bench seed` first."""
+    with app.app_context():
+        users = dict(
+            db.session.query(User.email, User.id)
+            .filter(User.email.in_([MEMBER_EMAIL, ADMIN_EMAIL]))
+            .all()
+        )
+        if len(users) != 2:
+            raise LookupError("No sample data here; run `flask bench seed` on an empty database first.")
+        member_id = users[MEMBER_EMAIL]
+
+        def latest_session(submitted: bool) -> Optional[int]:
+            return (
+                db.session.query(QuizSession.id)
+                .filter(QuizSession.user_id == member_id, QuizSession.is_submitted.is_(submitted))
+                .order_by(QuizSession.id.desc())
+                .limit(1)
+                .scalar()
+            )
+
+        band, question_type = (
+            db.session.query(Question.band, Question.question_type)
+            .group_by(Question.band, Question.question_type)
+            .order_by(func.count(Question.id).desc())
+            .first()
+        )
+
+        return BenchContext(
+            app=app,
+            member_id=member_id,
+            admin_id=users[ADMIN_EMAIL],
+            open_session_id=latest_session(False),
+            submitted_session_id=latest_session(True),
+            band=band,
+            question_type=question_type,
+            rng=random.Random(seed),
+        )
+
+
+def dataset_counts(app: Flask) -> Dict[str, int]:
+    with app.app_context():
+        return {
+            model.__tablename__: db.session.query(func.count()).select_from(model).scalar()
+            for model in (
+                User, Subscription, Question, Choice, QuizSession, UserAnswer,
+                ReferralEarning, WithdrawalRequest,
+            )
+        }
+
+
+# Tables the benchmarks add rows to, children first.
+WRITTEN_MODELS = (UserAnswer, Choice, QuizSession, Question)
+
+
+def last_ids(app: Flask) -> Dict[str, int]:
+    with app.app_context():
+        return {
+            model.__tablename__: db.session.query(func.max(model.id)).scalar() or 0
+            for model in WRITTEN_MODELS
+        }
+
+
+def delete_new_rows(app: Flask, since: Dict[str, int]) -> None:
+    """Delete the rows added after `since` (from last_ids)."""
+    with app.app_context():
+        deleted = {
+            model: db.session.execute(
+                delete(model).where(model.id > since[model.__tablename__])
+            ).rowcount
+            for model in WRITTEN_MODELS
+        }
+        db.session.commit()
+        if deleted[Question]:
+            invalidate_question_count()
+
+
+# -----------------------------
+# Benchmarks
+# -----------------------------
+
+@dataclass
+class Benchmark:
+    name: str
+    # prepare(ctx) returns the callable timed each iteration; it returns
+    # False (or an HTTP response with status >= 400) on failure.
+    prepare: Callable[[BenchContext], Callable[[], Any]]
+    # share of --iterations to run, for the slow ones
+    scale: float = 1.0
+
+
+def _page(path: Callable[[BenchContext], str], as_admin: bool = False):
+    def prepare(ctx: BenchContext):
+        client = ctx.client(ctx.admin_id if as_admin else ctx.member_id)
+        return lambda: client.get(path(ctx))
+    return prepare
+
+
+def _pick_questions(ctx: BenchContext):
+    from app.services.question_selector import pick_questions_fast
+
+    def run():
+        with ctx.app.app_context():
+            needed = current_app.config["EXAM_QUESTION_COUNT"]
+            return len(pick_questions_fast(ctx.band, ctx.question_type, needed)) == needed
+    return run
+
+
+def _import_csv(ctx: BenchContext):
+    client = ctx.client(ctx.admin_id)
+    header = (
+        "source,level,mode,question_text,option_a,option_b,option_c,option_d,"
+        "correct_option,explanation,question_type\n"
+    )
+
+    def run():
+        # New texts each time, so no row is skipped as a duplicate.
+        batch = f"{time.time_ns()}-{ctx.rng.random():.8f}"
+        rows = "".join(
+            f"bench,{ctx.band},exam,Bench question {batch}-{n}?,One,Two,Three,Four,A,Because.,"
+            f"{ctx.question_type}\n"
+            for n in range(IMPORT_ROWS)
+        )
+        return client.post(
+            "/admin/upload-questions",
+            data={
+                "file": (io.BytesIO((header + rows).encode("utf-8")), "bench.csv"),
+                "import_mode": "insert",
+            },
+            content_type="multipart/form-data",
+        )
+    return run
+
+
+def _render_campaign(ctx: BenchContext):
+    from app.admin.campaign_templates import CompiledCampaign
+
+    with ctx.app.app_context():
+        campaign = CompiledCampaign(
+            subject="Your weekly practice",
+            content="<p>Hi [[first_name]],</p>" + "<p>Keep practising on [[app_name]].</p>" * 40,
+            text_content="Hello [[first_name]]",
+            values={"app_name": "Bench"},
+        )
+    recipients = itertools.count()
+
+    def run():
+        n = next(recipients)
+        return campaign.build(f"user{n}@sample.test", first_name=f"User{n}")
+    return run
+
+
+BENCHMARKS: List[Benchmark] = [
+    Benchmark("pick_questions_fast", _pick_questions),
+    Benchmark("quiz.start", _page(lambda ctx: f"/quiz/start/{ctx.band}?qt={ctx.question_type}")),
+    Benchmark("quiz.take", _page(
+        lambda ctx: f"/quiz/take/{ctx.open_session_id}?q={ctx.rng.randint(1, 10)}"
+    )),
+    Benchmark("quiz.result", _page(lambda ctx: f"/quiz/result/{ctx.submitted_session_id}")),
+    Benchmark("quiz.history", _page(lambda ctx: "/quiz/history")),
+    Benchmark("dashboard.index", _page(lambda ctx: "/dashboard/")),
+    Benchmark("dashboard.index[admin]", _page(lambda ctx: "/dashboard/", as_admin=True)),
+    Benchmark("csv_import", _import_csv, scale=0.2),
+    Benchmark("campaign_render", _render_campaign),
+]
+
+
+def _failed(result: Any) -> bool:
+    if result is False:
+        return True
+    status = getattr(result, "status_code", None)
+    return status is not None and status >= 400
+
+
+def run_benchmarks(
+    app: Flask,
+    iterations: int = 50,
+    warmup: int = 3,
+    only: Sequence[str] = (),
+    on_result: Optional[Callable[[str, Dict[str, Any]], None]] = None,
+) -> Dict[str, Any]:
+    """
+    Run the benchmarks and return the JSON-ready report.
+
+    `app` must not have an app context pushed: the test client would
+    reuse it, and with it g and the logged-in user, across requests.
+    """
+    ctx = load_context(app)
+    selected = [b for b in BENCHMARKS if not only or b.name in only]
+    dataset = dataset_counts(app)
+
+    results: Dict[str, Dict[str, Any]] = {}
+    for benchmark in selected:
+        since = last_ids(app)
+        try:
+            run = benchmark.prepare(ctx)
+            for _ in range(warmup):
+                run()
+
+            samples, errors = [], 0
+            for _ in range(max(1, round(iterations * benchmark.scale))):
+                started = time.perf_counter()
+                result = run()
+                samples.append(time.perf_counter() - started)
+                errors += _failed(result)
+        finally:
+            delete_new_rows(app, since)
+
+        results[benchmark.name] = summarize(samples, errors)
+        if on_result:
+            on_result(benchmark.name, results[benchmark.name])
+
+    return {
+        "created_at": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "database": _dialect(app),
+        "dataset": dataset,
+        "iterations": iterations,
+        "results": results,
+    }
+
+
+def _dialect(app: Flask) -> str:
+    with app.app_context():
+        return db.engine.dialect.name
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True, text=True, timeout=5, check=True,
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def compare_reports(base: Dict[str, Any], new: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """p50/p95 of each benchmark in both reports, with the change in percent."""
+    rows = []
+    for name in sorted(set(base["results"]) | set(new["results"])):
+        row: Dict[str, Any] = {"name": name}
+        for key in ("p50_ms", "p95_ms"):
+            old = base["results"].get(name, {}).get(key)
+            value = new["results"].get(name, {}).get(key)
+            row[key] = (old, value)
+            row[f"{key}_change"] = (value - old) / old * 100 if old and value is not None else None
+        rows.append(row)
+    return rows
+
+
+def load_report(path: str) -> Dict[str, Any]:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
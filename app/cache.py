@@ -0,0 +1,205 @@
+# app/cache.py
+
+"""
+Small caches for values read on every page.
+
+- TTLCache: a thread-safe in-process dict whose entries expire.
+- VersionedValue: one value computed from the database and kept in
+  process until its version in the cache_versions table changes.
+  Writers call invalidate(), which bumps the shared version. Readers
+  only look at that version every `check_seconds`, so other processes
+  see a change within that time and this process sees it at once.
+
+Shared versions live in the database like the rest of the app's
+cross-process state (job_locks, email_provider_health). If the table
+is unavailable, values are simply recomputed every check.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, Generic, Hashable, Optional, Tuple, TypeVar
+
+from flask import current_app, has_app_context
+from sqlalchemy import event, insert, select, update
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from app.extensions import db
+from app.models.cache_version import CacheVersion
+
+
+T = TypeVar("T")
+
+# Marks a missing entry, since None is a valid cached value.
+MISSING: Any = object()
+
+DEFAULT_MAX_ENTRIES = 10_000
+
+
+class TTLCache:
+    """
+    Thread-safe mapping with a per-entry time to live.
+
+    Once max_entries is reached, expired entries are dropped and then,
+    if still full, the oldest ones.
+    """
+
+    def __init__(self, ttl_seconds: float, max_entries: int = DEFAULT_MAX_ENTRIES) -> None:
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max(1, max_entries)
+        self._entries: Dict[Hashable, Tuple[float, Any]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = MISSING) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return default
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl_seconds: Optional[float] = None) -> None:
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        now = time.monotonic()
+
+        with self._lock:
+            if key not in self._entries and len(self._entries) >= self.max_entries:
+                self._evict(now)
+            self._entries[key] = (now + ttl, value)
+
+    def _evict(self, now: float) -> None:
+        """Make room for one entry (lock held)."""
+        for key in [key for key, (expires_at, _) in self._entries.items() if expires_at <= now]:
+            del self._entries[key]
+
+        while len(self._entries) >= self.max_entries:
+            # dicts keep insertion order: the first entry is the oldest
+            del self._entries[next(iter(self._entries))]
+
+    def pop(self, key: Hashable) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+
+def cache_version(name: str) -> Optional[int]:
+    """The shared version of a cached value (0 if never bumped), or None on error."""
+    table = CacheVersion.__table__
+    try:
+        with db.engine.connect() as conn:
+            version = conn.execute(
+                select(table.c.version).where(table.c.name == name)
+            ).scalar()
+    except SQLAlchemyError as exc:
+        current_app.logger.warning("Cache version %s unavailable: %s", name, exc)
+        return None
+    return version or 0
+
+
+def bump_cache_version(name: str) -> None:
+    """Tell every process that the value named `name` changed."""
+    table = CacheVersion.__table__
+    now = datetime.utcnow()
+    values = {"version": table.c.version + 1, "updated_at": now}
+
+    try:
+        with db.engine.begin() as conn:
+            result = conn.execute(update(table).where(table.c.name == name).values(**values))
+            if result.rowcount:
+                return
+            try:
+                with conn.begin_nested():
+                    conn.execute(insert(table).values(name=name, version=1, updated_at=now))
+            except IntegrityError:
+                # Created by another process in the meantime.
+                conn.execute(update(table).where(table.c.name == name).values(**values))
+    except SQLAlchemyError as exc:
+        if has_app_context():
+            current_app.logger.warning("Cache version %s not bumped: %s", name, exc)
+
+
+class VersionedValue(Generic[T]):
+    """
+    A value computed by compute() and cached until its shared version
+    changes; see the module docstring.
+    """
+
+    def __init__(self, name: str, compute: Callable[[], T], check_seconds: float = 60.0) -> None:
+        self.name = name
+        self.compute = compute
+        self.check_seconds = check_seconds
+        self._value: Any = MISSING
+        self._version: Optional[int] = None
+        self._checked_at = 0.0
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def get(self, check_seconds: Optional[float] = None) -> T:
+        interval = self.check_seconds if check_seconds is None else check_seconds
+
+        with self._lock:
+            value, version, generation = self._value, self._version, self._generation
+            if value is not MISSING and time.monotonic() - self._checked_at < interval:
+                return value
+
+        current = cache_version(self.name)
+        if value is MISSING or current is None or current != version:
+            # Read the version first: a change made while computing
+            # leaves a stale version behind, so it is picked up next time.
+            value = self.compute()
+
+        with self._lock:
+            # Not if invalidate() ran meanwhile: value may predate the change.
+            if self._generation == generation:
+                self._value, self._version = value, current
+                self._checked_at = time.monotonic()
+        return value
+
+    def invalidate(self) -> None:
+        """Drop the cached value here and, via the shared version, everywhere."""
+        with self._lock:
+            self._value = MISSING
+            self._generation += 1
+        bump_cache_version(self.name)
+
+
+# -----------------------------
+# Invalidation after commit
+# -----------------------------
+
+_ON_COMMIT = "cache_on_commit"
+
+
+def on_commit(session: Session, key: Hashable, callback: Callable[[], None]) -> None:
+    """
+    Run callback once the session's current transaction commits.
+
+    For invalidating caches from mapper events: invalidating during
+    the flush would let another request cache the old value again
+    before the commit. Callbacks with the same key run once.
+    """
+    session.info.setdefault(_ON_COMMIT, {})[key] = callback
+
+
+@event.listens_for(Session, "after_commit")
+def _run_on_commit(session: Session) -> None:
+    for callback in session.info.pop(_ON_COMMIT, {}).values():
+        callback()
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_on_commit(session: Session) -> None:
+    session.info.pop(_ON_COMMIT, None)
@@ -1,74 +1,411 @@
+import json
+import os
+import shutil
+import tempfile
 from datetime import datetime
+
+import click
 from flask import current_app
+from sqlalchemy import func, update
 
+from app.admin.exporter import EXPORT_FORMATS, export_questions
+from app.admin.importer import PSR2021_ID_BANKS, add_external_ids_to_csv
+from app.admin.campaigns import CampaignSender, DeliveryLedger, iter_recipients
+from app.bench import BENCHMARKS, compare_reports, load_report, run_benchmarks
+from app.auth.email import send_dynamic_template_email
+from app.cache import bump_cache_version
+from app.email_outbox import default_worker_id, run_worker
 from app.extensions import db
+from app.job_lock import acquire_job_lock, refresh_job_lock, release_job_lock
 from app.models import User
-from app.models.subscription import Subscription
-from app.auth.email import (
-    get_active_subscribers,
-    get_active_users_not_subscribers,
-    send_dynamic_template_email,
-)
+from app.paystack_simulator import DEFAULT_SECRET_KEY, SimulatorSettings, create_simulator
+from app.query_budget import run_page_checks
+from app.replay import replay_capture
+from app.sample_data import SampleSizes, seed_sample_data
+from app.services.entitlements import SHARED_VERSION as ENTITLEMENTS_VERSION, computed_premium_until
 
 def register_cli(app):
     @app.cli.command("send_weekly_emails")
-    def send_weekly_emails():
+    @click.option("--concurrency", default=None, type=int, help="Parallel sends (default CAMPAIGN_WORKERS).")
+    @click.option("--campaign-key", default=None, help="Ledger key (default: this ISO week, e.g. weekly-2026-W42).")
+    def send_weekly_emails(concurrency, campaign_key):
+        """Send the weekly emails; safe to re-run, already-sent users are skipped."""
         now = datetime.utcnow()
 
-        tmpl_subs = current_app.config.get("SENDGRID_TMPL_ACTIVE_SUBSCRIBERS")
-        tmpl_non = current_app.config.get("SENDGRID_TMPL_ACTIVE_NON_SUBSCRIBERS")
+        tmpl_subs = current_app.config.get("SENDGRID_TMPL_ACTIVE_SUBSCRIBERS") or "active_subscribers"
+        tmpl_non = current_app.config.get("SENDGRID_TMPL_ACTIVE_NON_SUBSCRIBERS") or "active_non_subscribers"
         app_name = current_app.config.get("APP_NAME", "FOSTech CBT App")
         sender_name = current_app.config.get("SENDER_NAME", "Admin")
         base_url = (current_app.config.get("BASE_URL") or "").rstrip("/")
-        limit = int(current_app.config.get("WEEKLY_EMAIL_LIMIT", 200))
-
-        if not tmpl_subs or not tmpl_non:
-            raise RuntimeError("Missing SendGrid weekly template IDs in config.")
+        limit = max(int(current_app.config.get("WEEKLY_EMAIL_LIMIT", 200)), 0)
 
         dashboard_link = f"{base_url}/dashboard" if base_url else ""
         subscribe_link = f"{base_url}/subscription/start" if base_url else ""
 
-        # Active subscribers
-        subs_users = get_active_subscribers(db, User, Subscription, now=now, limit=limit)
-        sent_subs = failed_subs = 0
-        for u in subs_users:
-            try:
-                send_dynamic_template_email(
-                    to_email=u.email,
-                    template_id=tmpl_subs,
-                    dynamic_data={
-                        "first_name": u.username,
-                        "app_name": app_name,
-                        "dashboard_link": dashboard_link,
-                        "sender_name": sender_name,
-                    },
-                )
-                sent_subs += 1
-            except Exception:
-                failed_subs += 1
-                current_app.logger.exception("Weekly subs failed to %s", u.email)
-
-        # Active verified non-subscribers
-        non_users = get_active_users_not_subscribers(db, User, Subscription, now=now, limit=limit)
-        sent_non = failed_non = 0
-        for u in non_users:
-            try:
-                send_dynamic_template_email(
-                    to_email=u.email,
-                    template_id=tmpl_non,
-                    dynamic_data={
-                        "first_name": u.username,
-                        "app_name": app_name,
-                        "subscribe_link": subscribe_link,
-                        "sender_name": sender_name,
-                    },
-                )
-                sent_non += 1
-            except Exception:
-                failed_non += 1
-                current_app.logger.exception("Weekly non-subs failed to %s", u.email)
+        if not campaign_key:
+            year, week, _ = now.isocalendar()
+            campaign_key = f"weekly-{year}-W{week:02d}"
+
+        # One run per campaign across all nodes; the ledger also
+        # guarantees one email per user if two runs ever overlap.
+        lock_name = f"campaign:{campaign_key}"
+        owner = default_worker_id()
+        if not acquire_job_lock(lock_name, owner):
+            click.echo(f"{campaign_key} is already being sent by another node; exiting.")
+            return
+
+        templates = {
+            "subscribers": (tmpl_subs, {"dashboard_link": dashboard_link}),
+            "non_subscribers": (tmpl_non, {"subscribe_link": subscribe_link}),
+        }
+
+        def deliver(recipient, provider: str) -> None:
+            template_id, links = templates[recipient.segment]
+            send_dynamic_template_email(
+                to_email=recipient.email,
+                template_id=template_id,
+                dynamic_data={
+                    "first_name": recipient.username,
+                    "app_name": app_name,
+                    "sender_name": sender_name,
+                    **links,
+                },
+                providers=[provider],
+            )
+
+        def on_failure(recipient, error: Exception) -> None:
+            ledger.record_failure(recipient, error)
+            current_app.logger.error(
+                "Weekly %s failed to %s: %s", recipient.segment, recipient.email, error
+            )
+
+        def on_progress(progress) -> None:
+            ledger.flush()
+            if not refresh_job_lock(lock_name, owner):
+                raise click.ClickException(f"Lost the run lock for {campaign_key}; stopping.")
+
+        ledger = DeliveryLedger(campaign_key)
+        try:
+            progress = CampaignSender(workers=concurrency).run(
+                ledger.claim(iter_recipients("both", now, limit_each=limit)),
+                deliver,
+                on_progress=on_progress,
+                on_failure=on_failure,
+                on_success=ledger.record_success,
+            )
+        finally:
+            ledger.flush()
+            release_job_lock(lock_name, owner)
 
         current_app.logger.info(
-            "Weekly emails done. subs_sent=%s subs_failed=%s non_sent=%s non_failed=%s",
-            sent_subs, failed_subs, sent_non, failed_non
-        )
\ No newline at end of file
+            "Weekly emails done. key=%s sent=%s failed=%s skipped=%s rate=%.1f/s providers=%s",
+            campaign_key, progress.sent, progress.failed, ledger.skipped,
+            progress.per_second, progress.by_provider,
+        )
+        click.echo(
+            f"{campaign_key}: sent={progress.sent} failed={progress.failed} "
+            f"skipped={ledger.skipped}"
+        )
+
+    @app.cli.command("add-question-ids")
+    @click.argument("files", nargs=-1, type=click.Path(dir_okay=False))
+    @click.option("--bank", default=None, help="Bank code, e.g. GRADE_5_7. Required for files outside the PSR 2021 set.")
+    @click.option("--prefix", default="PSR2021", show_default=True, help="ID prefix.")
+    def add_question_ids(files, bank, prefix):
+        """Write <name>_with_ids.csv copies with a stable question_id column.
+
+        With no FILES, processes the PSR 2021 set in the current directory.
+        """
+        known_banks = dict(PSR2021_ID_BANKS)
+
+        if bank and len(files) > 1:
+            raise click.UsageError("--bank can only be used with a single file.")
+
+        jobs = (
+            [(path, bank or known_banks.get(os.path.basename(path))) for path in files]
+            if files
+            else PSR2021_ID_BANKS
+        )
+
+        for path, file_bank in jobs:
+            if not os.path.exists(path):
+                click.echo(f"Skipping {path} (not found)")
+                continue
+
+            if not file_bank:
+                raise click.UsageError(f"No bank code known for {path}; pass --bank.")
+
+            new_name = path[:-4] + "_with_ids.csv" if path.endswith(".csv") else path + "_with_ids.csv"
+            count = add_external_ids_to_csv(path, new_name, prefix=prefix, bank=file_bank)
+
+            click.echo(f"✅ {new_name} created ({count} questions)")
+
+    @app.cli.command("export-questions")
+    @click.option("--format", "fmt", type=click.Choice(sorted(EXPORT_FORMATS)), default="csv", show_default=True)
+    @click.option("--band", default=None, help="Only export this band, e.g. l5-7.")
+    @click.option("--type", "question_type", default=None, help="Only export this question_type, e.g. psr.")
+    @click.option("--gzip", "compress", is_flag=True, help="Gzip the output.")
+    @click.option("-o", "--output", default="-", show_default=True, help="Output file, or - for stdout.")
+    def export_questions_command(fmt, band, question_type, compress, output):
+        """Export the question bank in the importer's schema."""
+        with click.open_file(output, "wb") as out:
+            for chunk in export_questions(
+                fmt=fmt,
+                band=band,
+                question_type=question_type,
+                compress=compress,
+            ):
+                out.write(chunk)
+
+    @app.cli.command("email-worker")
+    @click.option("--batch-size", default=50, show_default=True, help="Messages claimed per batch.")
+    @click.option("--idle-seconds", default=2.0, show_default=True, help="Sleep between polls when the queue is empty.")
+    @click.option("--worker-id", default=None, help="Name recorded on claimed rows (default host:pid).")
+    @click.option("--once", is_flag=True, help="Exit when no due messages are left.")
+    def email_worker(batch_size, idle_seconds, worker_id, once):
+        """Send mail queued in email_outbox, retrying with backoff."""
+        totals = run_worker(
+            worker_id=worker_id,
+            batch_size=batch_size,
+            idle_seconds=idle_seconds,
+            once=once,
+        )
+        click.echo(
+            f"sent={totals['sent']} retrying={totals['retrying']} failed={totals['failed']}"
+        )
+
+    @app.cli.command("check-premium")
+    @click.option("--fix", is_flag=True, help="Rewrite mismatched rows from their subscriptions.")
+    @click.option("--show", default=20, show_default=True, help="Mismatches to list.")
+    def check_premium(fix, show):
+        """Compare user.premium_until with each user's confirmed subscriptions."""
+        expected = computed_premium_until(User.id)
+        mismatched = User.premium_until.is_distinct_from(expected)
+
+        total = db.session.query(func.count(User.id)).filter(mismatched).scalar()
+        for user_id, email, stored, computed in (
+            db.session.query(User.id, User.email, User.premium_until, expected.label("expected"))
+            .filter(mismatched)
+            .order_by(User.id)
+            .limit(show)
+        ):
+            click.echo(f"user {user_id} {email}: premium_until={stored} expected={computed}")
+
+        if not total:
+            click.echo("premium_until is consistent for all users.")
+            return
+
+        if not fix:
+            click.echo(f"{total} user(s) out of sync; run with --fix to repair.")
+            raise click.exceptions.Exit(1)
+
+        table = User.__table__
+        result = db.session.execute(
+            update(table)
+            .where(table.c.premium_until.is_distinct_from(computed_premium_until(table.c.id)))
+            .values(premium_until=computed_premium_until(table.c.id))
+        )
+        db.session.commit()
+
+        # Other processes drop their cached entitlements.
+        bump_cache_version(ENTITLEMENTS_VERSION)
+
+        click.echo(f"Fixed {result.rowcount} user(s).")
+
+    @app.cli.command("check-queries")
+    @click.option("-v", "--verbose", is_flag=True, help="List every statement of failing pages.")
+    def check_queries(verbose):
+        """Hold the main pages to their SQL statement budgets (app/query_budget.py)."""
+        failed = 0
+        for result in run_page_checks():
+            who = "admin" if result.check.as_admin else "member"
+            status = "ok" if result.ok else "FAIL"
+            click.echo(
+                f"{status:4} {result.check.endpoint:30} {who:6} "
+                f"{result.log.count:3} / {result.budget or '-':<3} {result.url}"
+            )
+            if result.ok:
+                continue
+
+            failed += 1
+            for problem in result.problems:
+                click.echo(f"       {problem}")
+            if verbose:
+                for statement in result.log.statements:
+                    click.echo(f"         {' '.join(statement.split())[:160]}")
+
+        if failed:
+            click.echo(f"{failed} page(s) over budget.")
+            raise click.exceptions.Exit(1)
+
+    @app.cli.group("bench")
+    def bench():
+        """Synthetic data and hot-path benchmarks (app/bench.py)."""
+
+    @bench.command("seed")
+    @click.option("--users", default=2000, show_default=True)
+    @click.option("--questions-per-band", default=8000, show_default=True,
+                  help="Per band and question type (7 bands x 2 types).")
+    @click.option("--sessions-per-user", default=5, show_default=True)
+    @click.option("--questions-per-session", default=70, show_default=True)
+    @click.option("--withdrawals-per-user", default=2, show_default=True)
+    @click.option("--seed", "random_seed", default=1, show_default=True, help="Random seed.")
+    def bench_seed(users, questions_per_band, sessions_per_user, questions_per_session,
+                   withdrawals_per_user, random_seed):
+        """Fill an EMPTY database (DATABASE_URL) with synthetic data."""
+        db.create_all()
+
+        started = datetime.utcnow()
+        try:
+            data = seed_sample_data(
+                SampleSizes(
+                    users=users,
+                    questions_per_band=questions_per_band,
+                    sessions_per_user=sessions_per_user,
+                    questions_per_session=questions_per_session,
+                    withdrawals_per_user=withdrawals_per_user,
+                ),
+                seed=random_seed,
+            )
+        except RuntimeError as e:
+            raise click.ClickException(str(e))
+
+        for table, count in data.counts.items():
+            click.echo(f"{table:18} {count:>10,}")
+        click.echo(f"Seeded in {(datetime.utcnow() - started).total_seconds():.1f}s.")
+
+    @bench.command("run")
+    @click.option("--iterations", default=50, show_default=True, help="Timed runs per benchmark.")
+    @click.option("--warmup", default=3, show_default=True, help="Untimed runs first.")
+    @click.option("--only", multiple=True, type=click.Choice([b.name for b in BENCHMARKS]),
+                  help="Run only these benchmarks (repeatable).")
+    @click.option("-o", "--output", default=None, help="Write the JSON report here.")
+    def bench_run(iterations, warmup, only, output):
+        """Time the hot paths on data from `flask bench seed`."""
+        from app import create_app
+
+        # A separate app: the test client must not share this command's app
+        # context. Campaign rendering needs a sender even where mail is unset.
+        bench_app = create_app({
+            "MAIL_DEFAULT_SENDER": app.config.get("MAIL_DEFAULT_SENDER") or "Bench <bench@sample.test>",
+        })
+        # Keep session epochs and profiles out of the real instance folder.
+        bench_app.instance_path = tempfile.mkdtemp(prefix="bench-")
+
+        def show(name, result):
+            click.echo(
+                f"{name:24} n={result['n']:<4} p50={result.get('p50_ms', 0):9.2f}ms "
+                f"p95={result.get('p95_ms', 0):9.2f}ms p99={result.get('p99_ms', 0):9.2f}ms"
+                + (f" errors={result['errors']}" if result["errors"] else "")
+            )
+
+        try:
+            report = run_benchmarks(bench_app, iterations=iterations, warmup=warmup, only=only, on_result=show)
+        except LookupError as e:
+            raise click.ClickException(str(e))
+        finally:
+            shutil.rmtree(bench_app.instance_path, ignore_errors=True)
+
+        if output:
+            with open(output, "w", encoding="utf-8") as f:
+                json.dump(report, f, indent=2)
+            click.echo(f"Report written to {output}.")
+
+        if any(result["errors"] for result in report["results"].values()):
+            raise click.exceptions.Exit(1)
+
+    @bench.command("compare")
+    @click.argument("base", type=click.Path(exists=True, dir_okay=False))
+    @click.argument("new", type=click.Path(exists=True, dir_okay=False))
+    def bench_compare(base, new):
+        """Compare p50/p95 between two `flask bench run` reports."""
+        base_report, new_report = load_report(base), load_report(new)
+        click.echo(f"base {base_report.get('commit') or '?'}  new {new_report.get('commit') or '?'}")
+
+        def cell(values, change):
+            old, value = values
+            if old is None or value is None:
+                return f"{'-':>22}"
+            return f"{old:9.2f} -> {value:9.2f}" + (f" ({change:+.0f}%)" if change is not None else "")
+
+        for row in compare_reports(base_report, new_report):
+            click.echo(
+                f"{row['name']:24} p50 {cell(row['p50_ms'], row['p50_ms_change'])}  "
+                f"p95 {cell(row['p95_ms'], row['p95_ms_change'])}"
+            )
+
+    @bench.command("replay")
+    @click.argument("capture", nargs=-1, required=True, type=click.Path(exists=True))
+    @click.option("--base-url", default="http://127.0.0.1:5000", show_default=True,
+                  help="The instance to load; run this command with its SECRET_KEY and DATABASE_URL.")
+    @click.option("--speedup", default=1.0, show_default=True, help="Replay N times faster than captured.")
+    @click.option("--concurrency", default=16, show_default=True, help="Client threads.")
+    @click.option("--limit", default=0, help="Replay only the first N captured requests.")
+    @click.option("--timeout", default=30.0, show_default=True, help="Seconds per request.")
+    @click.option("-o", "--output", default=None, help="Write the JSON report here.")
+    def bench_replay(capture, base_url, speedup, concurrency, limit, timeout, output):
+        """Replay captured requests (REQUEST_CAPTURE_ENABLED) against an instance."""
+        report = replay_capture(
+            app, capture, base_url,
+            speedup=speedup, concurrency=concurrency, limit=limit or None, timeout=timeout,
+        )
+
+        skipped = ", ".join(f"{count} {reason}" for reason, count in report["skipped"].items())
+        click.echo(f"{report['replayed']} of {report['captured']} requests replayed"
+                   + (f" (skipped: {skipped})" if skipped else "") + ".")
+
+        for name, result in list(report["results"].items()) + [("TOTAL", report.get("total"))]:
+            if not result:
+                continue
+            click.echo(
+                f"{name:32} n={result['n']:<6} p50={result.get('p50_ms', 0):9.2f}ms "
+                f"p95={result.get('p95_ms', 0):9.2f}ms p99={result.get('p99_ms', 0):9.2f}ms "
+                f"errors={result['error_rate']:.2%} changed={result['changed_status']}"
+            )
+        if report["replayed"]:
+            click.echo(
+                f"{report['throughput_rps']} req/s over {report['duration_seconds']}s; "
+                f"client lag p95 {report['lag'].get('p95_ms', 0):.0f}ms "
+                "(raise --concurrency if it grows)."
+            )
+
+        if output:
+            with open(output, "w", encoding="utf-8") as f:
+                json.dump(report, f, indent=2)
+            click.echo(f"Report written to {output}.")
+
+    @app.cli.command("paystack-sim")
+    @click.option("--host", default="127.0.0.1", show_default=True)
+    @click.option("--port", default=5100, show_default=True)
+    @click.option("--latency-ms", default=0.0, show_default=True, help="Added to every API call.")
+    @click.option("--jitter-ms", default=0.0, show_default=True, help="Latency varies by up to this much.")
+    @click.option("--error-rate", default=0.0, show_default=True, help="Share of API calls answered 500.")
+    @click.option("--hang-rate", default=0.0, show_default=True, help="Share of API calls that never answer in time.")
+    @click.option("--decline-rate", default=0.0, show_default=True, help="Share of payments declined at checkout.")
+    @click.option("--webhook-url", default=None, help="e.g. http://127.0.0.1:5000/payments/webhook/paystack")
+    @click.option("--webhook-delay-ms", default=0.0, show_default=True)
+    @click.option("--duplicate-webhook-rate", default=0.0, show_default=True, help="Share of webhooks sent twice.")
+    @click.option("--seed", default=None, type=int, help="Random seed for repeatable fault injection.")
+    def paystack_sim(host, port, latency_ms, jitter_ms, error_rate, hang_rate, decline_rate,
+                     webhook_url, webhook_delay_ms, duplicate_webhook_rate, seed):
+        """Run a local Paystack simulator (app/paystack_simulator.py)."""
+        from werkzeug.serving import run_simple
+
+        secret_key = app.config.get("PAYSTACK_SECRET_KEY") or DEFAULT_SECRET_KEY
+        if not app.config.get("PAYSTACK_SECRET_KEY"):
+            click.echo(f"PAYSTACK_SECRET_KEY is not set; set it to {DEFAULT_SECRET_KEY} on the app under test.")
+
+        simulator = create_simulator(SimulatorSettings(
+            secret_key=secret_key,
+            latency_ms=latency_ms,
+            jitter_ms=jitter_ms,
+            error_rate=error_rate,
+            hang_rate=hang_rate,
+            decline_rate=decline_rate,
+            webhook_url=webhook_url,
+            webhook_delay_ms=webhook_delay_ms,
+            duplicate_webhook_rate=duplicate_webhook_rate,
+            seed=seed,
+        ))
+        click.echo(f"Set PAYSTACK_BASE_URL=http://{host}:{port} on the app under test.")
+        run_simple(host, port, simulator, threaded=True)
@@ -8,6 +8,7 @@ from app.extensions import db
 from app.models import User, ReferralEarning
 from app.models.quiz import QuizSession, Question
 from app.models.campaign_log import CampaignLog
+from app.email_metrics import PHASES, email_metrics, summarize
 
 
 @dashboard_bp.route("/")
@@ -70,6 +71,7 @@ def index():
     subscribers = []
     active_users = []
     recent_campaigns = []
+    email_provider_stats = []
 
     # inventory defaults
     inv_bands = []
@@ -105,6 +107,8 @@ def index():
             .all()
         )
 
+        email_provider_stats = summarize(email_metrics().snapshot())
+
         # Question Inventory (Band × Question Type)
         stats_rows = (
             db.session.query(
@@ -143,6 +147,8 @@ def index():
         active_users=active_users,
         subscribers=subscribers,
         recent_campaigns=recent_campaigns,
+        email_provider_stats=email_provider_stats,
+        email_phases=PHASES,
 
         is_admin=is_admin,
         inv_bands=inv_bands,
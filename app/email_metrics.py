@@ -0,0 +1,287 @@
+# app/email_metrics.py
+
+"""
+Email delivery instrumentation.
+
+Every SMTP send is timed per phase:
+
+- wait: waiting for a free pooled connection
+- connect: TCP connect and EHLO (for port 465 this includes the TLS handshake)
+- tls: STARTTLS and the second EHLO
+- login: AUTH
+- send: MAIL FROM through the end of DATA
+
+Pooled connections skip connect/tls/login when they are reused. Each
+phase goes into a per-provider histogram. Sends are also counted as
+sent, failed or rejected (the recipient was refused permanently, see
+app/suppression.py) per provider.
+
+Each process buffers its observations and adds them to the
+email_metrics table at most every EMAIL_METRICS_FLUSH_SECONDS. The
+/admin/metrics endpoint and the dashboard therefore show all gunicorn
+workers, CLI runs and `flask email-worker` together.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from flask import current_app, has_app_context
+from sqlalchemy import insert, select, update
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+
+from app.extensions import db
+from app.models.email_metric import EmailMetric
+
+
+PHASES = ("wait", "connect", "tls", "login", "send")
+OUTCOMES = ("sent", "failed", "rejected")
+
+# Histogram bucket upper bounds, in seconds.
+BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+INF = "+Inf"
+
+DEFAULT_FLUSH_SECONDS = 10.0
+
+# How long to stop writing to the table after it fails.
+SHARED_RETRY_SECONDS = 60
+
+MetricKey = Tuple[str, str, str]  # (provider, name, le)
+
+
+def _bucket_label(seconds: float) -> str:
+    for bound in BUCKETS:
+        if seconds <= bound:
+            return _format_bound(bound)
+    return INF
+
+
+def _format_bound(bound: float) -> str:
+    return f"{bound:g}"
+
+
+class EmailMetrics:
+    """Process-wide metrics buffer; use email_metrics() for the shared instance."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._pending: Dict[MetricKey, float] = defaultdict(float)
+        self._since = time.monotonic()
+        self._shared_retry_at = 0.0
+
+    # -----------------------------
+    # Recording
+    # -----------------------------
+
+    def observe(self, provider: str, phase: str, seconds: float) -> None:
+        with self._lock:
+            self._pending[(provider, phase, _bucket_label(seconds))] += 1
+            self._pending[(provider, phase, "sum")] += seconds
+        self._maybe_flush()
+
+    def count(self, provider: str, outcome: str) -> None:
+        with self._lock:
+            self._pending[(provider, outcome, "")] += 1
+        self._maybe_flush()
+
+    def observer(self, provider: str):
+        """An observe(phase, seconds) callback bound to one provider, for the SMTP pool."""
+        def observe(phase: str, seconds: float) -> None:
+            self.observe(provider, phase, seconds)
+        return observe
+
+    # -----------------------------
+    # Shared table
+    # -----------------------------
+
+    def _maybe_flush(self) -> None:
+        if not has_app_context():
+            return
+
+        interval = float(current_app.config.get(
+            "EMAIL_METRICS_FLUSH_SECONDS", DEFAULT_FLUSH_SECONDS
+        ))
+        if time.monotonic() - self._since >= interval:
+            self.flush()
+
+    def flush(self) -> None:
+        """Add buffered observations to the table (needs an app context)."""
+        with self._lock:
+            pending, self._pending = self._pending, defaultdict(float)
+            self._since = time.monotonic()
+
+        if not pending or time.monotonic() < self._shared_retry_at:
+            return
+
+        table = EmailMetric.__table__
+        c = table.c
+
+        try:
+            with db.engine.begin() as conn:
+                for (provider, name, le), delta in pending.items():
+                    key = (c.provider == provider) & (c.name == name) & (c.le == le)
+                    result = conn.execute(
+                        update(table).where(key).values(value=c.value + delta)
+                    )
+                    if result.rowcount:
+                        continue
+                    try:
+                        with conn.begin_nested():
+                            conn.execute(
+                                insert(table).values(
+                                    provider=provider, name=name, le=le, value=delta
+                                )
+                            )
+                    except IntegrityError:
+                        # Created by another process in the meantime.
+                        conn.execute(
+                            update(table).where(key).values(value=c.value + delta)
+                        )
+        except SQLAlchemyError as exc:
+            self._shared_retry_at = time.monotonic() + SHARED_RETRY_SECONDS
+            current_app.logger.warning(
+                "Email metrics not saved (%s observations dropped): %s",
+                len(pending),
+                exc,
+            )
+
+    def snapshot(self) -> Dict[MetricKey, float]:
+        """All metrics so far, including this process's unflushed ones."""
+        self.flush()
+
+        try:
+            with db.engine.connect() as conn:
+                rows = conn.execute(select(EmailMetric.__table__)).all()
+        except SQLAlchemyError as exc:
+            current_app.logger.warning("Email metrics unavailable: %s", exc)
+            return {}
+
+        return {(row.provider, row.name, row.le): row.value for row in rows}
+
+
+_METRICS = EmailMetrics()
+
+
+def email_metrics() -> EmailMetrics:
+    return _METRICS
+
+
+# -----------------------------
+# Reporting
+# -----------------------------
+
+@dataclass
+class PhaseSummary:
+    count: int = 0
+    total_seconds: float = 0.0
+    # (upper bound, count) per bucket, not cumulative; +Inf last
+    buckets: List[Tuple[float, int]] = field(default_factory=list)
+
+    @property
+    def mean(self) -> Optional[float]:
+        return self.total_seconds / self.count if self.count else None
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimate a quantile by linear interpolation inside its bucket."""
+        if not self.count:
+            return None
+
+        target = q * self.count
+        seen = 0
+        lower = 0.0
+        for upper, count in self.buckets:
+            if count and seen + count >= target:
+                if upper == float("inf"):
+                    return lower
+                return lower + (upper - lower) * (target - seen) / count
+            seen += count
+            lower = upper if upper != float("inf") else lower
+        return lower
+
+    @property
+    def p50(self) -> Optional[float]:
+        return self.quantile(0.5)
+
+    @property
+    def p95(self) -> Optional[float]:
+        return self.quantile(0.95)
+
+
+@dataclass
+class ProviderSummary:
+    provider: str
+    sent: int = 0
+    failed: int = 0
+    rejected: int = 0
+    phases: Dict[str, PhaseSummary] = field(default_factory=dict)
+
+    @property
+    def success_rate(self) -> Optional[float]:
+        total = self.sent + self.failed
+        return self.sent / total if total else None
+
+
+def summarize(snapshot: Dict[MetricKey, float]) -> List[ProviderSummary]:
+    """Per-provider counters and phase histograms, by provider name."""
+    bounds = [(_format_bound(bound), bound) for bound in BUCKETS] + [(INF, float("inf"))]
+    providers: Dict[str, ProviderSummary] = {}
+
+    for provider, _, _ in snapshot:
+        providers.setdefault(provider, ProviderSummary(provider))
+
+    for provider, summary in providers.items():
+        summary.sent = int(snapshot.get((provider, "sent", ""), 0))
+        summary.failed = int(snapshot.get((provider, "failed", ""), 0))
+        summary.rejected = int(snapshot.get((provider, "rejected", ""), 0))
+
+        for phase in PHASES:
+            buckets = [
+                (bound, int(snapshot.get((provider, phase, label), 0)))
+                for label, bound in bounds
+            ]
+            count = sum(count for _, count in buckets)
+            if count:
+                summary.phases[phase] = PhaseSummary(
+                    count=count,
+                    total_seconds=snapshot.get((provider, phase, "sum"), 0.0),
+                    buckets=buckets,
+                )
+
+    return [providers[name] for name in sorted(providers)]
+
+
+def prometheus_text(snapshot: Dict[MetricKey, float]) -> str:
+    """Render metrics in the Prometheus text exposition format."""
+    lines = [
+        "# HELP email_messages_total Email send attempts per provider, by outcome.",
+        "# TYPE email_messages_total counter",
+    ]
+
+    summaries = summarize(snapshot)
+    for summary in summaries:
+        for outcome in OUTCOMES:
+            value = getattr(summary, outcome)
+            lines.append(
+                f'email_messages_total{{provider="{summary.provider}",outcome="{outcome}"}} {value}'
+            )
+
+    lines += [
+        "# HELP email_smtp_phase_seconds Time spent per SMTP phase.",
+        "# TYPE email_smtp_phase_seconds histogram",
+    ]
+    for summary in summaries:
+        for phase, histogram in summary.phases.items():
+            labels = f'provider="{summary.provider}",phase="{phase}"'
+            cumulative = 0
+            for bound, count in histogram.buckets:
+                cumulative += count
+                le = INF if bound == float("inf") else _format_bound(bound)
+                lines.append(f'email_smtp_phase_seconds_bucket{{{labels},le="{le}"}} {cumulative}')
+            lines.append(f"email_smtp_phase_seconds_sum{{{labels}}} {histogram.total_seconds:.6f}")
+            lines.append(f"email_smtp_phase_seconds_count{{{labels}}} {histogram.count}")
+
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,527 @@
+# app/email_outbox.py
+
+from __future__ import annotations
+
+import os
+import random
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Any, Iterable, Optional
+
+from flask import current_app
+from sqlalchemy import exists, func, insert, update
+
+from app.extensions import db
+from app.models.campaign_log import CampaignLog
+from app.models.email_outbox import EmailOutbox
+
+
+DEFAULT_BATCH_SIZE = 50
+DEFAULT_MAX_ATTEMPTS = 5
+DEFAULT_BACKOFF_SECONDS = 30
+DEFAULT_MAX_BACKOFF_SECONDS = 3600
+DEFAULT_LOCK_SECONDS = 300
+DEFAULT_SEND_THREADS = 2
+ENQUEUE_CHUNK_SIZE = 500
+
+# Claimed in descending order; SMTP connections are also reserved
+# for non-campaign mail (see email_service.bulk_mail).
+PRIORITY_CAMPAIGN = 0
+PRIORITY_TRANSACTIONAL = 10
+
+
+def outbox_enabled() -> bool:
+    """True when mail should be queued for `flask email-worker`."""
+    return bool(current_app.config.get("EMAIL_OUTBOX_ENABLED", False))
+
+
+# -----------------------------
+# Enqueue
+# -----------------------------
+
+def _new_row(
+    to_email: str,
+    subject: str,
+    html_content: str,
+    text_content: Optional[str] = None,
+    campaign_id: Optional[int] = None,
+    priority: int = PRIORITY_CAMPAIGN,
+) -> dict[str, Any]:
+    now = datetime.utcnow()
+
+    return {
+        "to_email": to_email,
+        "subject": subject,
+        "html_content": html_content,
+        "text_content": text_content,
+        "status": "pending",
+        "attempts": 0,
+        "max_attempts": current_app.config.get(
+            "EMAIL_OUTBOX_MAX_ATTEMPTS",
+            DEFAULT_MAX_ATTEMPTS,
+        ),
+        "next_attempt_at": now,
+        "priority": priority,
+        "campaign_id": campaign_id,
+        "created_at": now,
+    }
+
+
+def enqueue_email(
+    to_email: str,
+    subject: str,
+    html_content: str,
+    text_content: Optional[str] = None,
+    campaign_id: Optional[int] = None,
+    priority: int = PRIORITY_CAMPAIGN,
+    commit: bool = True,
+) -> EmailOutbox:
+    """
+    Store a rendered message for the email worker to send.
+
+    Commits by default, so the message survives the request or
+    process that queued it.
+    """
+    row = EmailOutbox(
+        **_new_row(
+            to_email=to_email,
+            subject=subject,
+            html_content=html_content,
+            text_content=text_content,
+            campaign_id=campaign_id,
+            priority=priority,
+        )
+    )
+    db.session.add(row)
+
+    if commit:
+        db.session.commit()
+
+    return row
+
+
+def enqueue_many(messages: Iterable[dict[str, Any]], campaign_id: Optional[int] = None) -> int:
+    """
+    Bulk-queue messages (dicts of enqueue_email arguments); returns the count.
+
+    Inserts ENQUEUE_CHUNK_SIZE rows at a time, so `messages` may be a
+    generator of any length. The caller commits, so a campaign is
+    queued all-or-nothing.
+    """
+    queued = 0
+    rows: list[dict[str, Any]] = []
+
+    for message in messages:
+        rows.append(_new_row(campaign_id=campaign_id, **message))
+        if len(rows) >= ENQUEUE_CHUNK_SIZE:
+            db.session.execute(insert(EmailOutbox), rows)
+            queued += len(rows)
+            rows = []
+
+    if rows:
+        db.session.execute(insert(EmailOutbox), rows)
+        queued += len(rows)
+
+    return queued
+
+
+def campaign_unsent(campaign_id: int) -> int:
+    """Messages of a campaign still waiting in the outbox (pending or sending)."""
+    return (
+        db.session.query(func.count(EmailOutbox.id))
+        .filter(
+            EmailOutbox.campaign_id == campaign_id,
+            EmailOutbox.status.in_(("pending", "sending")),
+        )
+        .scalar()
+    ) or 0
+
+
+def queued_for_campaign(campaign_id: int, email_column):
+    """SQL condition: the address in `email_column` has an outbox row for this campaign."""
+    return exists().where(
+        EmailOutbox.campaign_id == campaign_id,
+        EmailOutbox.to_email == email_column,
+    )
+
+
+# -----------------------------
+# Worker
+# -----------------------------
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def backoff_seconds(attempts: int) -> float:
+    """Exponential backoff with jitter: base, 2*base, 4*base ... capped."""
+    config = current_app.config
+    base = config.get("EMAIL_OUTBOX_BACKOFF_SECONDS", DEFAULT_BACKOFF_SECONDS)
+    cap = config.get("EMAIL_OUTBOX_MAX_BACKOFF_SECONDS", DEFAULT_MAX_BACKOFF_SECONDS)
+
+    delay = min(cap, base * 2 ** max(0, attempts - 1))
+    return delay + random.uniform(0, base)
+
+
+def release_stale_claims() -> int:
+    """
+    Return rows stuck in "sending" to the queue.
+
+    A worker that dies mid-batch leaves its rows claimed; after
+    EMAIL_OUTBOX_LOCK_SECONDS another worker may retry them.
+    """
+    lock_seconds = current_app.config.get("EMAIL_OUTBOX_LOCK_SECONDS", DEFAULT_LOCK_SECONDS)
+    cutoff = datetime.utcnow() - timedelta(seconds=lock_seconds)
+
+    result = db.session.execute(
+        update(EmailOutbox)
+        .where(
+            EmailOutbox.status == "sending",
+            EmailOutbox.locked_at < cutoff,
+        )
+        .values(status="pending", locked_by=None, locked_at=None)
+    )
+    db.session.commit()
+    return result.rowcount or 0
+
+
+def claim_batch(
+    worker_id: str,
+    limit: int = DEFAULT_BATCH_SIZE,
+    ids: Optional[list[int]] = None,
+) -> list[tuple]:
+    """
+    Claim up to `limit` due messages for this worker, highest priority first.
+
+    Pass ids to claim only those rows.
+
+    On Postgres the candidate rows are locked with FOR UPDATE SKIP
+    LOCKED, so concurrent workers never wait on or double-claim the
+    same rows. The guarded UPDATE (status still "pending") keeps
+    claims exclusive on databases that ignore SKIP LOCKED, like SQLite.
+
+    Returns (id, to_email, subject, html_content, text_content, priority) tuples.
+    """
+    now = datetime.utcnow()
+
+    query = db.session.query(EmailOutbox.id).filter(
+        EmailOutbox.status == "pending",
+        EmailOutbox.next_attempt_at <= now,
+    )
+    if ids is not None:
+        query = query.filter(EmailOutbox.id.in_(ids))
+
+    ids = [
+        row.id
+        for row in (
+            query
+            .order_by(
+                EmailOutbox.priority.desc(),
+                EmailOutbox.next_attempt_at,
+                EmailOutbox.id,
+            )
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+    ]
+
+    if not ids:
+        db.session.commit()
+        return []
+
+    db.session.execute(
+        update(EmailOutbox)
+        .where(
+            EmailOutbox.id.in_(ids),
+            EmailOutbox.status == "pending",
+        )
+        .values(
+            status="sending",
+            locked_by=worker_id,
+            locked_at=now,
+            attempts=EmailOutbox.attempts + 1,
+        )
+    )
+    db.session.commit()
+
+    return (
+        db.session.query(
+            EmailOutbox.id,
+            EmailOutbox.to_email,
+            EmailOutbox.subject,
+            EmailOutbox.html_content,
+            EmailOutbox.text_content,
+            EmailOutbox.priority,
+        )
+        .filter(
+            EmailOutbox.id.in_(ids),
+            EmailOutbox.status == "sending",
+            EmailOutbox.locked_by == worker_id,
+        )
+        .order_by(EmailOutbox.priority.desc(), EmailOutbox.id)
+        .all()
+    )
+
+
+def _refresh_campaign_logs(campaign_ids: set[int]) -> None:
+    """Recount campaign progress from the outbox; complete finished campaigns."""
+    for campaign_id in campaign_ids:
+        log = db.session.get(CampaignLog, campaign_id)
+        if not log:
+            continue
+
+        counts = dict(
+            db.session.query(EmailOutbox.status, func.count(EmailOutbox.id))
+            .filter(EmailOutbox.campaign_id == campaign_id)
+            .group_by(EmailOutbox.status)
+            .all()
+        )
+
+        log.total_sent = counts.get("sent", 0)
+        log.total_failed = counts.get("failed", 0)
+        # Progress, so a campaign the worker is draining never looks stalled.
+        log.updated_at = datetime.utcnow()
+
+        if not counts.get("pending") and not counts.get("sending"):
+            log.mark_done()
+
+
+def deliver_batch(rows: list[tuple], workers: Optional[int] = None) -> dict[str, int]:
+    """
+    Send claimed rows and record each outcome.
+
+    Uses the campaign sender, so provider rate limits and load
+    spreading apply to queued mail too.
+    """
+    from app.admin.campaigns import CampaignSender
+    from app.email_service import EmailSuppressedError, bulk_mail, send_email
+
+    results: dict[int, dict[str, Any]] = {}
+
+    def deliver(row, provider: str) -> None:
+        with bulk_mail(row.priority <= PRIORITY_CAMPAIGN):
+            send_email(
+                to_email=row.to_email,
+                subject=row.subject,
+                html_content=row.html_content,
+                text_content=row.text_content,
+                providers=[provider],
+            )
+
+    def on_success(row, provider: str, seconds: float) -> None:
+        results[row.id] = {
+            "id": row.id,
+            "status": "sent",
+            "provider": provider,
+            "latency_ms": int(seconds * 1000),
+            "last_error": None,
+            "sent_at": datetime.utcnow(),
+            "locked_by": None,
+            "locked_at": None,
+        }
+
+    def on_failure(row, error: Exception) -> None:
+        results[row.id] = {
+            "id": row.id,
+            "error": str(error),
+            # Retrying a suppressed address can never succeed.
+            "final": isinstance(error, EmailSuppressedError),
+        }
+
+    CampaignSender(workers=workers).run(
+        rows,
+        deliver,
+        on_success=on_success,
+        on_failure=on_failure,
+    )
+
+    failed_ids = [row_id for row_id, result in results.items() if "error" in result]
+    if failed_ids:
+        attempts = {
+            row.id: (row.attempts, row.max_attempts)
+            for row in (
+                db.session.query(EmailOutbox.id, EmailOutbox.attempts, EmailOutbox.max_attempts)
+                .filter(EmailOutbox.id.in_(failed_ids))
+            )
+        }
+
+        for row_id in failed_ids:
+            tried, allowed = attempts[row_id]
+            exhausted = tried >= allowed or results[row_id]["final"]
+            delay = 0 if exhausted else backoff_seconds(tried)
+
+            results[row_id] = {
+                "id": row_id,
+                "status": "failed" if exhausted else "pending",
+                "last_error": results[row_id]["error"],
+                "next_attempt_at": datetime.utcnow() + timedelta(seconds=delay),
+                "locked_by": None,
+                "locked_at": None,
+            }
+
+    if results:
+        db.session.execute(update(EmailOutbox), list(results.values()))
+
+    campaign_ids = {
+        campaign_id
+        for (campaign_id,) in (
+            db.session.query(EmailOutbox.campaign_id)
+            .filter(
+                EmailOutbox.id.in_(list(results)),
+                EmailOutbox.campaign_id.isnot(None),
+            )
+            .distinct()
+        )
+    }
+    _refresh_campaign_logs(campaign_ids)
+
+    db.session.commit()
+
+    statuses = [result["status"] for result in results.values()]
+    return {
+        "sent": statuses.count("sent"),
+        "retrying": statuses.count("pending"),
+        "failed": statuses.count("failed"),
+    }
+
+
+def run_worker(
+    worker_id: Optional[str] = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    idle_seconds: float = 2.0,
+    once: bool = False,
+) -> dict[str, int]:
+    """
+    Claim and send queued mail until stopped (or until the queue is empty with once=True).
+    """
+    worker_id = worker_id or default_worker_id()
+    totals = {"sent": 0, "retrying": 0, "failed": 0}
+    last_stale_check = 0.0
+
+    current_app.logger.info("Email worker started: worker_id=%s batch_size=%s", worker_id, batch_size)
+
+    while True:
+        if time.monotonic() - last_stale_check > 60:
+            released = release_stale_claims()
+            if released:
+                current_app.logger.warning("Email worker released %s stale claims", released)
+            last_stale_check = time.monotonic()
+
+        rows = claim_batch(worker_id, batch_size)
+
+        if not rows:
+            if once:
+                break
+            db.session.remove()
+            time.sleep(idle_seconds)
+            continue
+
+        stats = deliver_batch(rows)
+        for key, value in stats.items():
+            totals[key] += value
+
+        current_app.logger.info(
+            "Email worker batch: claimed=%s sent=%s retrying=%s failed=%s",
+            len(rows), stats["sent"], stats["retrying"], stats["failed"]
+        )
+
+    return totals
+
+
+# -----------------------------
+# In-process sending
+# -----------------------------
+
+_EXECUTOR: Optional[ThreadPoolExecutor] = None
+_EXECUTOR_LOCK = threading.Lock()
+
+
+def _executor() -> ThreadPoolExecutor:
+    global _EXECUTOR
+
+    with _EXECUTOR_LOCK:
+        if _EXECUTOR is None:
+            _EXECUTOR = ThreadPoolExecutor(
+                max_workers=max(
+                    1,
+                    current_app.config.get("EMAIL_SEND_THREADS", DEFAULT_SEND_THREADS),
+                ),
+                thread_name_prefix="email-send",
+            )
+        return _EXECUTOR
+
+
+def _retry_delay(row_id: int) -> Optional[float]:
+    """Seconds until a row left pending is due again; None if it is done or claimed."""
+    row = (
+        db.session.query(EmailOutbox.status, EmailOutbox.next_attempt_at)
+        .filter(EmailOutbox.id == row_id)
+        .first()
+    )
+    if not row or row.status != "pending":
+        return None
+    return max(0.0, (row.next_attempt_at - datetime.utcnow()).total_seconds())
+
+
+def _send_queued_row(app, row_id: int) -> None:
+    retry_in = None
+
+    with app.app_context():
+        try:
+            rows = claim_batch(default_worker_id(), limit=1, ids=[row_id])
+            if rows:
+                deliver_batch(rows, workers=1)
+            retry_in = _retry_delay(row_id)
+        except Exception:
+            app.logger.exception("Background email send failed: outbox_id=%s", row_id)
+        finally:
+            db.session.remove()
+
+    if retry_in is not None:
+        _schedule_send(app, row_id, retry_in)
+
+
+def _schedule_send(app, row_id: int, delay: float) -> None:
+    timer = threading.Timer(delay, lambda: _executor().submit(_send_queued_row, app, row_id))
+    timer.daemon = True
+    timer.start()
+
+
+def send_in_background(row: EmailOutbox) -> None:
+    """
+    Send a committed outbox row on this process's email threads.
+
+    Used when no email worker runs. The request returns at once and
+    the row records the outcome. A failed attempt is retried here with
+    the worker's backoff until EMAIL_OUTBOX_MAX_ATTEMPTS, after which
+    the row is "failed" and the page offers a resend. Retries still
+    pending when the process exits are left to an email worker.
+    """
+    app = current_app._get_current_object()
+    _executor().submit(_send_queued_row, app, row.id)
+
+
+def delivery_status(row_id: Optional[int]) -> Optional[str]:
+    """
+    Return a user-facing status for an outbox row:
+    "queued", "sent", "retrying" or "failed" (None if unknown).
+    """
+    if not row_id:
+        return None
+
+    row = (
+        db.session.query(EmailOutbox.status, EmailOutbox.attempts)
+        .filter(EmailOutbox.id == row_id)
+        .first()
+    )
+    if not row:
+        return None
+
+    if row.status == "pending" and row.attempts:
+        return "retrying"
+    if row.status in ("pending", "sending"):
+        return "queued"
+    return row.status
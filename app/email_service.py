@@ -2,21 +2,37 @@
 
 from __future__ import annotations
 
-import smtplib
-import ssl
+import base64
+import secrets
 import time
+from contextlib import contextmanager
+from contextvars import ContextVar
 from dataclasses import dataclass
+from email import policy
+from email.header import Header
 from email.message import EmailMessage
 from email.utils import formataddr, parseaddr
-from typing import Optional
+from typing import Iterator, Optional, Union
 
 from flask import current_app
 
+from app.email_metrics import email_metrics
+from app.provider_health import provider_health
+from app.smtp_pool import get_pool, open_smtp_connection, close_quietly
+from app.suppression import is_suppressed, permanent_failure_reason, suppress
+
 
 class EmailSendError(RuntimeError):
     """Raised when all configured email providers fail."""
 
 
+class EmailSuppressedError(EmailSendError):
+    """
+    Raised for an address on the suppression list, or one a provider
+    has just rejected permanently. Other providers are not tried.
+    """
+
+
 @dataclass(frozen=True)
 class SMTPConfig:
     name: str
@@ -24,14 +40,45 @@ class SMTPConfig:
     port: int
     username: str
     password: str
+    use_tls: bool = True
+    login: bool = True
+
 
+@dataclass(frozen=True)
+class PreparedMessage:
+    """A message already serialized for SMTP (see MessageTemplate)."""
+    sender_email: str
+    to_email: str
+    subject: str
+    data: bytes
+    mail_options: tuple[str, ...] = ()
 
-# Store provider cooldown expiry times in memory.
-# This resets whenever the Flask process restarts.
-_PROVIDER_COOLDOWNS: dict[str, float] = {}
 
 DEFAULT_SMTP_TIMEOUT = 20
-DEFAULT_COOLDOWN_SECONDS = 600
+
+DEFAULT_POOL_MAX_SIZE = 4
+DEFAULT_POOL_MAX_MESSAGES = 100
+DEFAULT_POOL_IDLE_SECONDS = 60
+DEFAULT_POOL_NOOP_AFTER_SECONDS = 10
+DEFAULT_POOL_RESERVED_SLOTS = 1
+
+# True while sending campaign (bulk) mail on the current thread.
+_BULK_MAIL: ContextVar[bool] = ContextVar("bulk_mail", default=False)
+
+
+@contextmanager
+def bulk_mail(enabled: bool = True) -> Iterator[None]:
+    """
+    Mark sends in this block as bulk traffic.
+
+    Bulk sends cannot take the SMTP connections reserved for
+    transactional mail (SMTP_POOL_RESERVED_SLOTS).
+    """
+    token = _BULK_MAIL.set(enabled)
+    try:
+        yield
+    finally:
+        _BULK_MAIL.reset(token)
 
 
 def _clean(value: object) -> str:
@@ -145,6 +192,27 @@ def _get_provider_config(provider: str) -> SMTPConfig:
             ),
         )
 
+    if provider == "local":
+        # Plain, unauthenticated SMTP for development and benchmarks,
+        # e.g. python -m aiosmtpd -n -l 127.0.0.1:1025
+        return SMTPConfig(
+            name="local",
+            host=_clean(
+                current_app.config.get(
+                    "LOCAL_SMTP_HOST",
+                    "127.0.0.1",
+                )
+            ),
+            port=_as_int(
+                current_app.config.get("LOCAL_SMTP_PORT"),
+                1025,
+            ),
+            username="",
+            password="",
+            use_tls=False,
+            login=False,
+        )
+
     raise EmailSendError(
         f"Unsupported email provider: {provider}"
     )
@@ -160,10 +228,10 @@ def _validate_provider_config(cfg: SMTPConfig) -> None:
     if not cfg.port:
         missing.append("port")
 
-    if not cfg.username:
+    if cfg.login and not cfg.username:
         missing.append("username")
 
-    if not cfg.password:
+    if cfg.login and not cfg.password:
         missing.append("password")
 
     if missing:
@@ -221,6 +289,7 @@ def _build_message(
     subject: str,
     html_content: str,
     text_content: Optional[str] = None,
+    sender: Optional[tuple[str, str]] = None,
 ) -> EmailMessage:
     """Create an email with plain-text and HTML alternatives."""
     recipient = _clean(to_email)
@@ -232,7 +301,7 @@ def _build_message(
     if not subject:
         raise EmailSendError("Email subject is missing.")
 
-    sender_name, sender_email = _get_sender()
+    sender_name, sender_email = sender or _get_sender()
 
     message = EmailMessage()
     message["From"] = formataddr((sender_name, sender_email))
@@ -242,10 +311,7 @@ def _build_message(
     plain_text = _clean(text_content)
 
     if not plain_text:
-        plain_text = (
-            "This email contains HTML content. "
-            "Please view it using an HTML-compatible email client."
-        )
+        plain_text = DEFAULT_PLAIN_TEXT
 
     message.set_content(plain_text)
 
@@ -258,6 +324,125 @@ def _build_message(
     return message
 
 
+DEFAULT_PLAIN_TEXT = (
+    "This email contains HTML content. "
+    "Please view it using an HTML-compatible email client."
+)
+
+
+def _base64_body(content: str) -> bytes:
+    """Base64 for a text part; text is encoded in canonical CRLF form."""
+    canonical = content.replace("\r\n", "\n").replace("\n", "\r\n")
+    return base64.encodebytes(canonical.encode("utf-8")).replace(b"\n", b"\r\n")
+
+
+class MessageTemplate:
+    """
+    Serialize many messages that share a sender and subject.
+
+    The From/Subject headers and MIME boundary are encoded once; each
+    message then only base64-encodes its own bodies. This produces the
+    same multipart/alternative structure as _build_message at a small
+    fraction of the cost of building an EmailMessage per recipient.
+    """
+
+    def __init__(self, subject: str) -> None:
+        self.subject = _clean(subject)
+
+        if not self.subject:
+            raise EmailSendError("Email subject is missing.")
+
+        sender_name, self.sender_email = _get_sender()
+        self.sender = (sender_name, self.sender_email)
+        self.boundary = f"==============={secrets.token_hex(12)}=="
+
+        subject_header = Header(
+            self.subject,
+            "us-ascii" if self.subject.isascii() else "utf-8",
+            header_name="Subject",
+        ).encode(linesep="\r\n")
+
+        self._head = (
+            f"From: {formataddr(self.sender)}\r\n"
+            f"Subject: {subject_header}\r\n"
+            "MIME-Version: 1.0\r\n"
+        ).encode("ascii")
+
+        self._part_head = (
+            f'Content-Type: multipart/alternative; boundary="{self.boundary}"\r\n'
+            "\r\n"
+            f"--{self.boundary}\r\n"
+            'Content-Type: text/plain; charset="utf-8"\r\n'
+            "Content-Transfer-Encoding: base64\r\n"
+            "\r\n"
+        ).encode("ascii")
+
+        self._part_sep = (
+            f"--{self.boundary}\r\n"
+            'Content-Type: text/html; charset="utf-8"\r\n'
+            "Content-Transfer-Encoding: base64\r\n"
+            "\r\n"
+        ).encode("ascii")
+
+        self._tail = f"--{self.boundary}--\r\n".encode("ascii")
+
+    def render(
+        self,
+        to_email: str,
+        html_content: str,
+        text_content: Optional[str] = None,
+    ) -> PreparedMessage:
+        recipient = _clean(to_email)
+
+        if not recipient:
+            raise EmailSendError("Recipient email address is missing.")
+
+        if "\r" in recipient or "\n" in recipient:
+            raise EmailSendError("Recipient email address is invalid.")
+
+        if not recipient.isascii() or not html_content:
+            # Rare cases (internationalized addresses, text-only mail)
+            # go through the general builder.
+            message = _build_message(
+                to_email=recipient,
+                subject=self.subject,
+                html_content=html_content,
+                text_content=text_content,
+                sender=self.sender,
+            )
+            international = not recipient.isascii()
+            return PreparedMessage(
+                sender_email=self.sender_email,
+                to_email=recipient,
+                subject=self.subject,
+                data=message.as_bytes(
+                    policy=policy.SMTPUTF8 if international else policy.SMTP
+                ),
+                mail_options=("SMTPUTF8", "BODY=8BITMIME") if international else (),
+            )
+
+        data = b"".join(
+            (
+                self._head,
+                b"To: ", recipient.encode("ascii"), b"\r\n",
+                self._part_head,
+                _base64_body(_clean(text_content) or DEFAULT_PLAIN_TEXT),
+                b"\r\n",
+                self._part_sep,
+                _base64_body(str(html_content)),
+                b"\r\n",
+                self._tail,
+            )
+        )
+
+        return PreparedMessage(
+            sender_email=self.sender_email,
+            to_email=recipient,
+            subject=self.subject,
+            data=data,
+        )
+
+
 def _smtp_timeout() -> int:
     """Return the configured SMTP connection timeout."""
     return _as_int(
@@ -269,72 +454,106 @@ def _smtp_timeout() -> int:
     )
 
 
-def _smtp_send(cfg: SMTPConfig, message: EmailMessage) -> None:
+def _smtp_pool_enabled() -> bool:
+    value = current_app.config.get("SMTP_POOL_ENABLED", True)
+    if isinstance(value, str):
+        return value.strip().lower() in {"1", "true", "yes", "y", "on"}
+    return bool(value)
+
+
+def _smtp_pool(cfg: SMTPConfig):
+    """Return this process's connection pool for a provider."""
+    config = current_app.config
+
+    return get_pool(
+        cfg,
+        timeout=_smtp_timeout(),
+        max_size=_as_int(
+            config.get("SMTP_POOL_MAX_SIZE"),
+            DEFAULT_POOL_MAX_SIZE,
+        ),
+        max_messages=_as_int(
+            config.get("SMTP_POOL_MAX_MESSAGES"),
+            DEFAULT_POOL_MAX_MESSAGES,
+        ),
+        idle_timeout=_as_int(
+            config.get("SMTP_POOL_IDLE_SECONDS"),
+            DEFAULT_POOL_IDLE_SECONDS,
+        ),
+        noop_after=_as_int(
+            config.get("SMTP_POOL_NOOP_AFTER_SECONDS"),
+            DEFAULT_POOL_NOOP_AFTER_SECONDS,
+        ),
+        reserved=_as_int(
+            config.get("SMTP_POOL_RESERVED_SLOTS"),
+            DEFAULT_POOL_RESERVED_SLOTS,
+        ),
+        observe=email_metrics().observer(cfg.name),
+    )
+
+
+def _smtp_send(
+    cfg: SMTPConfig,
+    message: Union[EmailMessage, PreparedMessage],
+) -> None:
     """
-    Send an email using the correct connection method.
+    Send an email over SMTP.
 
-    Port 465:
-        Implicit TLS using SMTP_SSL.
+    By default connections come from a per-provider pool, so the TCP
+    connect, TLS handshake and login happen once per connection rather
+    than once per email. Set SMTP_POOL_ENABLED=false to open a fresh
+    connection for every message.
 
-    Other ports, including 587 and 2525:
-        SMTP connection upgraded with STARTTLS.
+    Each SMTP phase is timed into app/email_metrics.py.
     """
     _validate_provider_config(cfg)
 
-    timeout = _smtp_timeout()
-    tls_context = ssl.create_default_context()
-
-    if cfg.port == 465:
-        with smtplib.SMTP_SSL(
-            cfg.host,
-            cfg.port,
-            timeout=timeout,
-            context=tls_context,
-        ) as server:
-            server.login(cfg.username, cfg.password)
-            server.send_message(message)
-
-        return
+    bulk = _BULK_MAIL.get()
 
-    with smtplib.SMTP(
-        cfg.host,
-        cfg.port,
-        timeout=timeout,
-    ) as server:
-        server.ehlo()
-        server.starttls(context=tls_context)
-        server.ehlo()
-        server.login(cfg.username, cfg.password)
-        server.send_message(message)
+    if _smtp_pool_enabled():
+        pool = _smtp_pool(cfg)
 
+        if isinstance(message, PreparedMessage):
+            pool.sendmail(
+                message.sender_email,
+                [message.to_email],
+                message.data,
+                bulk=bulk,
+                mail_options=message.mail_options,
+            )
+        else:
+            pool.send(message, bulk=bulk)
+        return
 
-def _cooldown_seconds() -> int:
-    """Return the provider failure cooldown duration."""
-    return _as_int(
-        current_app.config.get(
-            "EMAIL_PROVIDER_COOLDOWN_SECONDS",
-            DEFAULT_COOLDOWN_SECONDS,
-        ),
-        DEFAULT_COOLDOWN_SECONDS,
-    )
+    observe = email_metrics().observer(cfg.name)
+    server = open_smtp_connection(cfg, _smtp_timeout(), observe)
+    try:
+        started = time.perf_counter()
+        if isinstance(message, PreparedMessage):
+            server.sendmail(
+                message.sender_email,
+                [message.to_email],
+                message.data,
+                message.mail_options,
+            )
+        else:
+            server.send_message(message)
+        observe("send", time.perf_counter() - started)
+    finally:
+        close_quietly(server)
 
 
 def _provider_is_on_cooldown(provider: str) -> bool:
     """Return True while a provider is temporarily unavailable."""
-    cooldown_until = _PROVIDER_COOLDOWNS.get(provider, 0)
-    return cooldown_until > time.monotonic()
+    return provider_health().is_on_cooldown(provider)
 
 
 def _put_provider_on_cooldown(
     provider: str,
     reason: object,
 ) -> None:
-    """Temporarily skip a provider after an SMTP failure."""
-    cooldown_seconds = _cooldown_seconds()
-
-    _PROVIDER_COOLDOWNS[provider] = (
-        time.monotonic() + cooldown_seconds
-    )
+    """Record an SMTP failure; repeated failures put the provider on cooldown."""
+    cooldown_seconds = provider_health().record_failure(provider, reason)
 
     current_app.logger.warning(
         "Email provider put on cooldown: "
@@ -345,9 +564,19 @@ def _put_provider_on_cooldown(
     )
 
 
-def _clear_provider_cooldown(provider: str) -> None:
-    """Remove cooldown after a successful delivery."""
-    _PROVIDER_COOLDOWNS.pop(provider, None)
+def _record_provider_success(provider: str, seconds: float) -> None:
+    """Record a delivery; this also ends any cooldown."""
+    provider_health().record_success(provider, seconds)
+
+
+def available_providers() -> list[str]:
+    """
+    Return the configured providers that are not on cooldown.
+
+    Ordered by weighted random choice on provider health (see
+    app/provider_health.py), so healthier providers usually come first.
+    """
+    return provider_health().ranked(_provider_chain())
 
 
 def send_email(
@@ -355,6 +584,7 @@ def send_email(
     subject: str,
     html_content: str,
     text_content: Optional[str] = None,
+    providers: Optional[list[str]] = None,
 ) -> bool:
     """
     Send an email using the configured provider chain.
@@ -362,9 +592,14 @@ def send_email(
     Example:
         EMAIL_PROVIDER_CHAIN=zoho,brevo,mailersend
 
+    Pass providers to try only those, in that order; the campaign
+    sender uses this to spread load across the chain.
+
     Returns True when delivery succeeds.
 
-    Raises EmailSendError when every configured provider fails.
+    Raises EmailSendError when every configured provider fails, and
+    EmailSuppressedError for suppressed or permanently rejected
+    addresses (see app/suppression.py).
     """
     message = _build_message(
         to_email=to_email,
@@ -373,7 +608,51 @@ def send_email(
         text_content=text_content,
     )
 
-    providers = _provider_chain()
+    return _send_with_providers(message, to_email, subject, providers)
+
+
+def send_prepared(
+    message: PreparedMessage,
+    providers: Optional[list[str]] = None,
+) -> bool:
+    """
+    Send a message serialized by MessageTemplate; same delivery rules as send_email.
+    """
+    return _send_with_providers(
+        message,
+        message.to_email,
+        message.subject,
+        providers,
+    )
+
+
+def _send_with_providers(
+    message: Union[EmailMessage, PreparedMessage],
+    to_email: str,
+    subject: str,
+    providers: Optional[list[str]] = None,
+) -> bool:
+    """
+    Try each provider in turn; see send_email.
+
+    Without an explicit list, providers are tried in health order
+    (available_providers), then any on cooldown are skipped as before.
+
+    Suppressed addresses fail before any SMTP traffic. A permanent
+    rejection of the recipient suppresses it and stops there: the
+    address is bad, not the provider, so its health is not penalized.
+    """
+    if is_suppressed(to_email):
+        raise EmailSuppressedError(
+            f"{to_email} is on the suppression list."
+        )
+
+    if providers:
+        providers = list(providers)
+    else:
+        chain = _provider_chain()
+        ranked = available_providers()
+        providers = ranked + [provider for provider in chain if provider not in ranked]
 
     if not providers:
         raise EmailSendError(
@@ -393,12 +672,14 @@ def send_email(
             continue
 
         attempted_provider = True
+        started = time.monotonic()
 
         try:
             cfg = _get_provider_config(provider)
             _smtp_send(cfg, message)
 
-            _clear_provider_cooldown(provider)
+            _record_provider_success(provider, time.monotonic() - started)
+            email_metrics().count(provider, "sent")
 
             current_app.logger.info(
                 "Email sent successfully: "
@@ -411,7 +692,19 @@ def send_email(
             return True
 
         except Exception as exc:
+            rejection = permanent_failure_reason(exc)
+
+            if rejection:
+                _record_provider_success(provider, time.monotonic() - started)
+                email_metrics().count(provider, "rejected")
+                suppress(to_email, detail=f"{provider}: {rejection}")
+
+                raise EmailSuppressedError(
+                    f"{to_email} was rejected permanently ({rejection}) and is now suppressed."
+                ) from exc
+
             last_error = exc
+            email_metrics().count(provider, "failed")
             _put_provider_on_cooldown(provider, exc)
 
             current_app.logger.exception(
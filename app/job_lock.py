@@ -0,0 +1,74 @@
+# app/job_lock.py
+
+"""
+Named locks held in the job_locks table, so only one node runs a job.
+
+A lock expires unless its holder refreshes it, so a crashed node does
+not block the job forever. Each call is its own short transaction,
+independent of the caller's session.
+"""
+
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, insert, or_, update
+from sqlalchemy.exc import IntegrityError
+
+from app.extensions import db
+from app.models.job_lock import JobLock
+
+
+DEFAULT_LOCK_SECONDS = 300
+
+
+def acquire_job_lock(name: str, owner: str, ttl_seconds: int = DEFAULT_LOCK_SECONDS) -> bool:
+    """Take the lock if it is free, expired or already ours; returns True on success."""
+    table = JobLock.__table__
+    now = datetime.utcnow()
+    expires_at = now + timedelta(seconds=ttl_seconds)
+
+    try:
+        with db.engine.begin() as conn:
+            conn.execute(
+                insert(table).values(
+                    name=name,
+                    owner=owner,
+                    acquired_at=now,
+                    expires_at=expires_at,
+                )
+            )
+        return True
+    except IntegrityError:
+        pass
+
+    with db.engine.begin() as conn:
+        result = conn.execute(
+            update(table)
+            .where(
+                table.c.name == name,
+                or_(table.c.expires_at < now, table.c.owner == owner),
+            )
+            .values(owner=owner, acquired_at=now, expires_at=expires_at)
+        )
+    return result.rowcount == 1
+
+
+def refresh_job_lock(name: str, owner: str, ttl_seconds: int = DEFAULT_LOCK_SECONDS) -> bool:
+    """Extend a lock we hold; False means it expired and another node took it."""
+    table = JobLock.__table__
+
+    with db.engine.begin() as conn:
+        result = conn.execute(
+            update(table)
+            .where(table.c.name == name, table.c.owner == owner)
+            .values(expires_at=datetime.utcnow() + timedelta(seconds=ttl_seconds))
+        )
+    return result.rowcount == 1
+
+
+def release_job_lock(name: str, owner: str) -> None:
+    table = JobLock.__table__
+
+    with db.engine.begin() as conn:
+        conn.execute(delete(table).where(table.c.name == name, table.c.owner == owner))
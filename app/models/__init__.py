@@ -2,4 +2,12 @@ from .user import User
 from .subscription import Subscription
 from .referral_earning import ReferralEarning
 from .withdrawal import WithdrawalRequest
-from .campaign_log import CampaignLog
\ No newline at end of file
+from .campaign_log import CampaignLog
+from .email_outbox import EmailOutbox
+from .email_provider_health import EmailProviderHealth
+from .campaign_delivery import CampaignDelivery
+from .job_lock import JobLock
+from .email_metric import EmailMetric
+from .suppressed_email import SuppressedEmail
+from .cache_version import CacheVersion
+from .request_metric import RequestMetric
@@ -0,0 +1,12 @@
+from datetime import datetime
+from app.extensions import db
+
+
+class CacheVersion(db.Model):
+    """A version number per cached value, bumped on change (see app/cache.py)."""
+
+    __tablename__ = "cache_versions"
+
+    name = db.Column(db.String(128), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
@@ -0,0 +1,30 @@
+from datetime import datetime
+from app.extensions import db
+
+
+class CampaignDelivery(db.Model):
+    """One row per (campaign, recipient): the ledger that stops duplicate sends."""
+
+    __tablename__ = "campaign_delivery"
+    __table_args__ = (
+        db.UniqueConstraint("campaign_key", "user_id", name="uq_campaign_delivery_campaign_key_user_id"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+
+    # e.g. weekly-2026-W42 or campaign-17
+    campaign_key = db.Column(db.String(64), nullable=False)
+    user_id = db.Column(db.Integer, nullable=False)
+
+    # subscribers | non_subscribers
+    segment = db.Column(db.String(32), nullable=True)
+
+    # sending (claimed) | sent | failed
+    status = db.Column(db.String(20), nullable=False, default="sending")
+    attempts = db.Column(db.Integer, nullable=False, default=1)
+
+    provider = db.Column(db.String(32), nullable=True)
+    last_error = db.Column(db.Text, nullable=True)
+
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    sent_at = db.Column(db.DateTime, nullable=True)
@@ -1,4 +1,4 @@
-from datetime import datetime
+from datetime import datetime, timedelta
 from app.extensions import db
 
 
@@ -32,6 +32,25 @@ class CampaignLog(db.Model):
     # optional debugging info
     last_error = db.Column(db.Text, nullable=True)
 
+    # resume support: campaign settings (JSON) and the checkpoint.
+    # Recipients are sent in descending User.id order; every user with
+    # an id >= last_user_id has been processed.
+    payload = db.Column(db.Text, nullable=True)
+    last_user_id = db.Column(db.Integer, nullable=True)
+    updated_at = db.Column(db.DateTime, nullable=True)
+
+    def can_resume(self, stalled_after_minutes: int = 10) -> bool:
+        """Failed, or still "running" with no checkpoint for a while (worker died)."""
+        if not self.payload:
+            return False
+        if self.status == "failed":
+            return True
+        if self.status != "running":
+            return False
+
+        last_seen = self.updated_at or self.started_at or self.created_at
+        return last_seen < datetime.utcnow() - timedelta(minutes=stalled_after_minutes)
+
     def mark_running(self):
         self.status = "running"
         self.started_at = datetime.utcnow()
@@ -0,0 +1,20 @@
+from app.extensions import db
+
+
+class EmailMetric(db.Model):
+    """
+    Email delivery metrics summed across all processes (see app/email_metrics.py).
+
+    Counters: name "sent" / "failed", le "".
+    Phase histograms: name is the phase ("connect", "tls", "login",
+    "send", "wait"); one row per bucket upper bound (le "0.1" ... "+Inf",
+    not cumulative) and le "sum" for the total seconds.
+    """
+
+    __tablename__ = "email_metrics"
+
+    provider = db.Column(db.String(32), primary_key=True)
+    name = db.Column(db.String(32), primary_key=True)
+    le = db.Column(db.String(16), primary_key=True, default="")
+
+    value = db.Column(db.Float, nullable=False, default=0.0)
@@ -0,0 +1,44 @@
+from datetime import datetime
+from app.extensions import db
+
+
+class EmailOutbox(db.Model):
+    __tablename__ = "email_outbox"
+    __table_args__ = (
+        # The worker's claim query: pending rows that are due, oldest first.
+        db.Index("ix_email_outbox_status_next_attempt_at", "status", "next_attempt_at"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+
+    # fully rendered message
+    to_email = db.Column(db.String(255), nullable=False)
+    subject = db.Column(db.String(255), nullable=False)
+    html_content = db.Column(db.Text, nullable=True)
+    text_content = db.Column(db.Text, nullable=True)
+
+    # pending | sending | sent | failed
+    status = db.Column(db.String(20), nullable=False, default="pending")
+
+    # delivery attempts so far, and when the next one may run
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=5)
+    next_attempt_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    # higher is claimed first: transactional mail (10) before campaigns (0)
+    priority = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+
+    # set for campaign mail, so the worker can update CampaignLog counters
+    campaign_id = db.Column(db.Integer, nullable=True, index=True)
+
+    # which worker holds the row while status = sending
+    locked_by = db.Column(db.String(64), nullable=True)
+    locked_at = db.Column(db.DateTime, nullable=True)
+
+    # outcome of the last attempt
+    provider = db.Column(db.String(32), nullable=True)
+    latency_ms = db.Column(db.Integer, nullable=True)
+    last_error = db.Column(db.Text, nullable=True)
+
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    sent_at = db.Column(db.DateTime, nullable=True)
@@ -0,0 +1,25 @@
+from datetime import datetime
+from app.extensions import db
+
+
+class EmailProviderHealth(db.Model):
+    """Delivery health per email provider, shared by all processes (see app/provider_health.py)."""
+
+    __tablename__ = "email_provider_health"
+
+    provider = db.Column(db.String(32), primary_key=True)
+
+    # exponentially weighted averages over recent sends
+    success_rate = db.Column(db.Float, nullable=False, default=1.0)
+    latency_seconds = db.Column(db.Float, nullable=True)
+
+    # failures since the last success, and the resulting cooldown
+    consecutive_failures = db.Column(db.Integer, nullable=False, default=0)
+    cooldown_until = db.Column(db.DateTime, nullable=True)
+
+    # lifetime counters
+    total_sent = db.Column(db.Integer, nullable=False, default=0)
+    total_failed = db.Column(db.Integer, nullable=False, default=0)
+
+    last_error = db.Column(db.Text, nullable=True)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
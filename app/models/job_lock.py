@@ -0,0 +1,17 @@
+from datetime import datetime
+from app.extensions import db
+
+
+class JobLock(db.Model):
+    """A named lock shared by every node (see app/job_lock.py)."""
+
+    __tablename__ = "job_locks"
+
+    name = db.Column(db.String(128), primary_key=True)
+
+    # host:pid of the holder
+    owner = db.Column(db.String(128), nullable=False)
+
+    acquired_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    # the lock is free once this passes without a refresh
+    expires_at = db.Column(db.DateTime, nullable=False)
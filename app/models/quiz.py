@@ -19,6 +19,10 @@ class Question(db.Model):
 
     text = db.Column(db.Text, nullable=False)
 
+    # Stable ID from the source bank, e.g. "PSR2021-GRADE_5_7-00001".
+    # Used by upsert imports to apply corrections to existing rows.
+    external_id = db.Column(db.String(64), unique=True, index=True, nullable=True)
+
     # ✅ NEW
     question_type = db.Column(db.String(50), nullable=False, default="psr", index=True)
     explanation = db.Column(db.Text)  # optional
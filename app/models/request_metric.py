@@ -0,0 +1,22 @@
+from app.extensions import db
+
+
+class RequestMetric(db.Model):
+    """
+    Per-endpoint request timings summed across all processes, in
+    five-minute slots (see app/request_profile.py).
+
+    Counters: name "requests" / "over_budget", le "".
+    Histograms: name "wall", "sql", "template" (seconds) or "queries"
+    (statements per request); one row per bucket upper bound (not
+    cumulative) and le "sum" for the total.
+    """
+
+    __tablename__ = "request_metrics"
+
+    slot = db.Column(db.DateTime, primary_key=True)
+    endpoint = db.Column(db.String(128), primary_key=True)
+    name = db.Column(db.String(32), primary_key=True)
+    le = db.Column(db.String(16), primary_key=True, default="")
+
+    value = db.Column(db.Float, nullable=False, default=0.0)
@@ -9,7 +9,7 @@ class Subscription(db.Model):
     id = db.Column(db.Integer, primary_key=True)
 
     # 🔗 Relationships done in user model
-    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False, index=True)
 
     # 💰 Payment info
     amount = db.Column(db.Float, nullable=False)
@@ -0,0 +1,22 @@
+from datetime import datetime
+from app.extensions import db
+
+
+class SuppressedEmail(db.Model):
+    """An address we must not send to again (see app/suppression.py)."""
+
+    __tablename__ = "suppressed_email"
+
+    id = db.Column(db.Integer, primary_key=True)
+
+    # stored lowercased
+    email = db.Column(db.String(255), unique=True, nullable=False)
+
+    # hard_bounce | complaint | manual
+    reason = db.Column(db.String(20), nullable=False, default="hard_bounce")
+
+    # smtp (permanent failure while sending) | import | admin
+    source = db.Column(db.String(20), nullable=False, default="smtp")
+
+    detail = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
@@ -28,6 +28,10 @@ class User(UserMixin, db.Model):
     wallet_balance = db.Column(Numeric(12,2), nullable=False, default=Decimal("0.00"))
     current_session_token = db.Column(db.String(128), nullable=True)
 
+    # Latest expires_at of a confirmed subscription, kept in step with
+    # subscriptions (app/services/entitlements.py); premium while in the future.
+    premium_until = db.Column(db.DateTime, nullable=True, index=True)
+
     __table_args__ = (
     CheckConstraint("wallet_balance >= 0", name="wallet_balance_non_negative"),
     )
@@ -1,4 +1,5 @@
 import hmac
+import json
 import hashlib
 from datetime import datetime
 
@@ -32,7 +33,14 @@ def paystack_webhook():
     if not _verify_paystack_signature(raw_body, signature, secret):
         abort(400, description="Invalid Paystack signature")
 
-    payload = request.get_json(silent=True) or {}
+    # The body was read with cache=False above, so request.get_json()
+    # would see an empty stream; parse the bytes that were verified.
+    try:
+        payload = json.loads(raw_body or b"{}")
+    except ValueError:
+        payload = {}
+    if not isinstance(payload, dict):
+        payload = {}
     event = (payload.get("event") or "").strip()
     data = payload.get("data") or {}
 
@@ -55,6 +63,8 @@ def paystack_webhook():
         subscription.is_confirmed = True
         subscription.paid_at = datetime.utcnow()
         subscription.set_expiration(days=366)
+        # Committing invalidates the user's cached entitlement everywhere
+        # (app/services/entitlements.py).
         db.session.commit()
 
         from app.services.referral import handle_referral_bonus
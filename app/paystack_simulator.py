@@ -0,0 +1,310 @@
+# app/paystack_simulator.py
+
+"""
+A local stand-in for the Paystack API, for load and chaos tests of the
+payment flow (`flask paystack-sim`).
+
+    flask paystack-sim --port 5100 --latency-ms 300 --error-rate 0.02 \
+        --webhook-url http://127.0.0.1:5000/payments/webhook/paystack
+    PAYSTACK_BASE_URL=http://127.0.0.1:5100 flask run    # or gunicorn
+
+It implements the calls the app makes:
+
+- POST /transaction/initialize returns an authorization_url on the
+  simulator, /checkout/<reference>. Opening it "pays" (or declines,
+  see decline_rate) and redirects to the callback_url with
+  ?trxref=&reference=, as Paystack's checkout does.
+- GET /transaction/verify/<reference>
+- GET /bank, a short list of Nigerian banks (plus an inactive and a
+  non-NGN one, which the app must filter out)
+
+A successful payment also sends a charge.success webhook to
+webhook_url, signed with the secret key (HMAC-SHA512, the
+x-paystack-signature header), after webhook_delay_ms. Some are sent
+twice (duplicate_webhook_rate), as Paystack does on retries.
+
+API calls must carry the secret key as a Bearer token, like the real
+API; it defaults to the app's PAYSTACK_SECRET_KEY so webhooks verify.
+Every API call waits latency_ms (+- jitter_ms); error_rate of them
+answer 500 and hang_rate of them hang for HANG_SECONDS, longer than the
+app's request timeouts. Transactions are kept in memory only.
+GET /_simulator/stats shows what happened.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import hmac
+import json
+import random
+import threading
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from typing import Any, Dict, Optional
+from urllib.parse import urlencode
+
+import requests
+from flask import Flask, jsonify, redirect, request, url_for
+
+
+DEFAULT_SECRET_KEY = "sk_test_simulator"
+
+# Longer than the timeouts on the app's Paystack calls.
+HANG_SECONDS = 35.0
+
+WEBHOOK_ATTEMPTS = 3
+WEBHOOK_RETRY_SECONDS = 2.0
+WEBHOOK_TIMEOUT_SECONDS = 10.0
+WEBHOOK_THREADS = 8
+
+BANKS = [
+    {"name": "Access Bank", "code": "044"},
+    {"name": "Fidelity Bank", "code": "070"},
+    {"name": "First Bank of Nigeria", "code": "011"},
+    {"name": "Guaranty Trust Bank", "code": "058"},
+    {"name": "Kuda Bank", "code": "50211"},
+    {"name": "Moniepoint MFB", "code": "50515"},
+    {"name": "OPay Digital Services Limited (OPay)", "code": "999992"},
+    {"name": "Sterling Bank", "code": "232"},
+    {"name": "Union Bank of Nigeria", "code": "032"},
+    {"name": "United Bank For Africa", "code": "033"},
+    {"name": "Wema Bank", "code": "035"},
+    {"name": "Zenith Bank", "code": "057"},
+]
+
+
+@dataclass
+class SimulatorSettings:
+    secret_key: str = DEFAULT_SECRET_KEY
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0
+    error_rate: float = 0.0
+    hang_rate: float = 0.0
+    # share of payments that fail at checkout (no webhook is sent)
+    decline_rate: float = 0.0
+    webhook_url: Optional[str] = None
+    webhook_delay_ms: float = 0.0
+    duplicate_webhook_rate: float = 0.0
+    seed: Optional[int] = None
+
+
+class Simulator:
+    """In-memory Paystack state shared by the simulator's request threads."""
+
+    def __init__(self, settings: SimulatorSettings) -> None:
+        self.settings = settings
+        self.rng = random.Random(settings.seed)
+        self.transactions: Dict[str, Dict[str, Any]] = {}
+        self.stats: Counter = Counter()
+        self._lock = threading.Lock()
+        self._webhooks = ThreadPoolExecutor(max_workers=WEBHOOK_THREADS, thread_name_prefix="paystack-webhook")
+
+    def count(self, name: str) -> None:
+        with self._lock:
+            self.stats[name] += 1
+
+    def chance(self, rate: float) -> bool:
+        return rate > 0 and self.rng.random() < rate
+
+    def delay(self) -> None:
+        settings = self.settings
+        seconds = (settings.latency_ms + self.rng.uniform(-settings.jitter_ms, settings.jitter_ms)) / 1000
+        if seconds > 0:
+            time.sleep(seconds)
+
+    # -----------------------------
+    # Transactions
+    # -----------------------------
+
+    def initialize(self, email: str, amount: int, reference: str, callback_url: Optional[str]) -> Optional[Dict[str, Any]]:
+        """Record a pending transaction; None if the reference is taken."""
+        with self._lock:
+            if reference in self.transactions:
+                return None
+            transaction = {
+                "id": len(self.transactions) + 1,
+                "status": "abandoned",
+                "reference": reference,
+                "amount": amount,
+                "currency": "NGN",
+                "channel": "card",
+                "paid_at": None,
+                "created_at": _timestamp(),
+                "customer": {"email": email},
+                "callback_url": callback_url,
+                "access_code": uuid.uuid4().hex[:15],
+            }
+            self.transactions[reference] = transaction
+            return transaction
+
+    def get(self, reference: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            transaction = self.transactions.get(reference)
+            return dict(transaction) if transaction else None
+
+    def pay(self, reference: str) -> Optional[Dict[str, Any]]:
+        """The customer completes checkout; it succeeds unless declined."""
+        with self._lock:
+            transaction = self.transactions.get(reference)
+            if transaction is None:
+                return None
+            if transaction["status"] == "abandoned":
+                declined = self.chance(self.settings.decline_rate)
+                transaction["status"] = "failed" if declined else "success"
+                transaction["paid_at"] = None if declined else _timestamp()
+                self.stats["declined" if declined else "paid"] += 1
+                if not declined:
+                    self._send_webhook("charge.success", transaction)
+            return dict(transaction)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "settings": {k: v for k, v in asdict(self.settings).items() if k != "secret_key"},
+                "transactions": dict(Counter(t["status"] for t in self.transactions.values())),
+                "counters": dict(self.stats),
+            }
+
+    # -----------------------------
+    # Webhooks
+    # -----------------------------
+
+    def sign(self, body: bytes) -> str:
+        return hmac.new(self.settings.secret_key.encode("utf-8"), body, hashlib.sha512).hexdigest()
+
+    def _send_webhook(self, event: str, transaction: Dict[str, Any]) -> None:
+        if not self.settings.webhook_url:
+            return
+        data = {k: v for k, v in transaction.items() if k not in ("callback_url", "access_code")}
+        body = json.dumps({"event": event, "data": data}).encode("utf-8")
+
+        copies = 2 if self.chance(self.settings.duplicate_webhook_rate) else 1
+        for _ in range(copies):
+            self._webhooks.submit(self._deliver, body)
+
+    def _deliver(self, body: bytes) -> None:
+        time.sleep(self.settings.webhook_delay_ms / 1000)
+        headers = {"Content-Type": "application/json", "x-paystack-signature": self.sign(body)}
+
+        for attempt in range(WEBHOOK_ATTEMPTS):
+            try:
+                response = requests.post(
+                    self.settings.webhook_url, data=body, headers=headers, timeout=WEBHOOK_TIMEOUT_SECONDS,
+                )
+                if response.status_code == 200:
+                    self.count("webhooks_delivered")
+                    return
+            except requests.RequestException:
+                pass
+            self.count("webhook_attempts_failed")
+            time.sleep(WEBHOOK_RETRY_SECONDS * (attempt + 1))
+        self.count("webhooks_given_up")
+
+
+def _timestamp() -> str:
+    return datetime.utcnow().isoformat(timespec="milliseconds") + "Z"
+
+
+def _error(message: str, status: int):
+    return jsonify({"status": False, "message": message}), status
+
+
+def create_simulator(settings: Optional[SimulatorSettings] = None) -> Flask:
+    """The simulator as a WSGI app."""
+    app = Flask(__name__)
+    simulator = Simulator(settings or SimulatorSettings())
+    app.extensions["paystack_simulator"] = simulator
+
+    @app.before_request
+    def api_faults():
+        if request.endpoint in ("checkout", "stats", None):
+            return None
+
+        simulator.count("api_calls")
+        if request.headers.get("Authorization") != f"Bearer {simulator.settings.secret_key}":
+            simulator.count("unauthorized")
+            return _error("Invalid key", 401)
+
+        simulator.delay()
+        if simulator.chance(simulator.settings.hang_rate):
+            simulator.count("injected_hangs")
+            time.sleep(HANG_SECONDS)
+        if simulator.chance(simulator.settings.error_rate):
+            simulator.count("injected_errors")
+            return _error("An error occurred", 500)
+        return None
+
+    @app.post("/transaction/initialize")
+    def initialize():
+        payload = request.get_json(silent=True) or {}
+        email = (payload.get("email") or "").strip()
+        try:
+            amount = int(payload.get("amount") or 0)
+        except (TypeError, ValueError):
+            amount = 0
+        if not email or amount <= 0:
+            return _error("Invalid email or amount", 400)
+
+        reference = payload.get("reference") or f"sim_{uuid.uuid4().hex[:12]}"
+        transaction = simulator.initialize(email, amount, reference, payload.get("callback_url"))
+        if transaction is None:
+            return _error("Duplicate Transaction Reference", 400)
+
+        simulator.count("initialized")
+        return jsonify({
+            "status": True,
+            "message": "Authorization URL created",
+            "data": {
+                "authorization_url": url_for("checkout", reference=reference, _external=True),
+                "access_code": transaction["access_code"],
+                "reference": reference,
+            },
+        })
+
+    @app.get("/checkout/<reference>")
+    def checkout(reference: str):
+        transaction = simulator.pay(reference)
+        if transaction is None:
+            return _error("Transaction not found", 404)
+
+        callback_url = transaction.get("callback_url")
+        if not callback_url:
+            return jsonify({"status": True, "data": transaction})
+        separator = "&" if "?" in callback_url else "?"
+        return redirect(callback_url + separator + urlencode({"trxref": reference, "reference": reference}))
+
+    @app.get("/transaction/verify/<reference>")
+    def verify(reference: str):
+        transaction = simulator.get(reference)
+        if transaction is None:
+            return _error("Transaction reference not found", 400)
+
+        simulator.count("verified")
+        transaction.pop("callback_url", None)
+        transaction["gateway_response"] = {
+            "success": "Successful", "failed": "Declined",
+        }.get(transaction["status"], "The transaction was not completed")
+        return jsonify({"status": True, "message": "Verification successful", "data": transaction})
+
+    @app.get("/bank")
+    def banks():
+        data = [
+            {"name": bank["name"], "slug": bank["name"].lower().replace(" ", "-"), "code": bank["code"],
+             "active": True, "currency": "NGN", "type": "nuban", "country": "Nigeria"}
+            for bank in BANKS
+        ]
+        data.append({"name": "Closed Bank", "slug": "closed-bank", "code": "000", "active": False,
+                     "currency": "NGN", "type": "nuban", "country": "Nigeria"})
+        data.append({"name": "Ghana Commercial Bank", "slug": "gcb", "code": "GH040", "active": True,
+                     "currency": "GHS", "type": "ghipss", "country": "Ghana"})
+        return jsonify({"status": True, "message": "Banks retrieved", "data": data})
+
+    @app.get("/_simulator/stats")
+    def stats():
+        return jsonify(simulator.snapshot())
+
+    return app
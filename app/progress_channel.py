@@ -0,0 +1,121 @@
+# app/progress_channel.py
+
+"""
+Live progress for long-running jobs, shared by the processes on one host.
+
+publish() keeps the latest state in memory and also writes it to a
+small JSON file under <instance>/progress/, replaced atomically. A
+Server-Sent Events request served by another gunicorn worker can then
+follow a campaign that runs on a background thread elsewhere.
+Publishing is cheap enough to do several times a second. The job only
+writes to the database at coarse checkpoints.
+
+Readers fall back to the database when there is no entry, e.g. when the
+sender runs on another host (`flask email-worker`).
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from flask import current_app
+
+
+# How often a waiting reader checks the file for updates from other processes.
+FILE_POLL_SECONDS = 0.5
+
+
+class ProgressChannel:
+    def __init__(self, directory: str) -> None:
+        self.directory = directory
+        self._latest: Dict[str, Dict[str, Any]] = {}
+        self._changed = threading.Condition()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def publish(self, key: str, state: Dict[str, Any]) -> None:
+        state = {**state, "published_at": time.time()}
+
+        with self._changed:
+            self._latest[key] = state
+            self._changed.notify_all()
+
+        path = self._path(key)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(state, f)
+            os.replace(tmp, path)
+        except OSError:
+            # Other processes fall back to the database.
+            pass
+
+    def read(self, key: str) -> Optional[Dict[str, Any]]:
+        """The newest state, from this process or the shared file."""
+        with self._changed:
+            local = self._latest.get(key)
+
+        try:
+            with open(self._path(key), encoding="utf-8") as f:
+                shared = json.load(f)
+        except (OSError, ValueError):
+            shared = None
+
+        if local is None or (shared and shared["published_at"] > local["published_at"]):
+            return shared
+        return dict(local)
+
+    def wait(self, key: str, after: float, timeout: float) -> Optional[Dict[str, Any]]:
+        """
+        Return a state published after `after` (a published_at value),
+        or None once `timeout` seconds pass without one. Also returns None
+        as soon as an entry seen before (after > 0) is cleared.
+        """
+        deadline = time.monotonic() + timeout
+
+        while True:
+            state = self.read(key)
+            if state and state["published_at"] > after:
+                return state
+            if state is None and after:
+                return None
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+
+            with self._changed:
+                self._changed.wait(min(FILE_POLL_SECONDS, remaining))
+
+    def clear(self, key: str) -> None:
+        """Drop a finished job's entry; readers then see its final database row."""
+        with self._changed:
+            self._latest.pop(key, None)
+            self._changed.notify_all()
+
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+
+_CHANNELS: Dict[str, ProgressChannel] = {}
+_CHANNELS_LOCK = threading.Lock()
+
+
+def progress_channel() -> ProgressChannel:
+    """The channel for this app's instance folder."""
+    directory = os.path.join(current_app.instance_path, "progress")
+
+    with _CHANNELS_LOCK:
+        channel = _CHANNELS.get(directory)
+        if channel is None:
+            channel = ProgressChannel(directory)
+            _CHANNELS[directory] = channel
+        return channel
@@ -0,0 +1,367 @@
+# app/provider_health.py
+
+"""
+Email provider health shared across processes.
+
+Every gunicorn worker, CLI command and `flask email-worker` keeps a
+local copy of each provider's health and syncs it through the
+email_provider_health table:
+
+- failures are written at once, so a provider that times out in one
+  process goes on cooldown for all of them;
+- successes are batched and written at most every
+  EMAIL_PROVIDER_HEALTH_SYNC_SECONDS;
+- the table is re-read on the same interval.
+
+Health is a rolling (exponentially weighted) success rate and latency.
+Providers are picked by weighted random choice on that health, so a
+slow or flaky provider gets less traffic instead of a fixed slot in the
+chain. Cooldowns grow with consecutive failures, from
+EMAIL_PROVIDER_BASE_COOLDOWN_SECONDS up to EMAIL_PROVIDER_COOLDOWN_SECONDS.
+
+If the table is unavailable (migration not applied, database down),
+health is tracked per process only.
+"""
+
+from __future__ import annotations
+
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+
+from flask import current_app
+from sqlalchemy import case, insert, select, update
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+
+from app.extensions import db
+from app.models.email_provider_health import EmailProviderHealth
+
+
+# Weight of each new send in the rolling averages (~last 20 sends).
+HEALTH_ALPHA = 0.1
+
+# Latencies below this are all treated as "fast".
+LATENCY_FLOOR_SECONDS = 0.5
+
+# Even a failing provider keeps a little traffic once off cooldown,
+# so it can show that it has recovered.
+MIN_WEIGHT = 0.01
+
+# How long to stop using the table after it fails.
+SHARED_RETRY_SECONDS = 60
+
+DEFAULT_SYNC_SECONDS = 5.0
+DEFAULT_BASE_COOLDOWN_SECONDS = 30
+DEFAULT_MAX_COOLDOWN_SECONDS = 600
+DEFAULT_CHAIN_DECAY = 0.5
+
+
+def _ewma(current: Optional[float], value: float, count: int) -> float:
+    """Fold `count` observations averaging `value` into `current`."""
+    if current is None:
+        return value
+    decay = (1 - HEALTH_ALPHA) ** count
+    return current * decay + (1 - decay) * value
+
+
+@dataclass
+class ProviderState:
+    success_rate: float = 1.0
+    latency_seconds: Optional[float] = None
+    consecutive_failures: int = 0
+    cooldown_until: Optional[datetime] = None
+
+    def on_cooldown(self, now: Optional[datetime] = None) -> bool:
+        if self.cooldown_until is None:
+            return False
+        return self.cooldown_until > (now or datetime.utcnow())
+
+    @property
+    def weight(self) -> float:
+        score = self.success_rate ** 2
+        if self.latency_seconds:
+            score *= LATENCY_FLOOR_SECONDS / max(self.latency_seconds, LATENCY_FLOOR_SECONDS)
+        return max(score, MIN_WEIGHT)
+
+
+@dataclass
+class _Pending:
+    """Results not yet written to the table."""
+    successes: int = 0
+    failures: int = 0
+    # failures after the last success in this batch
+    trailing_failures: int = 0
+    latency_total: float = 0.0
+    last_error: Optional[str] = None
+    since: float = field(default_factory=time.monotonic)
+
+
+class ProviderHealth:
+    """Process-wide provider health; use provider_health() for the shared instance."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._states: Dict[str, ProviderState] = {}
+        self._pending: Dict[str, _Pending] = {}
+        self._known_rows: set[str] = set()
+        self._synced_at = 0.0
+        self._syncing = False
+        self._shared_retry_at = 0.0
+
+    # -----------------------------
+    # Settings
+    # -----------------------------
+
+    @staticmethod
+    def _sync_seconds() -> float:
+        return float(current_app.config.get(
+            "EMAIL_PROVIDER_HEALTH_SYNC_SECONDS", DEFAULT_SYNC_SECONDS
+        ))
+
+    @staticmethod
+    def _cooldown_seconds(consecutive_failures: int) -> int:
+        config = current_app.config
+        base = int(config.get("EMAIL_PROVIDER_BASE_COOLDOWN_SECONDS", DEFAULT_BASE_COOLDOWN_SECONDS))
+        cap = int(config.get("EMAIL_PROVIDER_COOLDOWN_SECONDS", DEFAULT_MAX_COOLDOWN_SECONDS))
+        return min(cap, base * 2 ** max(0, consecutive_failures - 1))
+
+    def _shared_available(self) -> bool:
+        return time.monotonic() >= self._shared_retry_at
+
+    def _shared_failed(self, exc: Exception) -> None:
+        self._shared_retry_at = time.monotonic() + SHARED_RETRY_SECONDS
+        current_app.logger.warning(
+            "Shared provider health unavailable, using local state for %ss: %s",
+            SHARED_RETRY_SECONDS,
+            exc,
+        )
+
+    # -----------------------------
+    # Reads
+    # -----------------------------
+
+    def state(self, provider: str) -> ProviderState:
+        self.sync()
+        with self._lock:
+            return self._states.setdefault(provider, ProviderState())
+
+    def snapshot(self) -> Dict[str, ProviderState]:
+        self.sync()
+        with self._lock:
+            return dict(self._states)
+
+    def is_on_cooldown(self, provider: str) -> bool:
+        return self.state(provider).on_cooldown()
+
+    def ranked(self, providers: Iterable[str]) -> List[str]:
+        """
+        Providers not on cooldown, in weighted random order.
+
+        Each provider's weight is its health times EMAIL_PROVIDER_CHAIN_DECAY
+        per position in `providers`, so the chain order stays a preference.
+        """
+        decay = float(current_app.config.get("EMAIL_PROVIDER_CHAIN_DECAY", DEFAULT_CHAIN_DECAY))
+        now = datetime.utcnow()
+
+        keyed = []
+        for position, provider in enumerate(providers):
+            state = self.state(provider)
+            if state.on_cooldown(now):
+                continue
+            weight = state.weight * decay ** position
+            # Weighted sampling without replacement (Efraimidis-Spirakis).
+            keyed.append((random.random() ** (1 / weight), provider))
+
+        keyed.sort(reverse=True)
+        return [provider for _, provider in keyed]
+
+    # -----------------------------
+    # Writes
+    # -----------------------------
+
+    def record_success(self, provider: str, seconds: float) -> None:
+        with self._lock:
+            state = self._states.setdefault(provider, ProviderState())
+            state.success_rate = _ewma(state.success_rate, 1.0, 1)
+            state.latency_seconds = _ewma(state.latency_seconds, seconds, 1)
+            state.consecutive_failures = 0
+            state.cooldown_until = None
+
+            pending = self._pending.setdefault(provider, _Pending())
+            pending.successes += 1
+            pending.trailing_failures = 0
+            pending.latency_total += seconds
+            due = time.monotonic() - pending.since >= self._sync_seconds()
+
+        if due:
+            self.flush(provider)
+
+    def record_failure(self, provider: str, error: object) -> int:
+        """Record a failed send; returns the cooldown applied, in seconds."""
+        with self._lock:
+            state = self._states.setdefault(provider, ProviderState())
+            state.success_rate = _ewma(state.success_rate, 0.0, 1)
+            state.consecutive_failures += 1
+            cooldown = self._cooldown_seconds(state.consecutive_failures)
+            state.cooldown_until = datetime.utcnow() + timedelta(seconds=cooldown)
+
+            pending = self._pending.setdefault(provider, _Pending())
+            pending.failures += 1
+            pending.trailing_failures += 1
+            pending.last_error = str(error)[:1000]
+
+        # Publish straight away so other processes stop trying it.
+        self.flush(provider)
+
+        state = self.state(provider)
+        if state.cooldown_until is None:
+            return cooldown
+        return max(0, int((state.cooldown_until - datetime.utcnow()).total_seconds()))
+
+    def flush(self, provider: Optional[str] = None) -> None:
+        """Write pending results to the table (all providers by default)."""
+        with self._lock:
+            names = [provider] if provider else list(self._pending)
+            batches = {
+                name: self._pending.pop(name)
+                for name in names
+                if name in self._pending
+            }
+
+        if not batches or not self._shared_available():
+            return
+
+        try:
+            for name, batch in batches.items():
+                self._write(name, batch)
+        except SQLAlchemyError as exc:
+            self._shared_failed(exc)
+
+    def sync(self, force: bool = False) -> None:
+        """Flush pending results and re-read the table, at most every sync interval."""
+        with self._lock:
+            if self._syncing:
+                return
+            if not force and time.monotonic() - self._synced_at < self._sync_seconds():
+                return
+            self._syncing = True
+
+        try:
+            self.flush()
+            if not self._shared_available():
+                return
+
+            try:
+                with db.engine.connect() as conn:
+                    rows = conn.execute(select(EmailProviderHealth.__table__)).mappings().all()
+            except SQLAlchemyError as exc:
+                self._shared_failed(exc)
+                return
+
+            with self._lock:
+                for row in rows:
+                    self._known_rows.add(row["provider"])
+                    self._states[row["provider"]] = ProviderState(
+                        success_rate=row["success_rate"],
+                        latency_seconds=row["latency_seconds"],
+                        consecutive_failures=row["consecutive_failures"],
+                        cooldown_until=row["cooldown_until"],
+                    )
+        finally:
+            with self._lock:
+                self._synced_at = time.monotonic()
+                self._syncing = False
+
+    def _ensure_row(self, provider: str) -> None:
+        if provider in self._known_rows:
+            return
+
+        table = EmailProviderHealth.__table__
+        try:
+            with db.engine.begin() as conn:
+                conn.execute(
+                    insert(table).values(
+                        provider=provider,
+                        success_rate=1.0,
+                        consecutive_failures=0,
+                        total_sent=0,
+                        total_failed=0,
+                        updated_at=datetime.utcnow(),
+                    )
+                )
+        except IntegrityError:
+            pass  # another process created it first
+
+        self._known_rows.add(provider)
+
+    def _write(self, provider: str, batch: _Pending) -> None:
+        """Fold one batch into the provider's row, atomically."""
+        self._ensure_row(provider)
+
+        table = EmailProviderHealth.__table__
+        c = table.c
+        now = datetime.utcnow()
+
+        count = batch.successes + batch.failures
+        decay = (1 - HEALTH_ALPHA) ** count
+
+        values = {
+            "success_rate": c.success_rate * decay + (1 - decay) * (batch.successes / count),
+            "total_sent": c.total_sent + batch.successes,
+            "total_failed": c.total_failed + batch.failures,
+            "updated_at": now,
+        }
+
+        if batch.successes:
+            average = batch.latency_total / batch.successes
+            latency_decay = (1 - HEALTH_ALPHA) ** batch.successes
+            values["latency_seconds"] = case(
+                (c.latency_seconds.is_(None), average),
+                else_=c.latency_seconds * latency_decay + (1 - latency_decay) * average,
+            )
+
+        if batch.last_error:
+            values["last_error"] = batch.last_error
+
+        if not batch.trailing_failures:
+            values["consecutive_failures"] = 0
+            values["cooldown_until"] = None
+        elif batch.successes:
+            values["consecutive_failures"] = batch.trailing_failures
+        else:
+            values["consecutive_failures"] = c.consecutive_failures + batch.trailing_failures
+
+        with db.engine.begin() as conn:
+            conn.execute(update(table).where(c.provider == provider).values(**values))
+
+            if not batch.trailing_failures:
+                return
+
+            # The cooldown depends on failures seen by every process.
+            row = conn.execute(
+                select(c.consecutive_failures, c.cooldown_until).where(c.provider == provider)
+            ).one()
+            cooldown_until = now + timedelta(seconds=self._cooldown_seconds(row.consecutive_failures))
+            if row.cooldown_until and row.cooldown_until > cooldown_until:
+                cooldown_until = row.cooldown_until
+
+            conn.execute(
+                update(table)
+                .where(c.provider == provider)
+                .values(cooldown_until=cooldown_until)
+            )
+
+        with self._lock:
+            state = self._states.setdefault(provider, ProviderState())
+            state.consecutive_failures = row.consecutive_failures
+            state.cooldown_until = cooldown_until
+
+
+_HEALTH = ProviderHealth()
+
+
+def provider_health() -> ProviderHealth:
+    return _HEALTH
@@ -0,0 +1,242 @@
+# app/query_budget.py
+
+"""
+Query budgets: how many SQL statements each page may run.
+
+count_queries() records every statement executed on the current thread
+while it is open. A page over its budget, or one that runs the same SQL
+(with different parameters) more than REPEAT_LIMIT times, has usually
+grown a lazy load or a query per row in a loop, i.e. an N+1.
+
+- ENDPOINT_BUDGETS holds a baseline for the main pages of the quiz,
+  dashboard, admin and referrals blueprints, measured on the sample
+  data (app/sample_data.py). Lower a budget when
+  a page gets cheaper; raising one should come with a reason.
+- `flask check-queries` seeds a scratch database, requests every page
+  in PAGE_CHECKS as a logged-in member or admin, and exits 1 if any
+  page breaks its budget. Run it before deploying.
+- With REQUEST_PROFILING_ENABLED, production requests are held to the
+  same budgets (app/request_profile.py).
+- @query_budget(n) or `with count_queries() as log` guard any other
+  function or script.
+"""
+
+from __future__ import annotations
+
+import functools
+import os
+import shutil
+import tempfile
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+# Identical statements allowed per request before it counts as an N+1.
+REPEAT_LIMIT = 3
+
+# Statements per request with caches warm: what the page ran on the
+# sample data, plus 2. Pages seen by admins and members alike are
+# budgeted for the admin view, which does more.
+ENDPOINT_BUDGETS: Dict[str, int] = {
+    "dashboard.index": 12,
+    "quiz.choose_level": 3,
+    "quiz.history": 7,
+    "quiz.start": 6,
+    "quiz.take": 7,
+    "quiz.result": 5,
+    "referrals.referral_stats": 6,
+    "referrals.withdrawal_history": 3,
+    "admin.manage_subscriptions": 4,
+    "admin.withdrawals": 3,
+    "admin.suppressions": 4,
+    "admin.upload_questions": 2,
+}
+
+
+def budget_for(endpoint: Optional[str], default: int = 0) -> int:
+    """The endpoint's statement budget, or `default` (0 = none)."""
+    return ENDPOINT_BUDGETS.get(endpoint or "", default)
+
+
+# -----------------------------
+# Counting
+# -----------------------------
+
+@dataclass
+class QueryLog:
+    statements: List[str] = field(default_factory=list)
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    def repeated(self, limit: int = REPEAT_LIMIT) -> List[Tuple[str, int]]:
+        """Statements run more than `limit` times, most repeated first."""
+        return [
+            (statement, count)
+            for statement, count in Counter(self.statements).most_common()
+            if count > limit
+        ]
+
+
+_active = threading.local()
+
+
+def _record_statement(conn, cursor, statement, parameters, context, executemany) -> None:
+    for log in getattr(_active, "logs", ()):
+        log.statements.append(statement)
+
+
+@contextmanager
+def count_queries() -> Iterator[QueryLog]:
+    """Collect the statements this thread executes inside the block."""
+    if not event.contains(Engine, "before_cursor_execute", _record_statement):
+        event.listen(Engine, "before_cursor_execute", _record_statement)
+
+    log = QueryLog()
+    logs = getattr(_active, "logs", None)
+    if logs is None:
+        logs = _active.logs = []
+    logs.append(log)
+    try:
+        yield log
+    finally:
+        logs.remove(log)
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+def budget_problems(log: QueryLog, max_queries: int, max_repeats: int = REPEAT_LIMIT) -> List[str]:
+    """Why `log` breaks the budget; empty if it does not."""
+    problems = []
+    if max_queries and log.count > max_queries:
+        problems.append(f"{log.count} statements (budget {max_queries})")
+    for statement, count in log.repeated(max_repeats):
+        problems.append(f"{count}x {' '.join(statement.split())[:200]}")
+    return problems
+
+
+def query_budget(max_queries: int, max_repeats: int = REPEAT_LIMIT) -> Callable:
+    """Decorator: raise QueryBudgetExceeded if a call breaks the budget."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with count_queries() as log:
+                result = fn(*args, **kwargs)
+            problems = budget_problems(log, max_queries, max_repeats)
+            if problems:
+                raise QueryBudgetExceeded(f"{fn.__qualname__}: " + "; ".join(problems))
+            return result
+        return wrapper
+    return decorator
+
+
+# -----------------------------
+# Page checks (flask check-queries)
+# -----------------------------
+
+@dataclass
+class PageCheck:
+    endpoint: str
+    as_admin: bool = False
+    # url_for arguments, from the seeded SampleData
+    args: Callable = lambda data: {}
+
+
+# referrals.request_withdrawal is left out: its GET fetches the bank
+# list from Paystack.
+PAGE_CHECKS: List[PageCheck] = [
+    PageCheck("dashboard.index"),
+    PageCheck("dashboard.index", as_admin=True),
+    PageCheck("quiz.choose_level"),
+    PageCheck("quiz.history"),
+    PageCheck("quiz.start", args=lambda data: {"level": "l5-7", "qt": "psr"}),
+    PageCheck("quiz.take", args=lambda data: {"session_id": data.open_session_id, "q": 2}),
+    PageCheck("quiz.result", args=lambda data: {"session_id": data.submitted_session_id}),
+    PageCheck("referrals.referral_stats"),
+    PageCheck("referrals.withdrawal_history"),
+    PageCheck("admin.manage_subscriptions", as_admin=True),
+    PageCheck("admin.withdrawals", as_admin=True),
+    PageCheck("admin.suppressions", as_admin=True),
+    PageCheck("admin.upload_questions", as_admin=True),
+]
+
+
+@dataclass
+class PageResult:
+    check: PageCheck
+    url: str
+    status: int
+    log: QueryLog
+    budget: int
+    problems: List[str]
+
+    @property
+    def ok(self) -> bool:
+        return not self.problems
+
+
+def run_page_checks(checks: List[PageCheck] = PAGE_CHECKS) -> List[PageResult]:
+    """
+    Request each page on a fresh app backed by a scratch sqlite database
+    with sample data; the configured database is never touched.
+
+    Each page is requested twice and the second, warm-cache request is
+    measured.
+    """
+    from flask import url_for
+
+    from app import create_app
+    from app.extensions import db
+    from app.sample_data import seed_sample_data, session_token_for
+
+    scratch = tempfile.mkdtemp(prefix="check-queries-")
+    try:
+        app = create_app({
+            "SQLALCHEMY_DATABASE_URI": "sqlite:///" + os.path.join(scratch, "check.db"),
+            "TESTING": True,
+            "REQUEST_PROFILING_ENABLED": False,
+        })
+        app.instance_path = scratch
+
+        with app.app_context():
+            db.create_all()
+            data = seed_sample_data()
+
+        results = []
+        for check in checks:
+            user_id = data.admin_id if check.as_admin else data.member_id
+            client = app.test_client()
+            with client.session_transaction() as session:
+                session["_user_id"] = str(user_id)
+                session["_fresh"] = True
+                session["session_token"] = session_token_for(user_id)
+
+            with app.test_request_context():
+                url = url_for(check.endpoint, **check.args(data))
+
+            client.get(url)
+            with count_queries() as log:
+                response = client.get(url)
+
+            if response.status_code >= 400:
+                problems = [f"HTTP {response.status_code}"]
+            else:
+                problems = budget_problems(log, budget_for(check.endpoint))
+            results.append(PageResult(
+                check, url, response.status_code, log, budget_for(check.endpoint), problems,
+            ))
+
+        with app.app_context():
+            db.engine.dispose()
+        return results
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
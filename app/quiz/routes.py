@@ -18,9 +18,9 @@ from sqlalchemy import desc, func
 from sqlalchemy.orm import joinedload
 
 from app.extensions import db
-from app.models.subscription import Subscription
 from app.models.quiz import Question, Choice, QuizSession, UserAnswer
 from app.services.difficulty import level_to_band
+from app.services.entitlements import has_active_subscription
 from app.services.question_selector import pick_questions_fast
 from . import quiz_bp
 
@@ -41,20 +41,8 @@ ALLOWED_BANDS = ["l1-4", "l5-7", "l8-10", "l12-14", "l15-16", "l17", "confirmati
 # -------------------- helpers --------------------
 
 def user_is_subscribed(user) -> bool:
-    """Active subscription = confirmed + not expired."""
-    now = datetime.utcnow()
-    sub = (
-        Subscription.query
-        .filter(
-            Subscription.user_id == user.id,
-            Subscription.is_confirmed.is_(True),
-            Subscription.expires_at.isnot(None),
-            Subscription.expires_at > now,
-        )
-        .order_by(Subscription.expires_at.desc())
-        .first()
-    )
-    return sub is not None
+    """Active subscription = confirmed + not expired (cached, see app/services/entitlements.py)."""
+    return has_active_subscription(user.id)
 
 
 def needed_count(is_paid: bool) -> int:
@@ -469,12 +457,9 @@ def result(session_id: int):
             "status": status,
         })
 
-    session.score = correct
-    db.session.commit()
-
     percent = round((correct / total) * 100, 2) if total else 0.0
 
-    return render_template(
+    page = render_template(
         "quiz/result.html",
         session=session,
         percent=percent,
@@ -484,4 +469,12 @@ def result(session_id: int):
         correct=correct,
         wrong=wrong,
         review=review,
-    )
\ No newline at end of file
+    )
+
+    # Saved after rendering: a commit expires the questions and choices
+    # loaded above, and the template would reload every choice one by one.
+    if session.score != correct:
+        session.score = correct
+        db.session.commit()
+
+    return page
\ No newline at end of file
@@ -4,6 +4,7 @@ from flask_login import login_required, current_user
 from app.models import ReferralEarning, User  # adjust import paths if different
 from app.extensions import db
 from sqlalchemy import func
+from sqlalchemy.orm import joinedload
 from . import referral_bp
 # app/referrals/routes.py
 from app.models.withdrawal import WithdrawalRequest
@@ -25,7 +26,9 @@ def referral_stats():
         referrer_id=current_user.id
     ).count()
 
-    recent_earnings = ReferralEarning.query.filter_by(
+    recent_earnings = ReferralEarning.query.options(
+        joinedload(ReferralEarning.referred_user)
+    ).filter_by(
         referrer_id=current_user.id
     ).order_by(ReferralEarning.created_at.desc())\
      .limit(10).all()
@@ -0,0 +1,303 @@
+# app/replay.py
+
+"""
+Replay captured traffic (app/request_capture.py) against an instance,
+for `flask bench replay`.
+
+    # on the candidate build, with a copy of the production database:
+    flask run --port 5001 &        # or gunicorn, as deployed
+    flask bench replay instance/captures/ --base-url http://127.0.0.1:5001 \
+        --speedup 4 --concurrency 32 --output replay.json
+
+Requests are sent at their captured offsets divided by --speedup, from
+a pool of --concurrency client threads, so an exam-morning hour
+replayed at 4x arrives as the same mix in 15 minutes. Each client
+follows no redirects: the captured redirect targets are requests of
+their own.
+
+Captured users are logged in with a session cookie signed with this
+app's SECRET_KEY and carrying the user's current_session_token, so run
+the command with the target's configuration (SECRET_KEY, DATABASE_URL).
+Users without a session token are replayed logged out.
+
+Records that cannot be rebuilt are skipped and counted: uploads, JSON
+bodies (webhooks) and redacted values. The report has the usual
+percentiles per endpoint plus error rates (5xx or no response), how
+many responses differ in status from the capture, and how far the
+clients fell behind the schedule. `flask bench compare` reads it too.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import requests
+from flask import Flask, url_for
+from werkzeug.routing import BuildError
+
+from app.bench import git_commit, summarize
+from app.extensions import db
+from app.models import User
+from app.request_capture import PREFIX, REDACTED, SUFFIX
+
+
+def load_capture(paths: Iterable[str]) -> List[Dict[str, Any]]:
+    """Records from capture files or directories of them, oldest first."""
+    files: List[str] = []
+    for path in paths:
+        if os.path.isdir(path):
+            files += sorted(
+                os.path.join(path, name) for name in os.listdir(path)
+                if name.startswith(PREFIX) and name.endswith(SUFFIX)
+            )
+        else:
+            files.append(path)
+
+    records = []
+    for path in files:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    # a worker killed mid-write leaves a partial last line
+                    continue
+    return sorted(records, key=lambda record: record["ts"])
+
+
+# -----------------------------
+# Planning
+# -----------------------------
+
+@dataclass
+class PlannedRequest:
+    offset: float  # seconds after the first captured request
+    method: str
+    endpoint: str
+    url: str
+    data: Optional[Dict[str, str]]
+    user_id: Optional[int]
+    captured_status: int
+
+
+def _skip_reason(record: Dict[str, Any]) -> Optional[str]:
+    if record.get("files"):
+        return "upload"
+    if record.get("json"):
+        return "json body"
+    values = list(record.get("view_args", {}).values())
+    values += [value for values in record.get("args", {}).values() for value in values]
+    if REDACTED in values:
+        return "redacted"
+    return None
+
+
+def plan_requests(app: Flask, records: List[Dict[str, Any]]) -> Tuple[List[PlannedRequest], Counter]:
+    """Rebuild each record's URL and form; returns (planned, skipped per reason)."""
+    planned: List[PlannedRequest] = []
+    skipped: Counter = Counter()
+    if not records:
+        return planned, skipped
+
+    first = records[0]["ts"]
+    with app.test_request_context():
+        for record in records:
+            reason = _skip_reason(record)
+            if reason:
+                skipped[reason] += 1
+                continue
+
+            try:
+                url = url_for(record["endpoint"], **record.get("view_args", {}), **record.get("args", {}))
+            except (BuildError, TypeError, ValueError):
+                skipped["unknown endpoint"] += 1
+                continue
+
+            data = None
+            if record["method"] not in ("GET", "HEAD"):
+                form_values = record.get("form_values", {})
+                data = {name: form_values.get(name, "") for name in record.get("form", [])}
+
+            planned.append(PlannedRequest(
+                offset=record["ts"] - first,
+                method=record["method"],
+                endpoint=record["endpoint"],
+                url=url,
+                data=data,
+                user_id=record.get("user_id"),
+                captured_status=record.get("status", 0),
+            ))
+    return planned, skipped
+
+
+def session_cookies(app: Flask, user_ids: Iterable[int]) -> Dict[int, str]:
+    """Signed session cookie values for the users that have a session token."""
+    user_ids = {user_id for user_id in user_ids if user_id is not None}
+    if not user_ids:
+        return {}
+
+    with app.app_context():
+        tokens = dict(
+            db.session.query(User.id, User.current_session_token)
+            .filter(User.id.in_(user_ids), User.current_session_token.isnot(None))
+            .all()
+        )
+
+    serializer = app.session_interface.get_signing_serializer(app)
+    return {
+        user_id: serializer.dumps({"_user_id": str(user_id), "_fresh": True, "session_token": token})
+        for user_id, token in tokens.items()
+    }
+
+
+# -----------------------------
+# Replaying
+# -----------------------------
+
+@dataclass
+class _Outcome:
+    endpoint: str
+    seconds: float
+    lag: float
+    status: Optional[int]
+    captured_status: int
+
+
+@dataclass
+class _Results:
+    outcomes: List[_Outcome] = field(default_factory=list)
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+    def add(self, outcome: _Outcome) -> None:
+        with self.lock:
+            self.outcomes.append(outcome)
+
+
+def _status_class(status: Optional[int]) -> str:
+    return f"{status // 100}xx" if status else "no response"
+
+
+def replay(
+    app: Flask,
+    planned: List[PlannedRequest],
+    base_url: str,
+    speedup: float = 1.0,
+    concurrency: int = 16,
+    timeout: float = 30.0,
+) -> Dict[str, Any]:
+    """Send the planned requests on their schedule; returns the report's results."""
+    cookies = session_cookies(app, (request.user_id for request in planned))
+    cookie_name = app.config["SESSION_COOKIE_NAME"]
+    base_url = base_url.rstrip("/")
+    results = _Results()
+    local = threading.local()
+
+    def send(request: PlannedRequest, due: float, started: float) -> None:
+        http = getattr(local, "http", None)
+        if http is None:
+            http = local.http = requests.Session()
+        # Responses set session cookies; never carry them to the next user.
+        http.cookies.clear()
+
+        headers = {}
+        cookie = cookies.get(request.user_id)
+        if cookie:
+            headers["Cookie"] = f"{cookie_name}={cookie}"
+
+        sent = time.perf_counter()
+        try:
+            response = http.request(
+                request.method, base_url + request.url, data=request.data,
+                headers=headers, allow_redirects=False, timeout=timeout,
+            )
+            status = response.status_code
+        except requests.RequestException:
+            status = None
+        results.add(_Outcome(
+            endpoint=request.endpoint,
+            seconds=time.perf_counter() - sent,
+            lag=sent - started - due,
+            status=status,
+            captured_status=request.captured_status,
+        ))
+
+    speedup = max(speedup, 0.001)
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for request in planned:
+            due = request.offset / speedup
+            delay = due - (time.perf_counter() - started)
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(send, request, due, started)
+    elapsed = time.perf_counter() - started
+
+    return _report(results.outcomes, elapsed)
+
+
+def _summary(outcomes: List[_Outcome]) -> Dict[str, Any]:
+    errors = sum(1 for o in outcomes if o.status is None or o.status >= 500)
+    summary = summarize([o.seconds for o in outcomes], errors)
+    summary["error_rate"] = round(errors / len(outcomes), 4) if outcomes else 0.0
+    summary["status"] = dict(Counter(_status_class(o.status) for o in outcomes))
+    summary["changed_status"] = sum(1 for o in outcomes if o.status != o.captured_status)
+    return summary
+
+
+def _report(outcomes: List[_Outcome], elapsed: float) -> Dict[str, Any]:
+    by_endpoint: Dict[str, List[_Outcome]] = defaultdict(list)
+    for outcome in outcomes:
+        by_endpoint[outcome.endpoint].append(outcome)
+
+    lag = summarize([max(o.lag, 0.0) for o in outcomes])
+    return {
+        "duration_seconds": round(elapsed, 3),
+        "throughput_rps": round(len(outcomes) / elapsed, 2) if elapsed else 0.0,
+        "total": _summary(outcomes),
+        "lag": {key: value for key, value in lag.items() if key.endswith("_ms")},
+        "results": {
+            endpoint: _summary(by_endpoint[endpoint]) for endpoint in sorted(by_endpoint)
+        },
+    }
+
+
+def replay_capture(
+    app: Flask,
+    paths: Iterable[str],
+    base_url: str,
+    speedup: float = 1.0,
+    concurrency: int = 16,
+    limit: Optional[int] = None,
+    timeout: float = 30.0,
+) -> Dict[str, Any]:
+    """Load, plan and replay; returns the JSON-ready report."""
+    records = load_capture(paths)
+    if limit:
+        records = records[:limit]
+    planned, skipped = plan_requests(app, records)
+
+    report = {
+        "created_at": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+        "commit": git_commit(),
+        "base_url": base_url,
+        "speedup": speedup,
+        "concurrency": concurrency,
+        "captured": len(records),
+        "replayed": len(planned),
+        "skipped": dict(skipped),
+        "results": {},
+    }
+    if planned:
+        report.update(replay(app, planned, base_url, speedup, concurrency, timeout))
+    return report
@@ -0,0 +1,122 @@
+# app/request_capture.py
+
+"""
+Request capture for load replays (opt-in: REQUEST_CAPTURE_ENABLED).
+
+Each finished request is appended as one JSON line to
+<REQUEST_CAPTURE_DIR>/requests.<day>.<pid>.jsonl (default dir:
+<instance>/captures), one file per process so workers never interleave
+lines. A record holds what a replay needs and nothing personal:
+
+    {"ts": 1760861234.52, "method": "POST", "endpoint": "quiz.take",
+     "view_args": {"session_id": 812}, "args": {"q": ["3"]},
+     "form": ["action", "choice_id"], "form_values": {"action": "next", ...},
+     "files": [], "json": false, "user_id": 41, "status": 302,
+     "duration_ms": 38.2}
+
+- Query and URL values whose name looks secret (tokens, references,
+  emails, codes, ...) are replaced by REDACTED.
+- Form values are dropped; only the keys are kept, except the few in
+  FORM_VALUE_KEYS that steer the quiz (which answer, which button).
+- Uploaded files and JSON bodies are never written, only flagged.
+
+`flask bench replay` (app/replay.py) plays the files back against a
+local instance. Static files and unmatched URLs are not captured.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import re
+import time
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from flask import current_app, g, request, session
+
+
+REDACTED = "[redacted]"
+PREFIX = "requests."
+SUFFIX = ".jsonl"
+
+SECRET_NAME = re.compile(
+    r"token|password|secret|key|signature|reference|trxref|code|email|otp|ref$",
+    re.IGNORECASE,
+)
+
+# Form fields whose values are kept: they only pick the answer and the
+# quiz navigation, and the replay needs them to follow the same path.
+FORM_VALUE_KEYS = frozenset({"choice_id", "action", "action_field", "jump_to"})
+
+SKIPPED_ENDPOINTS = frozenset({"static"})
+
+
+def capture_directory(app=None) -> str:
+    app = app or current_app
+    return app.config.get("REQUEST_CAPTURE_DIR") or os.path.join(app.instance_path, "captures")
+
+
+def _clean(name: str, value: Any) -> Any:
+    return REDACTED if SECRET_NAME.search(name) else value
+
+
+def capture_record(status: int, duration: float) -> Dict[str, Any]:
+    """The sanitized record of the current request."""
+    user_id: Optional[str] = session.get("_user_id")
+    form_keys = sorted(request.form.keys())
+
+    return {
+        "ts": round(g._capture_ts, 3),
+        "method": request.method,
+        "endpoint": request.endpoint,
+        "view_args": {
+            name: _clean(name, value) for name, value in (request.view_args or {}).items()
+        },
+        "args": {
+            name: [_clean(name, value) for value in values]
+            for name, values in request.args.lists()
+        },
+        "form": form_keys,
+        "form_values": {
+            name: request.form.get(name) for name in form_keys if name in FORM_VALUE_KEYS
+        },
+        "files": sorted(request.files.keys()),
+        "json": request.is_json,
+        "user_id": int(user_id) if user_id and user_id.isdigit() else None,
+        "status": status,
+        "duration_ms": round(duration * 1000, 2),
+    }
+
+
+def _start_capture() -> None:
+    g._capture_ts = time.time()
+    g._capture_started = time.perf_counter()
+
+
+def _finish_capture(response):
+    started = g.pop("_capture_started", None)
+    if started is None or request.endpoint is None or request.endpoint in SKIPPED_ENDPOINTS:
+        return response
+
+    record = capture_record(response.status_code, time.perf_counter() - started)
+    directory = capture_directory()
+    day = datetime.utcnow().strftime("%Y%m%d")
+    path = os.path.join(directory, f"{PREFIX}{day}.{os.getpid()}{SUFFIX}")
+
+    try:
+        os.makedirs(directory, exist_ok=True)
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, separators=(",", ":"), default=str) + "\n")
+    except OSError as exc:
+        current_app.logger.warning("Request not captured: %s", exc)
+    return response
+
+
+def init_request_capture(app) -> None:
+    """Install the capture hooks if REQUEST_CAPTURE_ENABLED."""
+    if not app.config.get("REQUEST_CAPTURE_ENABLED"):
+        return
+
+    app.before_request(_start_capture)
+    app.after_request(_finish_capture)
@@ -0,0 +1,476 @@
+# app/request_profile.py
+
+"""
+Per-endpoint request profiling (opt-in: REQUEST_PROFILING_ENABLED).
+
+Each request is measured for:
+
+- wall: from the first before_request hook to the last after_request hook
+- sql: time spent executing statements (SQLAlchemy cursor events)
+- queries: number of statements executed
+- template: time inside render_template, including any SQL it triggers
+
+Each process buffers these per endpoint (quiz.take, dashboard.index, ...)
+and adds them to the request_metrics table at most every
+REQUEST_METRICS_FLUSH_SECONDS, as histograms in five-minute slots.
+/admin/performance and /admin/metrics sum the slots of the last
+REQUEST_PROFILE_WINDOW_MINUTES, so their percentiles are rolling and
+cover every gunicorn worker. Older slots are deleted when flushing.
+
+A request over its statement budget (app/query_budget.py, else
+REQUEST_QUERY_BUDGET), over REQUEST_TIME_BUDGET_MS, or running the same
+statement more than REPEAT_LIMIT times (an N+1) is logged with its
+numbers and the most repeated statement.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from flask import (
+    before_render_template,
+    current_app,
+    g,
+    has_app_context,
+    has_request_context,
+    request,
+    template_rendered,
+)
+from sqlalchemy import delete, event, insert, select, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+
+from app.email_metrics import PhaseSummary
+from app.extensions import db
+from app.models.request_metric import RequestMetric
+from app.query_budget import REPEAT_LIMIT, budget_for
+
+
+# Histogram bucket upper bounds.
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+HISTOGRAMS = {
+    "wall": SECONDS_BUCKETS,
+    "sql": SECONDS_BUCKETS,
+    "template": SECONDS_BUCKETS,
+    "queries": QUERY_BUCKETS,
+}
+INF = "+Inf"
+
+SLOT_MINUTES = 5
+DEFAULT_WINDOW_MINUTES = 60
+DEFAULT_FLUSH_SECONDS = 10.0
+
+# How long to stop writing to the table after it fails.
+SHARED_RETRY_SECONDS = 60
+
+# Requests that matched no route (404s, scanners).
+UNMATCHED = "<unmatched>"
+
+MetricKey = Tuple[str, str, str]  # (endpoint, name, le)
+
+
+def _format_bound(bound: float) -> str:
+    return f"{bound:g}"
+
+
+def _bucket_label(value: float, bounds) -> str:
+    for bound in bounds:
+        if value <= bound:
+            return _format_bound(bound)
+    return INF
+
+
+def slot_start(moment: datetime) -> datetime:
+    return moment.replace(
+        minute=moment.minute - moment.minute % SLOT_MINUTES, second=0, microsecond=0
+    )
+
+
+def _window_start(window_minutes: Optional[float] = None) -> datetime:
+    if window_minutes is None:
+        window_minutes = float(current_app.config.get(
+            "REQUEST_PROFILE_WINDOW_MINUTES", DEFAULT_WINDOW_MINUTES
+        ))
+    return slot_start(datetime.utcnow() - timedelta(minutes=window_minutes))
+
+
+class RequestMetrics:
+    """Process-wide buffer; use request_metrics() for the shared instance."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._pending: Dict[Tuple[datetime, str, str, str], float] = defaultdict(float)
+        self._since = time.monotonic()
+        self._shared_retry_at = 0.0
+
+    def record(
+        self,
+        endpoint: str,
+        wall: float,
+        sql: float,
+        template: float,
+        queries: int,
+        over_budget: bool = False,
+    ) -> None:
+        slot = slot_start(datetime.utcnow())
+        values = {"wall": wall, "sql": sql, "template": template, "queries": queries}
+
+        with self._lock:
+            self._pending[(slot, endpoint, "requests", "")] += 1
+            if over_budget:
+                self._pending[(slot, endpoint, "over_budget", "")] += 1
+            for name, value in values.items():
+                self._pending[(slot, endpoint, name, _bucket_label(value, HISTOGRAMS[name]))] += 1
+                self._pending[(slot, endpoint, name, "sum")] += value
+        self._maybe_flush()
+
+    # -----------------------------
+    # Shared table
+    # -----------------------------
+
+    def _maybe_flush(self) -> None:
+        if not has_app_context():
+            return
+
+        interval = float(current_app.config.get(
+            "REQUEST_METRICS_FLUSH_SECONDS", DEFAULT_FLUSH_SECONDS
+        ))
+        if time.monotonic() - self._since >= interval:
+            self.flush()
+
+    def flush(self) -> None:
+        """Add buffered requests to the table and drop expired slots (needs an app context)."""
+        with self._lock:
+            pending, self._pending = self._pending, defaultdict(float)
+            self._since = time.monotonic()
+
+        if not pending or time.monotonic() < self._shared_retry_at:
+            return
+
+        table = RequestMetric.__table__
+        c = table.c
+
+        try:
+            with unprofiled(), db.engine.begin() as conn:
+                for (slot, endpoint, name, le), delta in pending.items():
+                    key = (c.slot == slot) & (c.endpoint == endpoint) & (c.name == name) & (c.le == le)
+                    result = conn.execute(
+                        update(table).where(key).values(value=c.value + delta)
+                    )
+                    if result.rowcount:
+                        continue
+                    try:
+                        with conn.begin_nested():
+                            conn.execute(
+                                insert(table).values(
+                                    slot=slot, endpoint=endpoint, name=name, le=le, value=delta
+                                )
+                            )
+                    except IntegrityError:
+                        # Created by another process in the meantime.
+                        conn.execute(
+                            update(table).where(key).values(value=c.value + delta)
+                        )
+
+                conn.execute(delete(table).where(c.slot < _window_start()))
+        except SQLAlchemyError as exc:
+            self._shared_retry_at = time.monotonic() + SHARED_RETRY_SECONDS
+            current_app.logger.warning(
+                "Request metrics not saved (%s observations dropped): %s",
+                len(pending),
+                exc,
+            )
+
+    def snapshot(self, window_minutes: Optional[float] = None) -> Dict[MetricKey, float]:
+        """The window's metrics from all processes, including this one's unflushed ones."""
+        self.flush()
+
+        table = RequestMetric.__table__
+        c = table.c
+        try:
+            with unprofiled(), db.engine.connect() as conn:
+                rows = conn.execute(
+                    select(c.endpoint, c.name, c.le, c.value)
+                    .where(c.slot >= _window_start(window_minutes))
+                ).all()
+        except SQLAlchemyError as exc:
+            current_app.logger.warning("Request metrics unavailable: %s", exc)
+            return {}
+
+        totals: Dict[MetricKey, float] = defaultdict(float)
+        for row in rows:
+            totals[(row.endpoint, row.name, row.le)] += row.value
+        return dict(totals)
+
+
+_METRICS = RequestMetrics()
+
+
+def request_metrics() -> RequestMetrics:
+    return _METRICS
+
+
+# -----------------------------
+# Measuring
+# -----------------------------
+
+@dataclass
+class RequestProfile:
+    endpoint: str
+    started: float = field(default_factory=time.perf_counter)
+    sql_seconds: float = 0.0
+    queries: int = 0
+    statements: Counter = field(default_factory=Counter)
+    template_seconds: float = 0.0
+    template_depth: int = 0
+    template_started: float = 0.0
+
+
+def current_profile() -> Optional[RequestProfile]:
+    """The profile of the request being handled, if it is being profiled."""
+    if not has_request_context():
+        return None
+    return g.get("_request_profile")
+
+
+@contextmanager
+def unprofiled():
+    """Leave the statements run inside out of the current request's profile."""
+    profile = g.pop("_request_profile", None) if has_request_context() else None
+    try:
+        yield
+    finally:
+        if profile is not None:
+            g._request_profile = profile
+
+
+def _sql_started(conn, cursor, statement, parameters, context, executemany) -> None:
+    if current_profile() is not None:
+        conn.info.setdefault("_profile_started", []).append(time.perf_counter())
+
+
+def _sql_finished(conn, cursor, statement, *args) -> None:
+    profile = current_profile()
+    started = conn.info.get("_profile_started")
+    if profile is not None and started:
+        profile.sql_seconds += time.perf_counter() - started.pop()
+        profile.queries += 1
+        profile.statements[statement] += 1
+
+
+def _sql_failed(context) -> None:
+    if context.connection is not None:
+        _sql_finished(context.connection, context.cursor, context.statement)
+
+
+def _template_started(sender, template, context, **extra) -> None:
+    profile = current_profile()
+    if profile is None:
+        return
+    # Only the outermost render: includes and extends happen inside it.
+    if profile.template_depth == 0:
+        profile.template_started = time.perf_counter()
+    profile.template_depth += 1
+
+
+def _template_finished(sender, template, context, **extra) -> None:
+    profile = current_profile()
+    if profile is None or profile.template_depth == 0:
+        return
+    profile.template_depth -= 1
+    if profile.template_depth == 0:
+        profile.template_seconds += time.perf_counter() - profile.template_started
+
+
+def _start_profile() -> None:
+    if request.endpoint == "static":
+        return
+    g._request_profile = RequestProfile(request.endpoint or UNMATCHED)
+
+
+def _finish_profile(response):
+    profile = g.pop("_request_profile", None)
+    if profile is not None:
+        _record(profile, response.status_code)
+    return response
+
+
+def _teardown_profile(exc) -> None:
+    # Only still set if the request failed before after_request ran.
+    profile = g.pop("_request_profile", None)
+    if profile is not None:
+        _record(profile, 500)
+
+
+def _record(profile: RequestProfile, status: int) -> None:
+    wall = time.perf_counter() - profile.started
+    config = current_app.config
+
+    query_budget = budget_for(profile.endpoint, int(config.get("REQUEST_QUERY_BUDGET") or 0))
+    time_budget_ms = float(config.get("REQUEST_TIME_BUDGET_MS") or 0)
+    statement, repeats = (profile.statements.most_common(1) or [("", 0)])[0]
+    over_budget = bool(
+        (query_budget and profile.queries > query_budget)
+        or (time_budget_ms and wall * 1000 > time_budget_ms)
+        or repeats > REPEAT_LIMIT
+    )
+
+    if over_budget:
+        current_app.logger.warning(
+            "Request over budget: endpoint=%s method=%s path=%s status=%s "
+            "wall_ms=%.1f sql_ms=%.1f queries=%s template_ms=%.1f repeated=%sx %s",
+            profile.endpoint,
+            request.method,
+            request.path,
+            status,
+            wall * 1000,
+            profile.sql_seconds * 1000,
+            profile.queries,
+            profile.template_seconds * 1000,
+            repeats,
+            " ".join(statement.split())[:200],
+        )
+
+    request_metrics().record(
+        profile.endpoint,
+        wall=wall,
+        sql=profile.sql_seconds,
+        template=profile.template_seconds,
+        queries=profile.queries,
+        over_budget=over_budget,
+    )
+
+
+def init_request_profiling(app) -> None:
+    """
+    Install the profiling hooks if REQUEST_PROFILING_ENABLED.
+
+    Call before registering other before_request hooks, so their time
+    (and the user loader's query) is included.
+    """
+    if not app.config.get("REQUEST_PROFILING_ENABLED"):
+        return
+
+    app.before_request(_start_profile)
+    app.after_request(_finish_profile)
+    app.teardown_request(_teardown_profile)
+    before_render_template.connect(_template_started, app)
+    template_rendered.connect(_template_finished, app)
+
+    for name, listener in (
+        ("before_cursor_execute", _sql_started),
+        ("after_cursor_execute", _sql_finished),
+        ("handle_error", _sql_failed),
+    ):
+        if not event.contains(Engine, name, listener):
+            event.listen(Engine, name, listener)
+
+
+# -----------------------------
+# Reporting
+# -----------------------------
+
+@dataclass
+class EndpointSummary:
+    endpoint: str
+    requests: int = 0
+    over_budget: int = 0
+    histograms: Dict[str, PhaseSummary] = field(default_factory=dict)
+
+    def quantile(self, name: str, q: float) -> Optional[float]:
+        histogram = self.histograms.get(name)
+        return histogram.quantile(q) if histogram else None
+
+    def mean(self, name: str) -> Optional[float]:
+        histogram = self.histograms.get(name)
+        return histogram.mean if histogram else None
+
+    @property
+    def total_seconds(self) -> float:
+        histogram = self.histograms.get("wall")
+        return histogram.total_seconds if histogram else 0.0
+
+
+def summarize(snapshot: Dict[MetricKey, float]) -> List[EndpointSummary]:
+    """Per-endpoint summaries, the endpoints taking the most total time first."""
+    endpoints: Dict[str, EndpointSummary] = {}
+
+    for endpoint, _, _ in snapshot:
+        endpoints.setdefault(endpoint, EndpointSummary(endpoint))
+
+    for endpoint, summary in endpoints.items():
+        summary.requests = int(snapshot.get((endpoint, "requests", ""), 0))
+        summary.over_budget = int(snapshot.get((endpoint, "over_budget", ""), 0))
+
+        for name, bounds in HISTOGRAMS.items():
+            labels = [(_format_bound(bound), float(bound)) for bound in bounds]
+            labels.append((INF, float("inf")))
+            buckets = [
+                (bound, int(snapshot.get((endpoint, name, label), 0)))
+                for label, bound in labels
+            ]
+            count = sum(count for _, count in buckets)
+            if count:
+                summary.histograms[name] = PhaseSummary(
+                    count=count,
+                    total_seconds=snapshot.get((endpoint, name, "sum"), 0.0),
+                    buckets=buckets,
+                )
+
+    return sorted(endpoints.values(), key=lambda s: (-s.total_seconds, s.endpoint))
+
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+_PROMETHEUS_HISTOGRAMS = (
+    ("wall", "request_duration_seconds", "Request wall time"),
+    ("sql", "request_sql_seconds", "Time spent in SQL per request"),
+    ("template", "request_template_seconds", "Time spent rendering templates per request"),
+    ("queries", "request_queries", "SQL statements per request"),
+)
+
+
+def prometheus_text(snapshot: Dict[MetricKey, float], window_minutes: float) -> str:
+    """
+    Render the window's metrics in the Prometheus text format.
+
+    The window rolls, so everything is a gauge.
+    """
+    window = f"{window_minutes:g}"
+    summaries = summarize(snapshot)
+
+    lines = [
+        f"# HELP request_window_requests Requests per endpoint in the last {window} minutes.",
+        "# TYPE request_window_requests gauge",
+    ]
+    for summary in summaries:
+        lines.append(f'request_window_requests{{endpoint="{summary.endpoint}"}} {summary.requests}')
+
+    lines += [
+        f"# HELP request_window_over_budget Requests over the query or time budget in the last {window} minutes.",
+        "# TYPE request_window_over_budget gauge",
+    ]
+    for summary in summaries:
+        lines.append(f'request_window_over_budget{{endpoint="{summary.endpoint}"}} {summary.over_budget}')
+
+    for name, metric, description in _PROMETHEUS_HISTOGRAMS:
+        lines += [
+            f"# HELP {metric} {description}, estimated quantiles over the last {window} minutes.",
+            f"# TYPE {metric} gauge",
+        ]
+        for summary in summaries:
+            for q in QUANTILES:
+                value = summary.quantile(name, q)
+                if value is not None:
+                    lines.append(
+                        f'{metric}{{endpoint="{summary.endpoint}",quantile="{q:g}"}} {value:.6f}'
+                    )
+
+    return "\n".join(lines) + "\n"
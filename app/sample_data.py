@@ -0,0 +1,245 @@
+# app/sample_data.py
+
+"""
+Synthetic data for query checks and benchmarks.
+
+seed_sample_data() fills an empty database with:
+- users, a third of them subscribed and half referred by the sample member
+- a question bank with choices for every band
+- submitted quiz sessions with answers, plus an open one
+- referral earnings and withdrawal requests
+
+Rows go in with bulk inserts, so large datasets take seconds, and the
+derived columns that mapper events normally maintain (premium_until)
+are written directly. It refuses to run unless the user table is
+empty, so it cannot mix fake rows into a real database.
+"""
+
+from __future__ import annotations
+
+import random
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import Dict, List
+
+from sqlalchemy import String, cast, func, insert, literal, update
+from werkzeug.security import generate_password_hash
+
+from app.extensions import db
+from app.models import ReferralEarning, Subscription, User, WithdrawalRequest
+from app.models.quiz import Choice, Question, QuizSession, UserAnswer
+
+
+BANDS = ["l1-4", "l5-7", "l8-10", "l12-14", "l15-16", "l17", "confirmation"]
+QUESTION_TYPES = ["psr", "fr"]
+
+SAMPLE_PASSWORD = "sample-password"
+ADMIN_EMAIL = "admin@sample.test"
+MEMBER_EMAIL = "member@sample.test"
+SESSION_TOKEN_PREFIX = "sample-"
+
+CHUNK_SIZE = 1000
+
+
+@dataclass
+class SampleSizes:
+    users: int = 20
+    questions_per_band: int = 80  # per question type
+    choices_per_question: int = 4
+    sessions_per_user: int = 3
+    questions_per_session: int = 10
+    withdrawals_per_user: int = 2
+
+
+@dataclass
+class SampleData:
+    """Ids the checks and benchmarks need."""
+
+    admin_id: int
+    member_id: int
+    open_session_id: int
+    submitted_session_id: int
+    counts: Dict[str, int] = field(default_factory=dict)
+
+
+def session_token_for(user_id: int) -> str:
+    """current_session_token of a sample user, for logging in a test client."""
+    return f"{SESSION_TOKEN_PREFIX}{user_id}"
+
+
+def _insert(model, rows: List[dict]) -> List[int]:
+    """Bulk insert; returns the new ids in row order."""
+    ids: List[int] = []
+    for start in range(0, len(rows), CHUNK_SIZE):
+        ids += db.session.scalars(
+            insert(model).returning(model.id, sort_by_parameter_order=True),
+            rows[start:start + CHUNK_SIZE],
+        ).all()
+    return ids
+
+
+def seed_sample_data(sizes: SampleSizes = SampleSizes(), seed: int = 1) -> SampleData:
+    if db.session.query(func.count(User.id)).scalar():
+        raise RuntimeError("seed_sample_data() only runs on an empty database.")
+
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    password_hash = generate_password_hash(SAMPLE_PASSWORD)
+    counts: Dict[str, int] = {}
+
+    # Users: the admin, the member (referrer, subscribed), then everyone else.
+    user_rows = []
+    for n in range(max(sizes.users, 2)):
+        email = ADMIN_EMAIL if n == 0 else MEMBER_EMAIL if n == 1 else f"user{n}@sample.test"
+        user_rows.append({
+            "username": email.split("@")[0],
+            "email": email,
+            "password_hash": password_hash,
+            "is_email_verified": True,
+            "is_admin": n == 0,
+            "referral_code": f"S{n:07d}",
+            "referred_by": "S0000001" if n > 1 and n % 2 == 0 else None,
+            "wallet_balance": Decimal("5000.00") if n == 1 else Decimal("0.00"),
+            "premium_until": now + timedelta(days=300) if n == 1 or n % 3 == 0 else None,
+            "created_at": now - timedelta(days=rng.randint(1, 365)),
+        })
+    user_ids = _insert(User, user_rows)
+    db.session.execute(
+        update(User.__table__).values(
+            current_session_token=literal(SESSION_TOKEN_PREFIX) + cast(User.__table__.c.id, String)
+        )
+    )
+    counts["users"] = len(user_ids)
+
+    subscribed = [
+        (user_id, row) for user_id, row in zip(user_ids, user_rows) if row["premium_until"]
+    ]
+    subscription_ids = _insert(Subscription, [
+        {
+            "user_id": user_id,
+            "amount": 10000.0,
+            "payment_provider": "paystack",
+            "is_confirmed": True,
+            "paid_at": row["premium_until"] - timedelta(days=366),
+            "expires_at": row["premium_until"],
+            "reference": f"sample-{user_id}",
+            "payment_reference": f"sample-{user_id}",
+        }
+        for user_id, row in subscribed
+    ])
+    counts["subscriptions"] = len(subscription_ids)
+
+    member_id = user_ids[1]
+    counts["referral_earnings"] = len(_insert(ReferralEarning, [
+        {
+            "referrer_id": member_id,
+            "referred_user_id": user_id,
+            "subscription_id": subscription_id,
+            "amount": Decimal("250.00"),
+            "created_at": now - timedelta(days=rng.randint(1, 300)),
+        }
+        for (user_id, row), subscription_id in zip(subscribed, subscription_ids)
+        if row["referred_by"]
+    ]))
+
+    counts["withdrawals"] = len(_insert(WithdrawalRequest, [
+        {
+            "user_id": user_id,
+            "amount": Decimal("1000.00"),
+            "fee": Decimal("100.00"),
+            "net_amount": Decimal("900.00"),
+            "bank_name": "Sample Bank",
+            "account_name": "Sample Account",
+            "account_number": "0123456789",
+            "bank_code": "000",
+            "status": rng.choice(["pending", "paid", "rejected"]),
+            "created_at": now - timedelta(days=rng.randint(1, 90)),
+            "updated_at": now,
+        }
+        for user_id in user_ids[1:]
+        for _ in range(sizes.withdrawals_per_user)
+    ]))
+
+    # Question bank.
+    question_rows = [
+        {
+            "band": band,
+            "question_type": qt,
+            "text": f"Sample {qt} question {n} for {band}?",
+            "explanation": "Sample explanation.",
+            "rand_key": rng.random(),
+        }
+        for band in BANDS
+        for qt in QUESTION_TYPES
+        for n in range(sizes.questions_per_band)
+    ]
+    question_ids = _insert(Question, question_rows)
+    counts["questions"] = len(question_ids)
+
+    choice_rows = [
+        {"question_id": question_id, "text": f"Option {n + 1}", "is_correct": n == 0}
+        for question_id in question_ids
+        for n in range(sizes.choices_per_question)
+    ]
+    choice_ids = _insert(Choice, choice_rows)
+    counts["choices"] = len(choice_ids)
+
+    # choice ids of each question, in insert order
+    choices_of = {
+        question_id: choice_ids[i * sizes.choices_per_question:(i + 1) * sizes.choices_per_question]
+        for i, question_id in enumerate(question_ids)
+    }
+    by_band: Dict[str, List[int]] = {}
+    for question_id, row in zip(question_ids, question_rows):
+        by_band.setdefault(row["band"], []).append(question_id)
+
+    # Quiz sessions: submitted ones for everyone, plus an open one for the member.
+    session_rows, session_answers = [], []
+    open_index = None
+    for user_id in user_ids:
+        count = sizes.sessions_per_user + (1 if user_id == member_id else 0)
+        for n in range(count):
+            band = rng.choice(BANDS)
+            picked = rng.sample(by_band[band], min(sizes.questions_per_session, len(by_band[band])))
+            answers = [(question_id, rng.choice(choices_of[question_id])) for question_id in picked]
+            started = now - timedelta(days=rng.randint(0, 180), minutes=rng.randint(0, 1440))
+            is_open = user_id == member_id and n == count - 1
+            if is_open:
+                open_index = len(session_rows)
+            session_rows.append({
+                "user_id": user_id,
+                "band": band,
+                "mode": "trial",
+                "started_at": now if is_open else started,
+                "completed_at": None if is_open else started + timedelta(minutes=rng.randint(5, 40)),
+                "is_submitted": not is_open,
+                "score": None if is_open else sum(
+                    choice_id == choices_of[question_id][0] for question_id, choice_id in answers
+                ),
+                "total_questions": len(picked),
+                "question_ids_csv": ",".join(str(q) for q in picked),
+            })
+            session_answers.append(answers)
+    session_ids = _insert(QuizSession, session_rows)
+    counts["quiz_sessions"] = len(session_ids)
+
+    counts["answers"] = len(_insert(UserAnswer, [
+        {"session_id": session_id, "question_id": question_id, "choice_id": choice_id}
+        for session_id, answers in zip(session_ids, session_answers)
+        for question_id, choice_id in answers
+    ]))
+
+    db.session.commit()
+
+    member_sessions = [
+        session_id for session_id, row in zip(session_ids, session_rows)
+        if row["user_id"] == member_id and row["is_submitted"]
+    ]
+    return SampleData(
+        admin_id=user_ids[0],
+        member_id=member_id,
+        open_session_id=session_ids[open_index],
+        submitted_session_id=member_sessions[0],
+        counts=counts,
+    )
@@ -0,0 +1,320 @@
+# app/sampling_profiler.py
+
+"""
+Sampling profiler for live requests, switched on at runtime.
+
+An admin picks endpoints on /admin/performance, how often to sample (1
+in N requests) and for how long. The choice is saved in
+<instance>/profiles/settings.json, which every worker on the host
+checks about once a second, so nothing needs a redeploy or restart.
+
+For a sampled request, a background thread records the request
+thread's Python stack every PROFILER_INTERVAL_MS. When the request ends
+its stacks are appended, in the collapsed format read by flamegraph.pl
+and speedscope ("module:func;module:func count"), to
+<instance>/profiles/<endpoint>.<hour>.<pid>.collapsed.
+
+Overhead is bounded by the sample rate, by PROFILER_MAX_CONCURRENT
+requests per process being sampled at once, and by the time limit on
+each activation. Files older than PROFILER_RETENTION_HOURS, and the
+oldest ones beyond PROFILER_MAX_MB in total, are deleted.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, FrozenSet, List, Optional
+
+from flask import current_app, g, request
+
+
+SETTINGS_FILE = "settings.json"
+SUFFIX = ".collapsed"
+
+# How often each process looks for new settings.
+SETTINGS_CHECK_SECONDS = 1.0
+# How often old profiles are pruned.
+PRUNE_SECONDS = 60.0
+
+MAX_STACK_DEPTH = 128
+MAX_MINUTES = 120
+
+DEFAULT_INTERVAL_MS = 10
+DEFAULT_MAX_CONCURRENT = 2
+DEFAULT_RETENTION_HOURS = 48
+DEFAULT_MAX_MB = 50
+
+
+@dataclass(frozen=True)
+class ProfilerSettings:
+    endpoints: FrozenSet[str]
+    every: int
+    until: float
+
+    @property
+    def active(self) -> bool:
+        return bool(self.endpoints) and time.time() < self.until
+
+
+@dataclass
+class ProfileFile:
+    name: str
+    size: int
+    modified: datetime
+
+
+class _Sample:
+    """The stacks recorded so far for one request thread."""
+
+    def __init__(self, endpoint: str) -> None:
+        self.endpoint = endpoint
+        self.stacks: Counter = Counter()
+
+
+def _frame_name(frame) -> str:
+    code = frame.f_code
+    module = frame.f_globals.get("__name__", "?")
+    return f"{module}:{getattr(code, 'co_qualname', code.co_name)}"
+
+
+def collapse(frame) -> str:
+    """One stack, outermost frame first, as a collapsed-format key."""
+    names = []
+    while frame is not None and len(names) < MAX_STACK_DEPTH:
+        names.append(_frame_name(frame))
+        frame = frame.f_back
+    names.reverse()
+    return ";".join(names)
+
+
+class SamplingProfiler:
+    """One per instance folder; use sampling_profiler()."""
+
+    def __init__(self, directory: str) -> None:
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._settings: Optional[ProfilerSettings] = None
+        self._settings_mtime: Optional[int] = None
+        self._checked_at = 0.0
+        self._pruned_at = 0.0
+        self._seen: Counter = Counter()
+        self._samples: Dict[int, _Sample] = {}
+        self._thread: Optional[threading.Thread] = None
+        self._interval = DEFAULT_INTERVAL_MS / 1000
+
+    # -----------------------------
+    # Settings
+    # -----------------------------
+
+    @property
+    def _settings_path(self) -> str:
+        return os.path.join(self.directory, SETTINGS_FILE)
+
+    def settings(self) -> Optional[ProfilerSettings]:
+        """The current settings, re-read when another process changed them."""
+        with self._lock:
+            if time.monotonic() - self._checked_at < SETTINGS_CHECK_SECONDS:
+                return self._settings
+            self._checked_at = time.monotonic()
+
+        try:
+            mtime = os.stat(self._settings_path).st_mtime_ns
+        except OSError:
+            mtime = None
+
+        if mtime != self._settings_mtime:
+            settings = self._read_settings() if mtime is not None else None
+            with self._lock:
+                self._settings, self._settings_mtime = settings, mtime
+                self._seen.clear()
+
+        return self._settings
+
+    def _read_settings(self) -> Optional[ProfilerSettings]:
+        try:
+            with open(self._settings_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return ProfilerSettings(
+                endpoints=frozenset(data.get("endpoints") or ()),
+                every=max(1, int(data.get("every") or 1)),
+                until=float(data.get("until") or 0),
+            )
+        except (OSError, ValueError, TypeError):
+            return None
+
+    def _write_settings(self, data: dict) -> None:
+        path = self._settings_path
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp, path)
+        with self._lock:
+            self._checked_at = 0.0
+
+    def enable(self, endpoints: List[str], every: int, minutes: float) -> None:
+        """Sample 1 in `every` requests to `endpoints` for the next `minutes`."""
+        minutes = min(max(minutes, 1), MAX_MINUTES)
+        self._write_settings({
+            "endpoints": sorted(set(endpoints)),
+            "every": max(1, int(every)),
+            "until": time.time() + minutes * 60,
+        })
+
+    def disable(self) -> None:
+        self._write_settings({"endpoints": [], "every": 1, "until": 0})
+
+    # -----------------------------
+    # Sampling
+    # -----------------------------
+
+    def should_sample(self, endpoint: Optional[str]) -> bool:
+        settings = self.settings()
+        if settings is None or not settings.active or endpoint not in settings.endpoints:
+            return False
+
+        max_concurrent = int(current_app.config.get(
+            "PROFILER_MAX_CONCURRENT", DEFAULT_MAX_CONCURRENT
+        ))
+        with self._lock:
+            self._seen[endpoint] += 1
+            if self._seen[endpoint] % settings.every:
+                return False
+            return len(self._samples) < max_concurrent
+
+    def start(self, endpoint: str) -> None:
+        """Start sampling the calling thread."""
+        interval_ms = float(current_app.config.get("PROFILER_INTERVAL_MS", DEFAULT_INTERVAL_MS))
+
+        with self._lock:
+            self._samples[threading.get_ident()] = _Sample(endpoint)
+            self._interval = max(interval_ms, 1) / 1000
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="sampling-profiler", daemon=True
+                )
+                self._thread.start()
+
+    def stop(self) -> None:
+        """Stop sampling the calling thread and save what was recorded."""
+        with self._lock:
+            sample = self._samples.pop(threading.get_ident(), None)
+
+        if sample is not None and sample.stacks:
+            self._save(sample)
+
+    def _run(self) -> None:
+        while True:
+            with self._lock:
+                if not self._samples:
+                    self._thread = None
+                    return
+                interval = self._interval
+
+            time.sleep(interval)
+
+            frames = sys._current_frames()
+            with self._lock:
+                for thread_id, sample in self._samples.items():
+                    frame = frames.get(thread_id)
+                    if frame is not None:
+                        sample.stacks[collapse(frame)] += 1
+            del frames
+
+    # -----------------------------
+    # Files
+    # -----------------------------
+
+    def _save(self, sample: _Sample) -> None:
+        hour = datetime.utcnow().strftime("%Y%m%dT%H")
+        path = os.path.join(self.directory, f"{sample.endpoint}.{hour}.{os.getpid()}{SUFFIX}")
+        lines = "".join(f"{stack} {count}\n" for stack, count in sample.stacks.items())
+
+        try:
+            with open(path, "a", encoding="utf-8") as f:
+                f.write(lines)
+        except OSError as exc:
+            current_app.logger.warning("Profile not saved for %s: %s", sample.endpoint, exc)
+            return
+
+        if time.monotonic() - self._pruned_at >= PRUNE_SECONDS:
+            self._pruned_at = time.monotonic()
+            self.prune()
+
+    def files(self) -> List[ProfileFile]:
+        """Saved profiles, newest first."""
+        found = []
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return []
+
+        for name in names:
+            if not name.endswith(SUFFIX):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.directory, name))
+            except OSError:
+                continue
+            found.append(ProfileFile(name, stat.st_size, datetime.utcfromtimestamp(stat.st_mtime)))
+
+        return sorted(found, key=lambda f: f.modified, reverse=True)
+
+    def prune(self) -> None:
+        """Delete profiles past retention, then the oldest beyond the size limit."""
+        config = current_app.config
+        max_age = float(config.get("PROFILER_RETENTION_HOURS", DEFAULT_RETENTION_HOURS)) * 3600
+        max_bytes = float(config.get("PROFILER_MAX_MB", DEFAULT_MAX_MB)) * 1024 * 1024
+
+        total = 0
+        cutoff = datetime.utcnow().timestamp() - max_age
+        for profile in self.files():
+            total += profile.size
+            if profile.modified.timestamp() < cutoff or total > max_bytes:
+                try:
+                    os.remove(os.path.join(self.directory, profile.name))
+                except OSError:
+                    pass
+
+
+_PROFILERS: Dict[str, SamplingProfiler] = {}
+_PROFILERS_LOCK = threading.Lock()
+
+
+def sampling_profiler() -> SamplingProfiler:
+    """The profiler for this app's instance folder."""
+    directory = os.path.join(current_app.instance_path, "profiles")
+
+    with _PROFILERS_LOCK:
+        profiler = _PROFILERS.get(directory)
+        if profiler is None:
+            profiler = SamplingProfiler(directory)
+            _PROFILERS[directory] = profiler
+        return profiler
+
+
+def _start_sampling() -> None:
+    profiler = sampling_profiler()
+    if profiler.should_sample(request.endpoint):
+        profiler.start(request.endpoint)
+        g._sampling_profiler = profiler
+
+
+def _stop_sampling(exc) -> None:
+    profiler = g.pop("_sampling_profiler", None)
+    if profiler is not None:
+        profiler.stop()
+
+
+def init_sampling_profiler(app) -> None:
+    """Install the hooks; they cost a dict lookup per request while sampling is off."""
+    app.before_request(_start_sampling)
+    app.teardown_request(_stop_sampling)
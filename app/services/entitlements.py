@@ -0,0 +1,181 @@
+"""
+Entitlements: whether a user has paid access, and until when.
+
+Every gate (quiz mode, the subscribe CTA, starting a checkout, admin
+activation) asks active_until() instead of querying subscriptions.
+
+The source is User.premium_until: the latest expires_at of the user's
+confirmed subscriptions. It is recomputed in the same transaction
+whenever a subscription is confirmed, extended, deactivated or
+deleted through the ORM, so segment queries can filter on it directly
+(premium_until_condition). `flask check-premium` finds and repairs
+rows that drifted, e.g. after manual SQL.
+
+The answer is cached in three places:
+
+- on g, for the rest of the request
+- in process, for ENTITLEMENT_CACHE_SECONDS
+- a shared "entitlements" version in cache_versions (app/cache.py),
+  which each process checks at most every ENTITLEMENT_SYNC_SECONDS and
+  which clears its cache when it has changed
+
+Committing any change to a subscription (Paystack webhook,
+verify_subscription, admin activation or deactivation) drops that user
+here at once and bumps the shared version for the other processes.
+"""
+
+import threading
+import time
+from datetime import datetime
+from typing import Optional
+
+from flask import current_app, g, has_request_context
+from sqlalchemy import event, func, inspect, select, update
+from sqlalchemy.orm import object_session
+
+from app.cache import MISSING, TTLCache, bump_cache_version, cache_version, on_commit
+from app.extensions import db
+from app.models.subscription import Subscription
+from app.models.user import User
+
+DEFAULT_CACHE_SECONDS = 300.0
+DEFAULT_SYNC_SECONDS = 5.0
+
+SHARED_VERSION = "entitlements"
+
+# user_id -> latest expires_at of a confirmed subscription (or None)
+_ACTIVE_UNTIL = TTLCache(DEFAULT_CACHE_SECONDS)
+
+_sync_lock = threading.Lock()
+_synced_version: Optional[int] = None
+_synced_at = 0.0
+
+
+def _sync() -> None:
+    """Clear this process's cache if another process changed an entitlement."""
+    global _synced_version, _synced_at
+
+    interval = float(current_app.config.get("ENTITLEMENT_SYNC_SECONDS", DEFAULT_SYNC_SECONDS))
+    with _sync_lock:
+        if time.monotonic() - _synced_at < interval:
+            return
+        _synced_at = time.monotonic()
+
+    version = cache_version(SHARED_VERSION)
+
+    with _sync_lock:
+        if version is None or version != _synced_version:
+            _ACTIVE_UNTIL.clear()
+        _synced_version = version
+
+
+def computed_premium_until(user_id_column=User.id):
+    """premium_until as computed from subscriptions, for a user id column."""
+    return (
+        select(func.max(Subscription.expires_at))
+        .where(
+            Subscription.user_id == user_id_column,
+            Subscription.is_confirmed.is_(True),
+        )
+        .scalar_subquery()
+    )
+
+
+def premium_until_condition(now: datetime):
+    """SQL condition: the user has paid access at `now` (indexed)."""
+    return User.premium_until > now
+
+
+def _load_active_until(user_id: int) -> Optional[datetime]:
+    return db.session.query(User.premium_until).filter(User.id == user_id).scalar()
+
+
+def active_until(user_id: int, refresh: bool = False) -> Optional[datetime]:
+    """
+    When the user's paid access ends (None if they never had any).
+
+    Pass refresh=True on write paths to skip the caches.
+    """
+    memo = g.setdefault("_active_until", {}) if has_request_context() else {}
+    if user_id in memo and not refresh:
+        return memo[user_id]
+
+    _sync()
+
+    value = MISSING if refresh else _ACTIVE_UNTIL.get(user_id)
+    if value is MISSING:
+        value = _load_active_until(user_id)
+        _ACTIVE_UNTIL.set(
+            user_id,
+            value,
+            float(current_app.config.get("ENTITLEMENT_CACHE_SECONDS", DEFAULT_CACHE_SECONDS)),
+        )
+
+    memo[user_id] = value
+    return value
+
+
+def has_active_subscription(user_id: int, refresh: bool = False) -> bool:
+    until = active_until(user_id, refresh=refresh)
+    return until is not None and until > datetime.utcnow()
+
+
+def forget_user(user_id: int) -> None:
+    """Drop the cached entitlement for one user in this process."""
+    _ACTIVE_UNTIL.pop(user_id)
+    if has_request_context():
+        g.get("_active_until", {}).pop(user_id, None)
+
+
+def invalidate_entitlement(user_id: int) -> None:
+    """Drop one user's entitlement here and tell the other processes."""
+    forget_user(user_id)
+    bump_cache_version(SHARED_VERSION)
+
+
+def _sync_premium_until(connection, user_ids) -> None:
+    """Recompute user.premium_until inside the current flush."""
+    table = User.__table__
+    connection.execute(
+        update(table)
+        .where(table.c.id.in_([user_id for user_id in user_ids if user_id is not None]))
+        .values(premium_until=computed_premium_until(table.c.id))
+    )
+
+
+def _invalidate_on_commit(target: Subscription) -> None:
+    session = object_session(target)
+    if session is None or target.user_id is None:
+        return
+
+    user_id = target.user_id
+    on_commit(session, ("entitlement", user_id), lambda: invalidate_entitlement(user_id))
+
+
+@event.listens_for(Subscription, "after_insert")
+def _subscription_added(mapper, connection, target) -> None:
+    # A new unconfirmed checkout changes no one's access.
+    if target.is_confirmed:
+        _sync_premium_until(connection, [target.user_id])
+        _invalidate_on_commit(target)
+
+
+@event.listens_for(Subscription, "after_update")
+def _subscription_updated(mapper, connection, target) -> None:
+    state = inspect(target)
+    if any(
+        state.attrs[name].history.has_changes()
+        for name in ("is_confirmed", "expires_at", "user_id")
+    ):
+        # A subscription moved to another user changes the old one too.
+        _sync_premium_until(
+            connection,
+            {target.user_id, *state.attrs.user_id.history.deleted},
+        )
+        _invalidate_on_commit(target)
+
+
+@event.listens_for(Subscription, "after_delete")
+def _subscription_deleted(mapper, connection, target) -> None:
+    _sync_premium_until(connection, [target.user_id])
+    _invalidate_on_commit(target)
@@ -1,24 +1,39 @@
 import requests
 from flask import current_app
 
-PAYSTACK_VERIFY_URL = "https://api.paystack.co/transaction/verify/"
+DEFAULT_BASE_URL = "https://api.paystack.co"
+
+
+def paystack_url(path: str) -> str:
+    """URL of a Paystack API path on PAYSTACK_BASE_URL (the live API or the simulator)."""
+    base = current_app.config.get("PAYSTACK_BASE_URL") or DEFAULT_BASE_URL
+    return f"{base.rstrip('/')}/{path.lstrip('/')}"
+
 
 def verify_paystack_payment(reference):
     headers = {
         "Authorization": f"Bearer {current_app.config['PAYSTACK_SECRET_KEY']}",
     }
 
-    response = requests.get(
-        PAYSTACK_VERIFY_URL + reference,
-        headers=headers,
-        timeout=15
-    )
+    try:
+        response = requests.get(
+            paystack_url(f"transaction/verify/{reference}"),
+            headers=headers,
+            timeout=15
+        )
+    except requests.RequestException:
+        return None
 
     if response.status_code != 200:
         return None
 
-    data = response.json()
-    if data.get("status") is True:
+    try:
+        data = response.json()
+    except ValueError:
+        return None
+    # "status" is whether the lookup worked; the payment's own status is
+    # in data.status ("success", "failed", "abandoned", ...).
+    if data.get("status") is True and (data.get("data") or {}).get("status") == "success":
         return data["data"]
 
     return None
@@ -1,12 +1,12 @@
 import requests
 
-PAYSTACK_BANKS_URL = "https://api.paystack.co/bank"
+from app.services.paystack import paystack_url
 
 
 def fetch_banks(secret_key: str):
     headers = {"Authorization": f"Bearer {secret_key}"}
 
-    r = requests.get(PAYSTACK_BANKS_URL, headers=headers, timeout=30)
+    r = requests.get(paystack_url("bank"), headers=headers, timeout=30)
     data = r.json()
 
     if not r.ok or not data.get("status"):
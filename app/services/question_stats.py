@@ -0,0 +1,46 @@
+from flask import current_app, has_app_context
+from sqlalchemy import event, func, select
+from sqlalchemy.orm import object_session
+
+from app.cache import VersionedValue, on_commit
+from app.extensions import db
+from app.models.quiz import Question
+
+DEFAULT_CHECK_SECONDS = 60.0
+
+
+def _count_questions() -> int:
+    with db.engine.connect() as conn:
+        return conn.execute(select(func.count()).select_from(Question.__table__)).scalar_one()
+
+
+_TOTAL_QUESTIONS = VersionedValue("questions:count", _count_questions)
+
+
+def total_questions() -> int:
+    """
+    Number of questions in the bank, shown on every page.
+
+    Cached in process; adding or deleting questions through the ORM
+    invalidates it for every process (see app/cache.py). Other
+    processes notice within QUESTION_COUNT_CHECK_SECONDS.
+    """
+    check_seconds = DEFAULT_CHECK_SECONDS
+    if has_app_context():
+        check_seconds = float(current_app.config.get(
+            "QUESTION_COUNT_CHECK_SECONDS", DEFAULT_CHECK_SECONDS
+        ))
+    return _TOTAL_QUESTIONS.get(check_seconds)
+
+
+def invalidate_question_count() -> None:
+    """Call after changing questions outside the ORM (bulk SQL)."""
+    _TOTAL_QUESTIONS.invalidate()
+
+
+@event.listens_for(Question, "after_insert")
+@event.listens_for(Question, "after_delete")
+def _question_count_changed(mapper, connection, target) -> None:
+    session = object_session(target)
+    if session is not None:
+        on_commit(session, "questions:count", invalidate_question_count)
@@ -1,5 +1,7 @@
 from decimal import Decimal, ROUND_HALF_UP
 
+from sqlalchemy.exc import IntegrityError
+
 from app.extensions import db
 from app.models import ReferralEarning, User
 
@@ -76,4 +78,10 @@ def handle_referral_bonus(subscription):
     referrer.wallet_balance = _money(current_wallet_balance + bonus)
 
     db.session.add(earning)
-    db.session.commit()
\ No newline at end of file
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # A concurrent confirmation (the webhook and the callback, or a
+        # duplicate webhook) got here first; its earning stands and the
+        # wallet credit above is rolled back with this one.
+        db.session.rollback()
\ No newline at end of file
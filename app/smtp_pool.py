@@ -0,0 +1,328 @@
+# app/smtp_pool.py
+
+from __future__ import annotations
+
+import atexit
+import smtplib
+import ssl
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from email.message import EmailMessage
+from typing import Callable, Iterator, Optional
+
+
+# observe(phase, seconds): optional timing hook, see app/email_metrics.py.
+Observer = Callable[[str, float], None]
+
+
+# Errors that mean a reused connection has gone stale.
+# A send that fails with one of these is retried once on a fresh connection.
+_STALE_CONNECTION_ERRORS = (
+    smtplib.SMTPServerDisconnected,
+    ConnectionError,
+    TimeoutError,
+)
+
+
+@dataclass
+class PooledConnection:
+    server: smtplib.SMTP
+    created_at: float = field(default_factory=time.monotonic)
+    last_used: float = field(default_factory=time.monotonic)
+    messages_sent: int = 0
+
+
+def _observe(observe: Optional[Observer], phase: str, started: float) -> float:
+    """Report the phase that began at `started`; returns now, the next phase's start."""
+    now = time.perf_counter()
+    if observe is not None:
+        observe(phase, now - started)
+    return now
+
+
+def open_smtp_connection(
+    cfg,
+    timeout: int,
+    observe: Optional[Observer] = None,
+) -> smtplib.SMTP:
+    """
+    Open and authenticate one SMTP connection for a provider.
+
+    Port 465:
+        Implicit TLS using SMTP_SSL.
+
+    Other ports, including 587 and 2525:
+        SMTP connection upgraded with STARTTLS.
+
+    Providers with use_tls=False (the local stand-in) use a plain
+    connection, and skip login when login=False.
+
+    observe, if given, receives the "connect", "tls" and "login" timings.
+    """
+    tls_context = ssl.create_default_context()
+    started = time.perf_counter()
+
+    if cfg.use_tls and cfg.port == 465:
+        server = smtplib.SMTP_SSL(
+            cfg.host,
+            cfg.port,
+            timeout=timeout,
+            context=tls_context,
+        )
+    else:
+        server = smtplib.SMTP(
+            cfg.host,
+            cfg.port,
+            timeout=timeout,
+        )
+
+    try:
+        server.ehlo()
+        started = _observe(observe, "connect", started)
+
+        if cfg.use_tls and cfg.port != 465:
+            server.starttls(context=tls_context)
+            server.ehlo()
+            started = _observe(observe, "tls", started)
+
+        if cfg.login:
+            server.login(cfg.username, cfg.password)
+            _observe(observe, "login", started)
+    except Exception:
+        close_quietly(server)
+        raise
+
+    return server
+
+
+def close_quietly(server: smtplib.SMTP) -> None:
+    try:
+        server.quit()
+    except Exception:
+        try:
+            server.close()
+        except Exception:
+            pass
+
+
+class SMTPConnectionPool:
+    """
+    Thread-safe pool of authenticated SMTP connections for one provider.
+
+    - At most max_size connections exist at once; callers wait for one.
+    - A connection is retired after max_messages sends, or after
+      idle_timeout seconds unused: checked when it is taken, and for
+      the whole idle list whenever a connection is returned.
+    - A connection idle for longer than noop_after seconds is checked
+      with NOOP before reuse.
+    - A send that fails because the server dropped a reused connection
+      is retried once on a fresh connection.
+    - Bulk (campaign) sends may use all but `reserved` connections, so
+      transactional mail never queues behind a campaign.
+    - observe, if given, receives "wait" (for a free connection),
+      connection setup and "send" timings.
+    """
+
+    def __init__(
+        self,
+        cfg,
+        timeout: int,
+        max_size: int = 4,
+        max_messages: int = 100,
+        idle_timeout: float = 60.0,
+        noop_after: float = 10.0,
+        reserved: int = 1,
+        observe: Optional[Observer] = None,
+    ) -> None:
+        self.cfg = cfg
+        self.observe = observe
+        self.timeout = timeout
+        self.max_size = max(1, max_size)
+        self.max_messages = max(1, max_messages)
+        self.idle_timeout = idle_timeout
+        self.noop_after = noop_after
+
+        self._idle: deque[PooledConnection] = deque()
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(self.max_size)
+        self._bulk_slots = threading.BoundedSemaphore(
+            max(1, self.max_size - max(0, reserved))
+        )
+
+    # -----------------------------
+    # connection lifecycle
+    # -----------------------------
+
+    def _is_usable(self, conn: PooledConnection, now: float) -> bool:
+        if conn.messages_sent >= self.max_messages:
+            return False
+
+        idle_for = now - conn.last_used
+
+        if idle_for > self.idle_timeout:
+            return False
+
+        if idle_for > self.noop_after:
+            try:
+                code, _ = conn.server.noop()
+            except Exception:
+                return False
+            return code == 250
+
+        return True
+
+    def _take_idle(self) -> Optional[PooledConnection]:
+        """Pop the most recently used idle connection that is still healthy."""
+        while True:
+            with self._lock:
+                if not self._idle:
+                    return None
+                conn = self._idle.pop()
+
+            if self._is_usable(conn, time.monotonic()):
+                return conn
+
+            close_quietly(conn.server)
+
+    def _release(self, conn: PooledConnection, healthy: bool) -> None:
+        conn.last_used = time.monotonic()
+
+        if healthy and conn.messages_sent < self.max_messages:
+            with self._lock:
+                self._idle.append(conn)
+        else:
+            close_quietly(conn.server)
+
+        # Connections are taken newest first, so older idle ones would
+        # otherwise never be looked at again.
+        self.prune_idle()
+
+    @contextmanager
+    def connection(self, bulk: bool = False) -> Iterator[PooledConnection]:
+        """Borrow a connection; it is returned (or discarded on error) on exit."""
+        started = time.perf_counter()
+
+        if bulk and not self._bulk_slots.acquire(timeout=self.timeout):
+            raise TimeoutError(
+                f"Timed out waiting for a free {self.cfg.name} SMTP connection."
+            )
+
+        if not self._slots.acquire(timeout=self.timeout):
+            if bulk:
+                self._bulk_slots.release()
+            raise TimeoutError(
+                f"Timed out waiting for a free {self.cfg.name} SMTP connection."
+            )
+
+        _observe(self.observe, "wait", started)
+
+        conn = None
+        healthy = False
+        try:
+            conn = self._take_idle() or PooledConnection(
+                server=open_smtp_connection(self.cfg, self.timeout, self.observe)
+            )
+            yield conn
+            healthy = True
+        finally:
+            if conn is not None:
+                self._release(conn, healthy)
+            self._slots.release()
+            if bulk:
+                self._bulk_slots.release()
+
+    # -----------------------------
+    # public API
+    # -----------------------------
+
+    def send(self, message: EmailMessage, bulk: bool = False) -> None:
+        """Send one message, reconnecting once if a pooled connection went stale."""
+        self._send(lambda server: server.send_message(message), bulk)
+
+    def sendmail(
+        self,
+        from_addr: str,
+        to_addrs: list[str],
+        data: bytes,
+        bulk: bool = False,
+        mail_options: tuple[str, ...] = (),
+    ) -> None:
+        """Send an already serialized message (CRLF line endings)."""
+        self._send(
+            lambda server: server.sendmail(from_addr, to_addrs, data, mail_options),
+            bulk,
+        )
+
+    def _send(self, send_with, bulk: bool) -> None:
+        for attempt in (1, 2):
+            reused = False
+            try:
+                with self.connection(bulk=bulk) as conn:
+                    reused = conn.messages_sent > 0
+                    started = time.perf_counter()
+                    send_with(conn.server)
+                    _observe(self.observe, "send", started)
+                    conn.messages_sent += 1
+                    return
+            except _STALE_CONNECTION_ERRORS:
+                # The failed connection has already been discarded.
+                # Only a reused one may simply have timed out server-side.
+                if attempt == 2 or not reused:
+                    raise
+
+    def prune_idle(self) -> int:
+        """Close idle connections past idle_timeout; returns how many were closed."""
+        now = time.monotonic()
+        stale: list[PooledConnection] = []
+
+        # The idle list is in last_used order, oldest on the left.
+        with self._lock:
+            while self._idle and now - self._idle[0].last_used > self.idle_timeout:
+                stale.append(self._idle.popleft())
+
+        for conn in stale:
+            close_quietly(conn.server)
+
+        return len(stale)
+
+    def close(self) -> None:
+        with self._lock:
+            idle, self._idle = list(self._idle), deque()
+
+        for conn in idle:
+            close_quietly(conn.server)
+
+
+# One pool per provider config, per process.
+_POOLS: dict[object, SMTPConnectionPool] = {}
+_POOLS_LOCK = threading.Lock()
+
+
+def get_pool(cfg, timeout: int, **settings) -> SMTPConnectionPool:
+    """
+    Return the shared pool for a provider config, creating it on first use.
+
+    Pools are keyed by the full config, so changed credentials get a
+    new pool instead of reusing connections logged in as the old user.
+    """
+    with _POOLS_LOCK:
+        pool = _POOLS.get(cfg)
+        if pool is None:
+            pool = SMTPConnectionPool(cfg, timeout=timeout, **settings)
+            _POOLS[cfg] = pool
+        return pool
+
+
+def close_all_pools() -> None:
+    with _POOLS_LOCK:
+        pools = list(_POOLS.values())
+        _POOLS.clear()
+
+    for pool in pools:
+        pool.close()
+
+
+atexit.register(close_all_pools)
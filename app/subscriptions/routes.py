@@ -9,7 +9,8 @@ from flask_login import login_required, current_user
 
 from app.extensions import db
 from app.models.subscription import Subscription
-from app.services.paystack import verify_paystack_payment
+from app.services.entitlements import active_until, forget_user
+from app.services.paystack import paystack_url, verify_paystack_payment
 from app.services.referral import handle_referral_bonus
 from . import subscription_bp
 
@@ -23,15 +24,10 @@ def _money(v) -> Decimal:
 @subscription_bp.route("/start")
 @login_required
 def start_subscription():
-    active_sub = (
-        Subscription.query
-        .filter_by(user_id=current_user.id, is_confirmed=True)
-        .order_by(Subscription.expires_at.desc())
-        .first()
-    )
-    if active_sub and active_sub.is_active:
+    until = active_until(current_user.id)
+    if until and until > datetime.utcnow():
         flash(
-            f"You already have an active subscription until {active_sub.expires_at.strftime('%d %b %Y')}.",
+            f"You already have an active subscription until {until.strftime('%d %b %Y')}.",
             "warning"
         )
         return redirect(url_for("dashboard.index"))
@@ -62,12 +58,16 @@ def start_subscription():
         "callback_url": url_for("subscription.verify_subscription", _external=True),
     }
 
-    resp = requests.post(
-        "https://api.paystack.co/transaction/initialize",
-        json=payload,
-        headers=headers,
-        timeout=15,
-    ).json()
+    try:
+        resp = requests.post(
+            paystack_url("transaction/initialize"),
+            json=payload,
+            headers=headers,
+            timeout=15,
+        ).json()
+    except (requests.RequestException, ValueError) as e:
+        current_app.logger.warning(f"Paystack initialize failed for {reference}: {e}")
+        resp = {}
 
     if not resp.get("status"):
         flash("Unable to start transaction", "danger")
@@ -88,6 +88,9 @@ def verify_subscription():
 
     # if webhook already confirmed
     if subscription.is_confirmed:
+        # The webhook may have run in another process that has not
+        # yet told this one; drop any cached "not subscribed".
+        forget_user(subscription.user_id)
         flash("Subscription already confirmed.", "info")
         return redirect(url_for("dashboard.index"))
 
@@ -104,6 +107,7 @@ def verify_subscription():
 
     subscription.is_confirmed = True
     subscription.set_expiration(days=366)
+    # Committing invalidates the user's cached entitlement everywhere.
     db.session.commit()
 
     # safe: ReferralEarning blocks duplicates
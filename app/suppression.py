@@ -0,0 +1,371 @@
+# app/suppression.py
+
+"""
+Suppression list: addresses we must never send to again.
+
+Rows in suppressed_email come from two places:
+
+- send_email, when a provider rejects a recipient permanently
+  (unknown mailbox, disabled account; see permanent_failure_reason)
+- the admin import, for complaints and bounce exports from the
+  provider dashboards
+
+Campaign and weekly sends exclude suppressed users in SQL
+(not_suppressed). Every other send checks is_suppressed() first. That
+check goes through a per-process Bloom filter of the list, so the
+common case (not suppressed) costs no database query; only a possible
+match is confirmed against the table. The filter picks up rows added
+by other processes at most every SUPPRESSION_REFRESH_SECONDS.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import math
+import smtplib
+import threading
+import time
+from datetime import datetime
+from email.utils import parseaddr
+from typing import Iterable, Optional, Tuple
+
+from flask import current_app, has_app_context
+from sqlalchemy import exists, func, insert, select
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+
+from app.extensions import db
+from app.models.suppressed_email import SuppressedEmail
+
+
+REASONS = ("hard_bounce", "complaint", "manual")
+
+DEFAULT_REFRESH_SECONDS = 30.0
+BLOOM_ERROR_RATE = 0.01
+BLOOM_MIN_CAPACITY = 10_000
+# Ids re-read on each refresh, for rows that committed out of id order,
+# and how often the filter is rebuilt to catch anything older.
+TRAILING_IDS = 1000
+FULL_REFRESH_EVERY = 20
+
+IMPORT_CHUNK_SIZE = 500
+
+# Reply codes that reject the recipient address itself.
+_PERMANENT_RECIPIENT_CODES = {550, 551, 553}
+
+
+def normalize_email(value: str) -> str:
+    """Lowercased bare address; accepts "Name <addr>" too."""
+    _, address = parseaddr(str(value or ""))
+    return address.strip().lower()
+
+
+def _reply_text(message: object) -> str:
+    if isinstance(message, bytes):
+        return message.decode("utf-8", "replace")
+    return str(message or "")
+
+
+def _is_permanent(code: int, message: object, require_status: bool) -> bool:
+    """
+    True for a reply that says the address does not exist or is disabled.
+
+    Enhanced status 5.1.x (bad address) and 5.2.1 (mailbox disabled)
+    qualify. 5.7.x (policy, often about us rather than the recipient)
+    and anything temporary do not.
+    """
+    if code < 500:
+        return False
+
+    status = _reply_text(message).split(" ", 1)[0]
+    if status.startswith("5.1.") or status == "5.2.1":
+        return True
+    if status.startswith("5."):
+        return False
+
+    return not require_status and code in _PERMANENT_RECIPIENT_CODES
+
+
+def permanent_failure_reason(exc: BaseException) -> Optional[str]:
+    """
+    The SMTP reply, as text, if `exc` is a permanent rejection of the
+    recipient; None for anything that might succeed later.
+    """
+    if isinstance(exc, smtplib.SMTPRecipientsRefused):
+        replies = list(exc.recipients.values())
+        if replies and all(
+            _is_permanent(code, message, require_status=False)
+            for code, message in replies
+        ):
+            code, message = replies[0]
+            return f"{code} {_reply_text(message)}"[:1000]
+        return None
+
+    if isinstance(exc, smtplib.SMTPSenderRefused):
+        return None
+
+    if isinstance(exc, smtplib.SMTPResponseException):
+        # Some servers only reject the recipient after DATA; without an
+        # enhanced status code a 550 there is too ambiguous to act on.
+        if _is_permanent(exc.smtp_code, exc.smtp_error, require_status=True):
+            return f"{exc.smtp_code} {_reply_text(exc.smtp_error)}"[:1000]
+
+    return None
+
+
+class BloomFilter:
+    """
+    Fixed-size Bloom filter of strings.
+
+    No false negatives; about `error_rate` false positives while it
+    holds at most `capacity` items.
+    """
+
+    def __init__(self, capacity: int, error_rate: float = BLOOM_ERROR_RATE) -> None:
+        self.capacity = max(1, capacity)
+        self.size = max(8, math.ceil(-self.capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / self.capacity * math.log(2)))
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item: str) -> Iterable[int]:
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, item: str) -> None:
+        for position in self._positions(item):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        return all(
+            self._bits[position >> 3] & (1 << (position & 7))
+            for position in self._positions(item)
+        )
+
+
+class SuppressionFilter:
+    """
+    This process's Bloom filter of the suppression list.
+
+    Refreshed incrementally, and rebuilt from the whole table every
+    FULL_REFRESH_EVERY refreshes or when it fills past its capacity.
+    Ids are assigned at insert but become visible at commit, so a
+    smaller id can appear after a larger one: each refresh re-reads
+    the last TRAILING_IDS ids, and the periodic rebuild catches
+    anything older. Removing a row leaves it in the filter until the
+    next rebuild, which is harmless: positives are always confirmed
+    against the table.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._bloom = BloomFilter(BLOOM_MIN_CAPACITY)
+        self._last_id = 0
+        # ids within TRAILING_IDS of _last_id already in the filter
+        self._recent_ids: set = set()
+        self._refreshes = 0
+        self._refreshed_at = 0.0
+
+    @staticmethod
+    def _refresh_seconds() -> float:
+        return float(current_app.config.get(
+            "SUPPRESSION_REFRESH_SECONDS", DEFAULT_REFRESH_SECONDS
+        ))
+
+    def refresh(self, force: bool = False) -> None:
+        with self._lock:
+            if not force and time.monotonic() - self._refreshed_at < self._refresh_seconds():
+                return
+            self._refreshed_at = time.monotonic()
+            self._refreshes += 1
+            full = self._refreshes % FULL_REFRESH_EVERY == 0
+            since = max(0, self._last_id - TRAILING_IDS)
+
+        if full:
+            self._rebuild()
+            return
+
+        table = SuppressedEmail.__table__
+        try:
+            with db.engine.connect() as conn:
+                rows = conn.execute(
+                    select(table.c.id, table.c.email)
+                    .where(table.c.id > since)
+                    .order_by(table.c.id)
+                ).all()
+        except SQLAlchemyError as exc:
+            current_app.logger.warning("Suppression list not refreshed: %s", exc)
+            return
+
+        with self._lock:
+            new = [(row_id, email) for row_id, email in rows if row_id not in self._recent_ids]
+            if not new:
+                return
+            overflow = self._bloom.count + len(new) > self._bloom.capacity
+            if not overflow:
+                for row_id, email in new:
+                    self._bloom.add(email)
+                self._remember(row_id for row_id, _ in new)
+
+        if overflow:
+            self._rebuild()
+
+    def _remember(self, row_ids: Iterable[int]) -> None:
+        """Track ids in the trailing window (lock held)."""
+        self._recent_ids.update(row_ids)
+        self._last_id = max(self._recent_ids, default=self._last_id)
+        floor = self._last_id - TRAILING_IDS
+        self._recent_ids = {row_id for row_id in self._recent_ids if row_id > floor}
+
+    def _rebuild(self) -> None:
+        """Reload the whole list into a filter twice its size."""
+        table = SuppressedEmail.__table__
+        try:
+            with db.engine.connect() as conn:
+                total = conn.execute(select(func.count()).select_from(table)).scalar_one()
+                bloom = BloomFilter(max(BLOOM_MIN_CAPACITY, 2 * total))
+                row_ids = []
+                for row_id, email in conn.execute(select(table.c.id, table.c.email)):
+                    bloom.add(email)
+                    row_ids.append(row_id)
+        except SQLAlchemyError as exc:
+            current_app.logger.warning("Suppression list not rebuilt: %s", exc)
+            return
+
+        with self._lock:
+            self._bloom = bloom
+            self._recent_ids = set()
+            self._last_id = 0
+            self._remember(row_ids)
+
+    def add(self, email: str) -> None:
+        with self._lock:
+            self._bloom.add(email)
+
+    def might_contain(self, email: str) -> bool:
+        self.refresh()
+        with self._lock:
+            return email in self._bloom
+
+
+_FILTER = SuppressionFilter()
+
+
+def suppression_filter() -> SuppressionFilter:
+    return _FILTER
+
+
+def is_suppressed(email: str) -> bool:
+    """True if the address is on the suppression list."""
+    email = normalize_email(email)
+    if not email or not _FILTER.might_contain(email):
+        return False
+
+    table = SuppressedEmail.__table__
+    try:
+        with db.engine.connect() as conn:
+            return conn.execute(
+                select(table.c.id).where(table.c.email == email)
+            ).first() is not None
+    except SQLAlchemyError as exc:
+        # Sending to a suppressed address beats dropping good mail.
+        current_app.logger.warning("Suppression check failed for %s: %s", email, exc)
+        return False
+
+
+def suppress(
+    email: str,
+    reason: str = "hard_bounce",
+    source: str = "smtp",
+    detail: Optional[str] = None,
+) -> bool:
+    """
+    Add an address to the list; returns False if it was already there.
+
+    Runs in its own transaction, independent of the caller's session.
+    """
+    email = normalize_email(email)
+    if not email:
+        return False
+
+    try:
+        with db.engine.begin() as conn:
+            conn.execute(
+                insert(SuppressedEmail.__table__).values(
+                    email=email,
+                    reason=reason,
+                    source=source,
+                    detail=detail,
+                    created_at=datetime.utcnow(),
+                )
+            )
+    except IntegrityError:
+        return False
+    finally:
+        _FILTER.add(email)
+
+    if has_app_context():
+        current_app.logger.warning(
+            "Email address suppressed: email=%s reason=%s source=%s detail=%s",
+            email, reason, source, detail,
+        )
+    return True
+
+
+def import_suppressions(
+    emails: Iterable[str],
+    reason: str = "manual",
+    source: str = "import",
+) -> Tuple[int, int]:
+    """
+    Add many addresses at once; returns (added, skipped).
+
+    Skipped counts blanks, invalid addresses, duplicates and addresses
+    already on the list.
+    """
+    table = SuppressedEmail.__table__
+    added = skipped = 0
+    seen = set()
+    chunk = []
+
+    def write(chunk) -> int:
+        with db.engine.begin() as conn:
+            existing = set(conn.execute(
+                select(table.c.email).where(table.c.email.in_(chunk))
+            ).scalars())
+            new = [email for email in chunk if email not in existing]
+            if new:
+                now = datetime.utcnow()
+                conn.execute(insert(table), [
+                    {"email": email, "reason": reason, "source": source, "created_at": now}
+                    for email in new
+                ])
+        for email in new:
+            _FILTER.add(email)
+        return len(new)
+
+    for value in emails:
+        email = normalize_email(value)
+        if "@" not in email or email in seen:
+            skipped += 1
+            continue
+
+        seen.add(email)
+        chunk.append(email)
+        if len(chunk) >= IMPORT_CHUNK_SIZE:
+            count = write(chunk)
+            added, skipped = added + count, skipped + len(chunk) - count
+            chunk = []
+
+    if chunk:
+        count = write(chunk)
+        added, skipped = added + count, skipped + len(chunk) - count
+
+    return added, skipped
+
+
+def not_suppressed(email_column):
+    """SQL condition: the address in `email_column` is not on the list."""
+    return ~exists().where(SuppressedEmail.email == func.lower(email_column))
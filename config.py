@@ -85,6 +85,44 @@ class BaseConfig:
     TRIAL_QUESTION_COUNT = 10
     GRID_QUESTION_COUNT = 70
 
+    # Worker processes used to validate multi-file (zip) question uploads
+    IMPORT_MAX_WORKERS = _as_int(_getenv("IMPORT_MAX_WORKERS"), default=4)
+    # Largest request body (question uploads); larger ones get a 413.
+    MAX_CONTENT_LENGTH = _as_int(_getenv("MAX_UPLOAD_MB"), default=100) * 1024 * 1024
+
+    # --- Page caches (app/cache.py) ---
+    # How often each process checks whether the question count changed elsewhere.
+    QUESTION_COUNT_CHECK_SECONDS = _as_float(_getenv("QUESTION_COUNT_CHECK_SECONDS"), default=60.0)
+    # Entitlements (app/services/entitlements.py): how long a user's paid-access
+    # status is kept, and how often to check for changes made by other processes.
+    ENTITLEMENT_CACHE_SECONDS = _as_float(_getenv("ENTITLEMENT_CACHE_SECONDS"), default=300.0)
+    ENTITLEMENT_SYNC_SECONDS = _as_float(_getenv("ENTITLEMENT_SYNC_SECONDS"), default=5.0)
+    # Logged-in user columns reused by each worker (app/auth/session_cache.py).
+    AUTH_CACHE_SECONDS = _as_float(_getenv("AUTH_CACHE_SECONDS"), default=5.0)
+
+    # -------------------
+    # Profiling
+    # -------------------
+    # Per-endpoint wall/SQL/template timings (app/request_profile.py, /admin/performance).
+    REQUEST_PROFILING_ENABLED = _as_bool(_getenv("REQUEST_PROFILING_ENABLED"), default=False)
+    REQUEST_METRICS_FLUSH_SECONDS = _as_float(_getenv("REQUEST_METRICS_FLUSH_SECONDS"), default=10.0)
+    # Percentiles cover the last N minutes (in 5-minute slots).
+    REQUEST_PROFILE_WINDOW_MINUTES = _as_int(_getenv("REQUEST_PROFILE_WINDOW_MINUTES"), default=60)
+    # Log requests over either budget (0 = no budget). Main pages have their
+    # own statement budgets in app/query_budget.py (`flask check-queries`).
+    REQUEST_QUERY_BUDGET = _as_int(_getenv("REQUEST_QUERY_BUDGET"), default=30)
+    REQUEST_TIME_BUDGET_MS = _as_int(_getenv("REQUEST_TIME_BUDGET_MS"), default=1000)
+    # Sampling profiler (app/sampling_profiler.py), switched on per endpoint by admins:
+    # stack sample interval, requests sampled at once per process, and profile retention.
+    PROFILER_INTERVAL_MS = _as_int(_getenv("PROFILER_INTERVAL_MS"), default=10)
+    PROFILER_MAX_CONCURRENT = _as_int(_getenv("PROFILER_MAX_CONCURRENT"), default=2)
+    PROFILER_RETENTION_HOURS = _as_int(_getenv("PROFILER_RETENTION_HOURS"), default=48)
+    PROFILER_MAX_MB = _as_int(_getenv("PROFILER_MAX_MB"), default=50)
+    # Write sanitized request records to JSONL for `flask bench replay` (app/request_capture.py).
+    REQUEST_CAPTURE_ENABLED = _as_bool(_getenv("REQUEST_CAPTURE_ENABLED"), default=False)
+    # Default: <instance>/captures
+    REQUEST_CAPTURE_DIR = _getenv("REQUEST_CAPTURE_DIR", "")
+
     # -------------------
     # Mail
     # -------------------
@@ -94,6 +132,24 @@ class BaseConfig:
     EMAIL_PROVIDER = _getenv("EMAIL_PROVIDER", "brevo")
     EMAIL_PROVIDER_CHAIN = _getenv("EMAIL_PROVIDER_CHAIN", "")
 
+    # --- Provider health, shared by all processes (app/provider_health.py) ---
+    EMAIL_PROVIDER_HEALTH_SYNC_SECONDS = _as_float(_getenv("EMAIL_PROVIDER_HEALTH_SYNC_SECONDS"), default=5.0)
+    # Cooldown after a failure, doubling per consecutive failure up to the max.
+    EMAIL_PROVIDER_BASE_COOLDOWN_SECONDS = _as_int(_getenv("EMAIL_PROVIDER_BASE_COOLDOWN_SECONDS"), default=30)
+    EMAIL_PROVIDER_COOLDOWN_SECONDS = _as_int(_getenv("EMAIL_PROVIDER_COOLDOWN_SECONDS"), default=600)
+    # Traffic preference per chain position: each provider gets this share of the previous one's weight.
+    EMAIL_PROVIDER_CHAIN_DECAY = _as_float(_getenv("EMAIL_PROVIDER_CHAIN_DECAY"), default=0.5)
+
+    # --- Email metrics (app/email_metrics.py) ---
+    # How often each process adds its SMTP timings to the shared email_metrics table.
+    EMAIL_METRICS_FLUSH_SECONDS = _as_float(_getenv("EMAIL_METRICS_FLUSH_SECONDS"), default=10.0)
+    # Bearer token for scraping /admin/metrics without an admin session (empty = admins only).
+    METRICS_TOKEN = _getenv("METRICS_TOKEN", "")
+
+    # --- Suppression list (app/suppression.py) ---
+    # How often each process picks up addresses suppressed by other processes.
+    SUPPRESSION_REFRESH_SECONDS = _as_float(_getenv("SUPPRESSION_REFRESH_SECONDS"), default=30.0)
+
     # --- Brevo SMTP ---
     BREVO_SMTP_HOST = _getenv("BREVO_SMTP_HOST", "smtp-relay.brevo.com")
     BREVO_SMTP_PORT = _as_int(_getenv("BREVO_SMTP_PORT", "587"), default=587)
@@ -112,6 +168,29 @@ class BaseConfig:
     MAILERSEND_SMTP_USERNAME = _getenv("MAILERSEND_SMTP_USERNAME", "")
     MAILERSEND_SMTP_PASSWORD = _getenv("MAILERSEND_SMTP_PASSWORD", "")
 
+    # --- SMTP connection pool (per provider, per process) ---
+    SMTP_TIMEOUT_SECONDS = _as_int(_getenv("SMTP_TIMEOUT_SECONDS"), default=20)
+    SMTP_POOL_ENABLED = _as_bool(_getenv("SMTP_POOL_ENABLED"), default=True)
+    SMTP_POOL_MAX_SIZE = _as_int(_getenv("SMTP_POOL_MAX_SIZE"), default=4)
+    SMTP_POOL_MAX_MESSAGES = _as_int(_getenv("SMTP_POOL_MAX_MESSAGES"), default=100)
+    SMTP_POOL_IDLE_SECONDS = _as_int(_getenv("SMTP_POOL_IDLE_SECONDS"), default=60)
+    SMTP_POOL_NOOP_AFTER_SECONDS = _as_int(_getenv("SMTP_POOL_NOOP_AFTER_SECONDS"), default=10)
+    # Connections campaign traffic may not use, kept free for transactional mail.
+    SMTP_POOL_RESERVED_SLOTS = _as_int(_getenv("SMTP_POOL_RESERVED_SLOTS"), default=1)
+
+    # --- Email outbox: queue mail for `flask email-worker` instead of sending inline ---
+    EMAIL_OUTBOX_ENABLED = _as_bool(_getenv("EMAIL_OUTBOX_ENABLED"), default=False)
+    EMAIL_OUTBOX_MAX_ATTEMPTS = _as_int(_getenv("EMAIL_OUTBOX_MAX_ATTEMPTS"), default=5)
+    EMAIL_OUTBOX_BACKOFF_SECONDS = _as_int(_getenv("EMAIL_OUTBOX_BACKOFF_SECONDS"), default=30)
+    EMAIL_OUTBOX_MAX_BACKOFF_SECONDS = _as_int(_getenv("EMAIL_OUTBOX_MAX_BACKOFF_SECONDS"), default=3600)
+    EMAIL_OUTBOX_LOCK_SECONDS = _as_int(_getenv("EMAIL_OUTBOX_LOCK_SECONDS"), default=300)
+    # Threads per process sending transactional mail when no worker runs.
+    EMAIL_SEND_THREADS = _as_int(_getenv("EMAIL_SEND_THREADS"), default=2)
+
+    # --- Local SMTP stand-in (EMAIL_PROVIDER=local), no TLS/auth ---
+    LOCAL_SMTP_HOST = _getenv("LOCAL_SMTP_HOST", "127.0.0.1")
+    LOCAL_SMTP_PORT = _as_int(_getenv("LOCAL_SMTP_PORT"), default=1025)
+
     # -------------------
     # App / Campaign settings
     # -------------------
@@ -120,6 +199,15 @@ class BaseConfig:
     BASE_URL = _getenv("BASE_URL", "https://fotmas.site")
     WEEKLY_EMAIL_LIMIT = _as_int(_getenv("WEEKLY_EMAIL_LIMIT"), default=200)
 
+    # Concurrent campaign sender: worker threads, per-provider sends/sec
+    # ("zoho:1,brevo:5"; 0 = unlimited) and how often progress is saved.
+    CAMPAIGN_WORKERS = _as_int(_getenv("CAMPAIGN_WORKERS"), default=4)
+    CAMPAIGN_PROVIDER_RATES = _getenv("CAMPAIGN_PROVIDER_RATES", "")
+    # Live progress updates (dashboard stream); the CampaignLog row is written every CHECKPOINT seconds.
+    CAMPAIGN_PROGRESS_SECONDS = _as_float(_getenv("CAMPAIGN_PROGRESS_SECONDS"), default=0.5)
+    CAMPAIGN_CHECKPOINT_SECONDS = _as_float(_getenv("CAMPAIGN_CHECKPOINT_SECONDS"), default=15.0)
+    CAMPAIGN_STREAM_SECONDS = _as_int(_getenv("CAMPAIGN_STREAM_SECONDS"), default=300)
+
     # -------------------
     # Referrals / Verification
     # -------------------
@@ -135,6 +223,8 @@ class BaseConfig:
     # -------------------
     PAYSTACK_SECRET_KEY = _getenv("PAYSTACK_SECRET_KEY", "")
     PAYSTACK_PUBLIC_KEY = _getenv("PAYSTACK_PUBLIC_KEY", "")
+    # Point at `flask paystack-sim` (app/paystack_simulator.py) for local load tests.
+    PAYSTACK_BASE_URL = _getenv("PAYSTACK_BASE_URL", "https://api.paystack.co")
 
     # -------------------
     # Subscription / Withdrawal
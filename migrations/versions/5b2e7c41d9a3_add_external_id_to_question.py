@@ -0,0 +1,32 @@
+"""add external_id to question for upsert imports
+
+Revision ID: 5b2e7c41d9a3
+Revises: c8a6ad124cdf
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "5b2e7c41d9a3"
+down_revision = "c8a6ad124cdf"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Nullable: questions imported before external IDs existed keep NULL
+    # until an upsert import attaches an ID to them.
+    with op.batch_alter_table("question", schema=None) as batch_op:
+        batch_op.add_column(sa.Column("external_id", sa.String(length=64), nullable=True))
+        batch_op.create_index(
+            batch_op.f("ix_question_external_id"),
+            ["external_id"],
+            unique=True,
+        )
+
+
+def downgrade():
+    with op.batch_alter_table("question", schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f("ix_question_external_id"))
+        batch_op.drop_column("external_id")
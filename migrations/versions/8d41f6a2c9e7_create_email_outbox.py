@@ -0,0 +1,57 @@
+"""create email_outbox table
+
+Revision ID: 8d41f6a2c9e7
+Revises: 5b2e7c41d9a3
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "8d41f6a2c9e7"
+down_revision = "5b2e7c41d9a3"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "email_outbox",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("to_email", sa.String(length=255), nullable=False),
+        sa.Column("subject", sa.String(length=255), nullable=False),
+        sa.Column("html_content", sa.Text(), nullable=True),
+        sa.Column("text_content", sa.Text(), nullable=True),
+        sa.Column("status", sa.String(length=20), nullable=False),
+        sa.Column("attempts", sa.Integer(), nullable=False),
+        sa.Column("max_attempts", sa.Integer(), nullable=False),
+        sa.Column("next_attempt_at", sa.DateTime(), nullable=False),
+        sa.Column("campaign_id", sa.Integer(), nullable=True),
+        sa.Column("locked_by", sa.String(length=64), nullable=True),
+        sa.Column("locked_at", sa.DateTime(), nullable=True),
+        sa.Column("provider", sa.String(length=32), nullable=True),
+        sa.Column("latency_ms", sa.Integer(), nullable=True),
+        sa.Column("last_error", sa.Text(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("sent_at", sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    with op.batch_alter_table("email_outbox", schema=None) as batch_op:
+        batch_op.create_index(
+            "ix_email_outbox_status_next_attempt_at",
+            ["status", "next_attempt_at"],
+            unique=False,
+        )
+        batch_op.create_index(
+            batch_op.f("ix_email_outbox_campaign_id"),
+            ["campaign_id"],
+            unique=False,
+        )
+
+
+def downgrade():
+    with op.batch_alter_table("email_outbox", schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f("ix_email_outbox_campaign_id"))
+        batch_op.drop_index("ix_email_outbox_status_next_attempt_at")
+
+    op.drop_table("email_outbox")
@@ -0,0 +1,34 @@
+"""create email_provider_health table
+
+Revision ID: a4d8e2f61b57
+Revises: f1c27d4a8b30
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "a4d8e2f61b57"
+down_revision = "f1c27d4a8b30"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "email_provider_health",
+        sa.Column("provider", sa.String(length=32), nullable=False),
+        sa.Column("success_rate", sa.Float(), nullable=False),
+        sa.Column("latency_seconds", sa.Float(), nullable=True),
+        sa.Column("consecutive_failures", sa.Integer(), nullable=False),
+        sa.Column("cooldown_until", sa.DateTime(), nullable=True),
+        sa.Column("total_sent", sa.Integer(), nullable=False),
+        sa.Column("total_failed", sa.Integer(), nullable=False),
+        sa.Column("last_error", sa.Text(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("provider"),
+    )
+
+
+def downgrade():
+    op.drop_table("email_provider_health")
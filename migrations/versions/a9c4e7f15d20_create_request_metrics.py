@@ -0,0 +1,30 @@
+"""create request_metrics table
+
+Revision ID: a9c4e7f15d20
+Revises: f3b7d9e1a2c4
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "a9c4e7f15d20"
+down_revision = "f3b7d9e1a2c4"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "request_metrics",
+        sa.Column("slot", sa.DateTime(), nullable=False),
+        sa.Column("endpoint", sa.String(length=128), nullable=False),
+        sa.Column("name", sa.String(length=32), nullable=False),
+        sa.Column("le", sa.String(length=16), nullable=False),
+        sa.Column("value", sa.Float(), nullable=False),
+        sa.PrimaryKeyConstraint("slot", "endpoint", "name", "le"),
+    )
+
+
+def downgrade():
+    op.drop_table("request_metrics")
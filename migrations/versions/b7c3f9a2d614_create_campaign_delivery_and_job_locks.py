@@ -0,0 +1,50 @@
+"""create campaign_delivery and job_locks tables
+
+Revision ID: b7c3f9a2d614
+Revises: a4d8e2f61b57
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "b7c3f9a2d614"
+down_revision = "a4d8e2f61b57"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "campaign_delivery",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("campaign_key", sa.String(length=64), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("segment", sa.String(length=32), nullable=True),
+        sa.Column("status", sa.String(length=20), nullable=False),
+        sa.Column("attempts", sa.Integer(), nullable=False),
+        sa.Column("provider", sa.String(length=32), nullable=True),
+        sa.Column("last_error", sa.Text(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("sent_at", sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint(
+            "campaign_key",
+            "user_id",
+            name="uq_campaign_delivery_campaign_key_user_id",
+        ),
+    )
+
+    op.create_table(
+        "job_locks",
+        sa.Column("name", sa.String(length=128), nullable=False),
+        sa.Column("owner", sa.String(length=128), nullable=False),
+        sa.Column("acquired_at", sa.DateTime(), nullable=False),
+        sa.Column("expires_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("name"),
+    )
+
+
+def downgrade():
+    op.drop_table("job_locks")
+    op.drop_table("campaign_delivery")
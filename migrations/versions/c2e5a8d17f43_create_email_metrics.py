@@ -0,0 +1,29 @@
+"""create email_metrics table
+
+Revision ID: c2e5a8d17f43
+Revises: b7c3f9a2d614
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "c2e5a8d17f43"
+down_revision = "b7c3f9a2d614"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "email_metrics",
+        sa.Column("provider", sa.String(length=32), nullable=False),
+        sa.Column("name", sa.String(length=32), nullable=False),
+        sa.Column("le", sa.String(length=16), nullable=False),
+        sa.Column("value", sa.Float(), nullable=False),
+        sa.PrimaryKeyConstraint("provider", "name", "le"),
+    )
+
+
+def downgrade():
+    op.drop_table("email_metrics")
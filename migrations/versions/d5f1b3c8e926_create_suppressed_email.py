@@ -0,0 +1,32 @@
+"""create suppressed_email table
+
+Revision ID: d5f1b3c8e926
+Revises: c2e5a8d17f43
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "d5f1b3c8e926"
+down_revision = "c2e5a8d17f43"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "suppressed_email",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("email", sa.String(length=255), nullable=False),
+        sa.Column("reason", sa.String(length=20), nullable=False),
+        sa.Column("source", sa.String(length=20), nullable=False),
+        sa.Column("detail", sa.Text(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("email"),
+    )
+
+
+def downgrade():
+    op.drop_table("suppressed_email")
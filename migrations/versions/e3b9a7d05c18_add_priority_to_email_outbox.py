@@ -0,0 +1,26 @@
+"""add priority to email_outbox
+
+Revision ID: e3b9a7d05c18
+Revises: 8d41f6a2c9e7
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "e3b9a7d05c18"
+down_revision = "8d41f6a2c9e7"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table("email_outbox", schema=None) as batch_op:
+        batch_op.add_column(
+            sa.Column("priority", sa.Integer(), nullable=False, server_default="0")
+        )
+
+
+def downgrade():
+    with op.batch_alter_table("email_outbox", schema=None) as batch_op:
+        batch_op.drop_column("priority")
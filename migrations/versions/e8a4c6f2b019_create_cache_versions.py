@@ -0,0 +1,28 @@
+"""create cache_versions table
+
+Revision ID: e8a4c6f2b019
+Revises: d5f1b3c8e926
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "e8a4c6f2b019"
+down_revision = "d5f1b3c8e926"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "cache_versions",
+        sa.Column("name", sa.String(length=128), nullable=False),
+        sa.Column("version", sa.Integer(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("name"),
+    )
+
+
+def downgrade():
+    op.drop_table("cache_versions")
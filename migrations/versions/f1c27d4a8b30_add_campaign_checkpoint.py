@@ -0,0 +1,39 @@
+"""add resume checkpoint to campaign_logs, index subscriptions.user_id
+
+Revision ID: f1c27d4a8b30
+Revises: e3b9a7d05c18
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "f1c27d4a8b30"
+down_revision = "e3b9a7d05c18"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table("campaign_logs", schema=None) as batch_op:
+        batch_op.add_column(sa.Column("payload", sa.Text(), nullable=True))
+        batch_op.add_column(sa.Column("last_user_id", sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column("updated_at", sa.DateTime(), nullable=True))
+
+    # Campaign segments check "has an active subscription" per user.
+    with op.batch_alter_table("subscriptions", schema=None) as batch_op:
+        batch_op.create_index(
+            batch_op.f("ix_subscriptions_user_id"),
+            ["user_id"],
+            unique=False,
+        )
+
+
+def downgrade():
+    with op.batch_alter_table("subscriptions", schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f("ix_subscriptions_user_id"))
+
+    with op.batch_alter_table("campaign_logs", schema=None) as batch_op:
+        batch_op.drop_column("updated_at")
+        batch_op.drop_column("last_user_id")
+        batch_op.drop_column("payload")
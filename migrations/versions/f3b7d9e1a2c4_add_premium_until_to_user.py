@@ -0,0 +1,54 @@
+"""add premium_until to user
+
+Revision ID: f3b7d9e1a2c4
+Revises: e8a4c6f2b019
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "f3b7d9e1a2c4"
+down_revision = "e8a4c6f2b019"
+branch_labels = None
+depends_on = None
+
+
+user = sa.table(
+    "user",
+    sa.column("id", sa.Integer),
+    sa.column("premium_until", sa.DateTime),
+)
+
+subscriptions = sa.table(
+    "subscriptions",
+    sa.column("user_id", sa.Integer),
+    sa.column("is_confirmed", sa.Boolean),
+    sa.column("expires_at", sa.DateTime),
+)
+
+
+def upgrade():
+    with op.batch_alter_table("user", schema=None) as batch_op:
+        batch_op.add_column(sa.Column("premium_until", sa.DateTime(), nullable=True))
+        batch_op.create_index(batch_op.f("ix_user_premium_until"), ["premium_until"], unique=False)
+
+    # Backfill from confirmed subscriptions.
+    op.execute(
+        user.update().values(
+            premium_until=(
+                sa.select(sa.func.max(subscriptions.c.expires_at))
+                .where(
+                    subscriptions.c.user_id == user.c.id,
+                    subscriptions.c.is_confirmed.is_(True),
+                )
+                .scalar_subquery()
+            )
+        )
+    )
+
+
+def downgrade():
+    with op.batch_alter_table("user", schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f("ix_user_premium_until"))
+        batch_op.drop_column("premium_until")
@@ -0,0 +1,112 @@
+"""
+Benchmark pooled vs per-message SMTP delivery against a local stand-in.
+
+Starts an aiosmtpd server on localhost, points the app's "local" email
+provider at it, and sends the same batch twice: once with
+SMTP_POOL_ENABLED and once opening a connection per message.
+
+    pip install aiosmtpd
+    python tools/smtp_bench.py --messages 300 --threads 4 --rtt-ms 20
+
+--rtt-ms adds a delay to the stand-in's EHLO and DATA replies to
+approximate the network round trips of a real provider.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+
+class CountingHandler:
+    def __init__(self, rtt: float) -> None:
+        self.rtt = rtt
+        self.received = 0
+        self.lock = threading.Lock()
+
+    async def handle_EHLO(self, server, session, envelope, hostname, responses):
+        await asyncio.sleep(self.rtt)
+        session.host_name = hostname
+        return responses
+
+    async def handle_DATA(self, server, session, envelope):
+        await asyncio.sleep(self.rtt)
+        with self.lock:
+            self.received += 1
+        return "250 OK"
+
+
+def _run(app, messages: int, threads: int, pooled: bool) -> float:
+    from app.email_service import send_email
+    from app.smtp_pool import close_all_pools
+
+    app.config["SMTP_POOL_ENABLED"] = pooled
+    app.config["SMTP_POOL_MAX_SIZE"] = threads
+
+    def send_one(i: int) -> None:
+        with app.app_context():
+            send_email(
+                to_email=f"user{i}@example.test",
+                subject="Benchmark",
+                html_content=f"<p>Message {i}</p>",
+            )
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(send_one, range(messages)))
+    elapsed = time.perf_counter() - started
+
+    close_all_pools()
+    return elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--messages", type=int, default=200)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--port", type=int, default=8025)
+    parser.add_argument("--rtt-ms", type=float, default=0.0)
+    args = parser.parse_args()
+
+    try:
+        from aiosmtpd.controller import Controller
+    except ImportError:
+        sys.exit("This benchmark needs aiosmtpd: pip install aiosmtpd")
+
+    os.environ.update(
+        {
+            "EMAIL_PROVIDER": "local",
+            "EMAIL_PROVIDER_CHAIN": "local",
+            "LOCAL_SMTP_HOST": "127.0.0.1",
+            "LOCAL_SMTP_PORT": str(args.port),
+            "MAIL_DEFAULT_SENDER": "Bench <bench@example.test>",
+        }
+    )
+
+    from app import create_app
+
+    app = create_app()
+    app.logger.disabled = True
+
+    handler = CountingHandler(rtt=args.rtt_ms / 1000.0)
+    controller = Controller(handler, hostname="127.0.0.1", port=args.port)
+    controller.start()
+
+    try:
+        for label, pooled in (("per-message", False), ("pooled", True)):
+            elapsed = _run(app, args.messages, args.threads, pooled)
+            print(
+                f"{label:12s} {args.messages} msgs in {elapsed:6.2f}s "
+                f"-> {args.messages / elapsed:8.1f} msg/s"
+            )
+        print(f"stand-in received {handler.received} messages")
+    finally:
+        controller.stop()
+
+
+if __name__ == "__main__":
+    main()